@@ -3,45 +3,79 @@ Backend généraliste pour Agent GCP Frontend
 Chaque module gère sa partie spécifique
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import os
 import logging
+from urllib.parse import quote
 from dotenv import load_dotenv
 
 # Charger les variables d'environnement depuis le fichier .env
 load_dotenv()
 
+# Configuration logging (avant les imports: les modules loggent à l'initialisation)
+from modules.structured_logging import configure_logging, init_request_id
+configure_logging()
+
 # Import des modules spécialisés
 from modules.alerts import alerts_bp
 from modules.veille import veille_bp
 from modules.procedures import procedures_bp  # Module des démarches maintenant disponible
 from modules.tasks import tasks_bp  # Module de gestion des tâches
+from modules.dashboard import dashboard_bp  # Données du tableau de bord en une requête
+from modules.batch import batch_bp  # Plusieurs appels API en une requête
 from modules.auth import auth_service
+from modules.passwords import (
+    hash_password, verify_password, rehash_in_background, hasher_stats,
+    stored_password_hash, password_hash_update, PasswordHasherBusy
+)
+from modules.auth_middleware import init_auth_middleware, JWT_SECRET, JWT_ALGORITHM
+from modules.firestore_client import lazy_firestore_client, warm_up
+from modules.metrics import init_metrics, render_metrics
+from modules.request_accounting import init_request_accounting
+from modules.tracing import init_tracing, recent_traces, TRACING_EXPORTER
+from modules.health import (
+    register_probe, start_health_probes, health_snapshot, firestore_probe, http_probe, http_probe_targets
+)
 # from modules.settings import settings_bp  # À ajouter par l'ami qui fait settings
 # from modules.watch import watch_bp  # À ajouter par l'ami qui fait watch
 
 app = Flask(__name__)
 CORS(app)
-# Configuration logging
-logging.basicConfig(level=logging.INFO)
+# ID de requête (header X-Request-Id, repris dans chaque log)
+init_request_id(app)
+# Un span par requête (TRACING_EXPORTER=console ou memory)
+init_tracing(app)
+# Métriques Prometheus (nombre et durée des requêtes par route)
+init_metrics(app)
+# Lectures/écritures Firestore par requête (header Server-Timing)
+init_request_accounting(app)
+# Vérification des tokens JWT (renseigne g.user)
+init_auth_middleware(app)
 logger = logging.getLogger(__name__)
 
 # === Firestore client initialisation (utilise la clé de service présente dans le repo)
-try:
+# Construit à la première utilisation si LAZY_BOOT=true
+def _create_db_client():
     from google.oauth2 import service_account
     from google.cloud import firestore
     sa_path = os.path.join(os.path.dirname(__file__), 'service-account-key.json')
     if os.path.exists(sa_path):
         credentials = service_account.Credentials.from_service_account_file(sa_path)
-        db_client = firestore.Client(credentials=credentials, project=credentials.project_id)
+        client = firestore.Client(credentials=credentials, project=credentials.project_id)
         logger.info('✅ Firestore client initialisé avec la clé de service')
     else:
-        db_client = firestore.Client()
+        client = firestore.Client()
         logger.warning('⚠️ service-account-key.json introuvable, Firestore client initialisé sans fichier (utilise les variables d\'environnement si présentes)')
-except Exception as e:
-    db_client = None
-    logger.error(f"Impossible d'initialiser Firestore client: {e}")
+    return client
+
+db_client = lazy_firestore_client(_create_db_client, 'app')
+
+# Sondes des dépendances (état servi par /health)
+register_probe('firestore', firestore_probe(db_client))
+# Dépendances HTTP: seulement celles dont un endpoint de santé est configuré (HEALTH_HTTP_PROBES)
+for probe_name, probe_url in http_probe_targets().items():
+    register_probe(probe_name, http_probe(probe_url))
 
 # Configuration générale
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
@@ -52,19 +86,48 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check global de l'API"""
+    """
+    Health check global de l'API
+
+    Servi depuis l'état des sondes en arrière-plan: aucun appel vers Firestore,
+    l'alert-engine ou l'agent fiscal n'est fait pendant la requête.
+    """
+    start_health_probes()
+    health = health_snapshot()
     return jsonify({
-        "status": "healthy",
+        "status": health["status"],
         "timestamp": int(__import__('time').time()),
+        "dependencies": health["dependencies"],
         "modules": {
             "alerts": "active",
             "veille": "active",
             "procedures": "active",  # Maintenant actif
             "settings": "pending",  # À changer quand le module sera ajouté
             "watch": "pending"
-        }
+        },
+        "password_hashing": hasher_stats()
     })
 
+@app.route('/_ah/warmup', methods=['GET'])
+def warmup():
+    """Prépare les clients Firestore et les dépendances lourdes (à appeler après un démarrage à froid)"""
+    result = warm_up()
+    start_health_probes()
+    return jsonify(result)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Métriques au format Prometheus (requêtes, opérations Firestore, appels sortants)"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/debug/traces', methods=['GET'])
+def debug_traces():
+    """Dernières traces (exporteur mémoire uniquement, pour le développement local)"""
+    if TRACING_EXPORTER != 'memory':
+        return jsonify({"error": "Exporteur mémoire désactivé (TRACING_EXPORTER=memory)"}), 404
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify({"traces": recent_traces(limit)})
+
 @app.route('/', methods=['GET'])
 def api_info():
     """Information sur l'API disponible"""
@@ -73,10 +136,13 @@ def api_info():
         "version": "1.0.0",
         "endpoints": {
             "/health": "Health check global",
+            "/metrics": "Métriques Prometheus",
             "/alerts/*": "Module des alertes (actif)",
             "/veille/*": "Module de veille réglementaire (actif)",
             "/settings/*": "Module des paramètres (à venir)",
             "/procedures/*": "Module des démarches (actif)", 
+            "/dashboard/<company_id>": "Alertes, tâches, démarches et veille en une requête",
+            "/batch": "Plusieurs sous-requêtes en une seule (POST)",
             "/watch/*": "Module de veille (à venir)"
         },
         "documentation": "Voir README.md pour les détails"
@@ -100,6 +166,12 @@ app.register_blueprint(tasks_bp, url_prefix='/tasks')
 # Module Procédures/Démarches (maintenant implémenté) 
 app.register_blueprint(procedures_bp, url_prefix='/api/procedures')
 
+# Module Dashboard (agrège alertes, tâches, démarches et veille)
+app.register_blueprint(dashboard_bp, url_prefix='/dashboard')
+
+# Module Batch (sous-requêtes exécutées sur les blueprints ci-dessus)
+app.register_blueprint(batch_bp, url_prefix='/batch')
+
 # Modules à ajouter par les autres développeurs :
 # app.register_blueprint(settings_bp, url_prefix='/settings')
 # app.register_blueprint(watch_bp, url_prefix='/watch')
@@ -108,6 +180,46 @@ app.register_blueprint(procedures_bp, url_prefix='/api/procedures')
 # ROUTES D'AUTHENTIFICATION
 # ============================================================================
 
+# Recherche par requête where('email') des comptes absents de users_by_email (créés avant l'index).
+# À désactiver une fois scripts/backfill_users_by_email.py exécuté: l'index couvre alors tous les comptes.
+USERS_EMAIL_LEGACY_LOOKUP = os.getenv('USERS_EMAIL_LEGACY_LOOKUP', 'true').lower() == 'true'
+
+def email_index_ref(email):
+    """Référence du document d'index users_by_email/{email} (email normalisé)"""
+    # Un ID de document Firestore ne peut pas contenir '/'
+    return db_client.collection('users_by_email').document(quote(email, safe='@.+-_'))
+
+def find_user_by_email(email):
+    """
+    Retrouve un utilisateur par email via l'index users_by_email (lectures directes)
+
+    Si USERS_EMAIL_LEGACY_LOOKUP est activé, les comptes créés avant l'index sont
+    retrouvés par requête, puis l'index est complété.
+
+    Returns:
+        Le DocumentSnapshot de l'utilisateur, ou None
+    """
+    index_doc = email_index_ref(email).get()
+    if index_doc.exists:
+        user_doc = db_client.collection('users').document(index_doc.get('uid')).get()
+        return user_doc if user_doc.exists else None
+
+    if not USERS_EMAIL_LEGACY_LOOKUP:
+        return None
+
+    from google.api_core.exceptions import AlreadyExists
+
+    users_list = list(db_client.collection('users').where('email', '==', email).limit(1).get())
+    if not users_list:
+        return None
+
+    user_doc = users_list[0]
+    try:
+        email_index_ref(email).create({'uid': user_doc.id})
+    except AlreadyExists:
+        pass
+    return user_doc
+
 @app.route('/auth/register', methods=['POST'])
 def register():
     """Inscription d'un nouvel utilisateur"""
@@ -129,19 +241,19 @@ def register():
         if '@' not in email:
             return jsonify({'error': 'Adresse e-mail invalide'}), 400
         
-        # Vérifier si l'utilisateur existe déjà
+        # Vérifier si l'utilisateur existe déjà avant de hacher (index, puis requête pour
+        # les comptes pas encore indexés); le create() de l'index reste la garde en cas de course
         if db_client:
             try:
-                existing_users = db_client.collection('users').where('email', '==', email).limit(1).get()
-                if len(list(existing_users)) > 0:
+                if find_user_by_email(email) is not None:
                     return jsonify({'error': 'Un compte avec cet email existe déjà'}), 400
             except Exception as e:
-                logger.error(f"❌ Erreur lors de la vérification de l'email: {e}")
+                logger.error("❌ Erreur lors de la vérification de l'email: %s", e)
         
         # Générer un nouvel utilisateur et le sauvegarder dans Firestore
         import jwt
         import uuid
-        import bcrypt
+        from google.api_core.exceptions import AlreadyExists
         from datetime import datetime, timedelta, timezone
 
         # Générer un ID unique pour chaque utilisateur dans Firestore
@@ -152,13 +264,13 @@ def register():
         demo_uid = 'test_user'
         demo_company_id = 'demo_company'
         
-        # Hasher le mot de passe avec bcrypt
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        # Hasher le mot de passe avec bcrypt (pool dédié, coût BCRYPT_ROUNDS)
+        password_hash = hash_password(password)
 
         user_doc = {
             'uid': unique_uid,
             'email': email,
-            'passwordHash': password_hash.decode('utf-8'),  # Stocker en string
+            'passwordHash': password_hash,
             'companyId': demo_company_id,
             'companyName': company_name,
             'demoUserId': demo_uid,  # Pour référence
@@ -168,13 +280,20 @@ def register():
         # Essayer d'écrire dans Firestore si le client est disponible
         if db_client:
             try:
-                # Créer un document avec l'ID unique
-                db_client.collection('users').document(unique_uid).set(user_doc)
-                logger.info(f"✅ Nouvel utilisateur créé en Firestore: {unique_uid} ({email}) - Mapped to demo: {demo_uid}")
+                # Créer l'utilisateur et son entrée d'index en un seul commit atomique:
+                # create() échoue si l'email est déjà indexé, même en cas d'inscriptions simultanées
+                batch = db_client.batch()
+                batch.create(email_index_ref(email), {'uid': unique_uid, 'createdAt': user_doc['createdAt']})
+                batch.create(db_client.collection('users').document(unique_uid), user_doc)
+                batch.commit()
+                logger.info("✅ Nouvel utilisateur créé en Firestore: %s (%s) - Mapped to demo: %s",
+                            unique_uid, email, demo_uid)
+            except AlreadyExists:
+                return jsonify({'error': 'Un compte avec cet email existe déjà'}), 400
             except Exception as e:
-                logger.error(f"❌ Erreur écriture Firestore pour user {unique_uid}: {e}")
-                logger.error(f"   Type d'erreur: {type(e).__name__}")
-                logger.error(f"   Vérifiez les permissions IAM du service account")
+                logger.error("❌ Erreur écriture Firestore pour user %s: %s", unique_uid, e)
+                logger.error("   Type d'erreur: %s", type(e).__name__)
+                logger.error("   Vérifiez les permissions IAM du service account")
                 return jsonify({'error': 'Erreur lors de la création du compte'}), 500
         else:
             logger.error('⚠️  db_client non initialisé')
@@ -187,7 +306,7 @@ def register():
             'companyId': demo_company_id,
             'real_uid': unique_uid,  # Garder trace de l'ID réel
             'exp': (datetime.now(timezone.utc) + timedelta(days=7)).timestamp()
-        }, os.getenv('JWT_SECRET', 'votre-secret-jwt'), algorithm='HS256')
+        }, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
         result = {
             'success': True,
@@ -201,10 +320,13 @@ def register():
 
         return jsonify(result), 200
         
+    except PasswordHasherBusy:
+        logger.warning("⚠️ File de hachage pleine, inscription rejetée")
+        return jsonify({'error': 'Service surchargé, veuillez réessayer'}), 503, {'Retry-After': '1'}
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"Erreur lors de l'inscription: {e}")
+        logger.error("Erreur lors de l'inscription: %s", e)
         return jsonify({'error': 'Erreur lors de l\'inscription. Veuillez réessayer'}), 500
 
 @app.route('/auth/login', methods=['POST'])
@@ -227,24 +349,26 @@ def login():
         
         # Chercher l'utilisateur dans Firestore par email
         import jwt
-        import bcrypt
         from datetime import datetime, timedelta, timezone
         
         try:
-            users_query = db_client.collection('users').where('email', '==', email).limit(1).get()
-            users_list = list(users_query)
+            user_doc = find_user_by_email(email)
             
-            if len(users_list) == 0:
+            if user_doc is None:
                 return jsonify({'error': 'Email ou mot de passe incorrect'}), 401
             
-            user_doc = users_list[0]
             user_data = user_doc.to_dict()
             
             # Vérifier le mot de passe
-            stored_password_hash = user_data.get('passwordHash', '').encode('utf-8')
-            if not bcrypt.checkpw(password.encode('utf-8'), stored_password_hash):
+            valid, needs_rehash = verify_password(password, stored_password_hash(user_data))
+            if not valid:
                 return jsonify({'error': 'Email ou mot de passe incorrect'}), 401
             
+            # Hash d'un autre format ou d'un autre coût: le recalculer en arrière-plan
+            if needs_rehash:
+                user_ref = user_doc.reference
+                rehash_in_background(password, lambda new_hash: user_ref.update(password_hash_update(new_hash)))
+            
             # Authentification réussie, générer le token
             unique_uid = user_data['uid']
             
@@ -258,7 +382,7 @@ def login():
                 'companyId': demo_company_id,
                 'real_uid': unique_uid,  # Garder trace de l'ID réel
                 'exp': (datetime.now(timezone.utc) + timedelta(days=7)).timestamp()
-            }, os.getenv('JWT_SECRET', 'votre-secret-jwt'), algorithm='HS256')
+            }, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
             result = {
                 'success': True,
@@ -270,17 +394,20 @@ def login():
                 }
             }
             
-            logger.info(f"✅ Connexion réussie pour {email} (uid réel: {unique_uid}, démo: {demo_uid})")
+            logger.info("✅ Connexion réussie pour %s (uid réel: %s, démo: %s)", email, unique_uid, demo_uid)
             return jsonify(result), 200
             
+        except PasswordHasherBusy:
+            logger.warning("⚠️ File de hachage pleine, connexion rejetée")
+            return jsonify({'error': 'Service surchargé, veuillez réessayer'}), 503, {'Retry-After': '1'}
         except Exception as e:
-            logger.error(f"❌ Erreur lors de la requête Firestore: {e}")
+            logger.error("❌ Erreur lors de la requête Firestore: %s", e)
             return jsonify({'error': 'Erreur lors de la connexion'}), 500
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"Erreur lors de la connexion: {e}")
+        logger.error("Erreur lors de la connexion: %s", e)
         return jsonify({'error': 'Erreur lors de la connexion. Veuillez réessayer'}), 500
 
 # ============================================================================
@@ -297,7 +424,7 @@ def not_found(error):
 
 @app.errorhandler(500)
 def internal_error(error):
-    logger.error(f"Erreur interne: {error}")
+    logger.error("Erreur interne: %s", error)
     return jsonify({
         "error": "Erreur interne du serveur",
         "message": "Consultez les logs pour plus de détails"
@@ -314,8 +441,8 @@ if __name__ == '__main__':
 
     logger.info("🚀 Démarrage du Backend Agent GCP")
     logger.info("=" * 50)
-    logger.info(f"Mode: {'Debug' if debug else 'Production'}")
-    logger.info(f"Port: {port}")
+    logger.info("Mode: %s", 'Debug' if debug else 'Production')
+    logger.info("Port: %s", port)
     logger.info("Modules actifs:")
     logger.info("  ✅ /alerts - Système d'alertes")
     logger.info("  ✅ /veille - Veille réglementaire")
@@ -0,0 +1,13 @@
+"""
+Point d'entrée ASGI du backend (variante async de app.py)
+Les routes qui attendent Firestore ou un service lent sont servies en coroutines
+(modules/async_api.py), toutes les autres par l'application Flask de app.py dans
+un pool de threads.
+
+Lancement: hypercorn asgi:app --bind 0.0.0.0:8080
+"""
+
+from app import app as flask_app
+from modules.async_api import create_asgi_app
+
+app = create_asgi_app(flask_app)
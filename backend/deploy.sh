@@ -63,7 +63,7 @@ if [ "$AUTH_CHOICE" = "1" ]; then
         --region $REGION \
         --platform managed \
         --allow-unauthenticated \
-        --set-env-vars="ALERT_ENGINE_URL=$ALERT_ENGINE_URL,GCP_PROJECT=$PROJECT_ID" \
+        --set-env-vars="ALERT_ENGINE_URL=$ALERT_ENGINE_URL,GCP_PROJECT=$PROJECT_ID,LAZY_BOOT=true" \
         --project=$PROJECT_ID
 
 elif [ "$AUTH_CHOICE" = "2" ]; then
@@ -119,7 +119,7 @@ elif [ "$AUTH_CHOICE" = "2" ]; then
         --platform managed \
         --allow-unauthenticated \
         --set-secrets="GOOGLE_SERVICE_ACCOUNT_JSON=$SECRET_NAME:latest" \
-        --set-env-vars="ALERT_ENGINE_URL=$ALERT_ENGINE_URL,GCP_PROJECT=$PROJECT_ID" \
+        --set-env-vars="ALERT_ENGINE_URL=$ALERT_ENGINE_URL,GCP_PROJECT=$PROJECT_ID,LAZY_BOOT=true" \
         --project=$PROJECT_ID
 
 else
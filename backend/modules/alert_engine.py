@@ -3,20 +3,26 @@ Module Alert Engine - Déclencheur de l'alert-engine Cloud Function
 Gère l'authentification et les appels à l'alert-engine
 """
 
+import asyncio
 import os
 import json
 import logging
 import subprocess
-import requests
-from google.auth.transport.requests import Request
-from google.oauth2 import id_token, service_account
+from concurrent.futures import ThreadPoolExecutor
+from .metrics import outbound_request, outbound_request_async
+from .tracing import propagate, traced
 
 logger = logging.getLogger(__name__)
 
 # Configuration
 ALERT_ENGINE_URL = os.getenv('ALERT_ENGINE_URL', 'https://us-west1-agent-gcp-f6005.cloudfunctions.net/alert-engine')
 GOOGLE_SERVICE_ACCOUNT_JSON = os.getenv('GOOGLE_SERVICE_ACCOUNT_JSON')  # JSON du service account
+# L'alert-engine accepte {"tasks": [...]} et répond {"results": [...]} (sinon: un appel par task)
+ALERT_ENGINE_BATCH_ENDPOINT = os.getenv('ALERT_ENGINE_BATCH_ENDPOINT', 'false').lower() == 'true'
+ALERT_ENGINE_BATCH_SIZE = int(os.getenv('ALERT_ENGINE_BATCH_SIZE', '50'))  # Tasks par requête en mode batch
+ALERT_ENGINE_MAX_WORKERS = int(os.getenv('ALERT_ENGINE_MAX_WORKERS', '4'))  # Requêtes batch simultanées
 
+@traced('google.id_token')
 def get_google_id_token(target_audience: str) -> str:
     """
     Obtient un token d'identité Google pour authentifier l'appel à la Cloud Function
@@ -32,6 +38,9 @@ def get_google_id_token(target_audience: str) -> str:
     Returns:
         Le token JWT signé par Google
     """
+    from google.auth.transport.requests import Request
+    from google.oauth2 import id_token, service_account
+
     # Méthode 1: Service Account JSON depuis variable d'environnement (RECOMMANDÉ)
     if GOOGLE_SERVICE_ACCOUNT_JSON:
         try:
@@ -52,9 +61,9 @@ def get_google_id_token(target_audience: str) -> str:
             logger.info("✅ Token obtenu via GOOGLE_SERVICE_ACCOUNT_JSON")
             return token
         except json.JSONDecodeError as e:
-            logger.error(f"❌ Erreur parsing GOOGLE_SERVICE_ACCOUNT_JSON: {e}")
+            logger.error("❌ Erreur parsing GOOGLE_SERVICE_ACCOUNT_JSON: %s", e)
         except Exception as e:
-            logger.error(f"❌ Erreur service account: {e}")
+            logger.error("❌ Erreur service account: %s", e)
     
     # Méthode 2: Utiliser google.oauth2.id_token (pour GCP avec Application Default Credentials)
     try:
@@ -63,7 +72,7 @@ def get_google_id_token(target_audience: str) -> str:
         logger.info("✅ Token obtenu via google.oauth2.id_token (ADC)")
         return token
     except Exception as e:
-        logger.debug(f"Méthode id_token/ADC échouée: {e}")
+        logger.debug("Méthode id_token/ADC échouée: %s", e)
     
     # Méthode 3: Utiliser gcloud CLI (pour développement local)
     try:
@@ -78,11 +87,11 @@ def get_google_id_token(target_audience: str) -> str:
             logger.info("✅ Token obtenu via gcloud CLI")
             return token
         else:
-            logger.error(f"gcloud CLI erreur: {result.stderr}")
+            logger.error("gcloud CLI erreur: %s", result.stderr)
     except FileNotFoundError:
         logger.debug("gcloud CLI non trouvé")
     except Exception as e:
-        logger.debug(f"Erreur gcloud CLI: {e}")
+        logger.debug("Erreur gcloud CLI: %s", e)
     
     raise Exception(
         "Impossible d'obtenir un token Google ID. "
@@ -101,6 +110,8 @@ def trigger_alert_engine_scan(limit: int = 0, dry_run: bool = False) -> dict:
     Returns:
         La réponse JSON de l'alert-engine
     """
+    import requests
+
     try:
         # Obtenir le token d'authentification
         token = get_google_id_token(ALERT_ENGINE_URL)
@@ -118,14 +129,16 @@ def trigger_alert_engine_scan(limit: int = 0, dry_run: bool = False) -> dict:
             'Content-Type': 'application/json'
         }
         
-        logger.info(f"🚀 Déclenchement alert-engine (scan mode) - limit={limit}, dry_run={dry_run}")
-        response = requests.get(ALERT_ENGINE_URL, headers=headers, params=params, timeout=30)
+        logger.info("🚀 Déclenchement alert-engine (scan mode) - limit=%s, dry_run=%s", limit, dry_run)
+        response = outbound_request(
+            'alert_engine', 'GET', ALERT_ENGINE_URL, headers=headers, params=params, timeout=30
+        )
         response.raise_for_status()
         
         result = response.json()
-        logger.info(f"✅ Alert-engine scan terminé: {result.get('created_alerts', 0)} créées, "
-                   f"{result.get('skipped_existing', 0)} skipped, "
-                   f"{result.get('processed_tasks', 0)} tasks traitées")
+        logger.info("✅ Alert-engine scan terminé: %s créées, %s skipped, %s tasks traitées",
+                    result.get('created_alerts', 0), result.get('skipped_existing', 0),
+                    result.get('processed_tasks', 0))
         
         return result
         
@@ -137,14 +150,14 @@ def trigger_alert_engine_scan(limit: int = 0, dry_run: bool = False) -> dict:
             "message": "L'alert-engine n'a pas répondu dans les temps"
         }
     except requests.exceptions.RequestException as e:
-        logger.error(f"❌ Erreur HTTP lors de l'appel à l'alert-engine: {e}")
+        logger.error("❌ Erreur HTTP lors de l'appel à l'alert-engine: %s", e)
         return {
             "status": "error",
             "error": "http_error",
             "message": str(e)
         }
     except Exception as e:
-        logger.error(f"❌ Erreur inattendue lors du déclenchement de l'alert-engine: {e}")
+        logger.error("❌ Erreur inattendue lors du déclenchement de l'alert-engine: %s", e)
         return {
             "status": "error",
             "error": "unexpected_error",
@@ -164,6 +177,8 @@ def trigger_alert_engine_single_task(task_id: str, task: dict, dry_run: bool = F
     Returns:
         La réponse JSON de l'alert-engine
     """
+    import requests
+
     try:
         # Obtenir le token d'authentification
         token = get_google_id_token(ALERT_ENGINE_URL)
@@ -185,14 +200,16 @@ def trigger_alert_engine_single_task(task_id: str, task: dict, dry_run: bool = F
             'Content-Type': 'application/json'
         }
         
-        logger.info(f"🚀 Déclenchement alert-engine (single task) - task_id={task_id}, dry_run={dry_run}")
-        response = requests.post(ALERT_ENGINE_URL, headers=headers, json=payload, params=params, timeout=30)
+        logger.info("🚀 Déclenchement alert-engine (single task) - task_id=%s, dry_run=%s", task_id, dry_run)
+        response = outbound_request(
+            'alert_engine', 'POST', ALERT_ENGINE_URL, headers=headers, json=payload, params=params, timeout=30
+        )
         response.raise_for_status()
         
         result = response.json()
         summary = result.get('summary', {})
-        logger.info(f"✅ Alert-engine single task terminé: {len(summary.get('created', []))} créées, "
-                   f"{len(summary.get('skipped', []))} skipped")
+        logger.info("✅ Alert-engine single task terminé: %d créées, %d skipped",
+                    len(summary.get('created', [])), len(summary.get('skipped', [])))
         
         return result
         
@@ -204,16 +221,366 @@ def trigger_alert_engine_single_task(task_id: str, task: dict, dry_run: bool = F
             "message": "L'alert-engine n'a pas répondu dans les temps"
         }
     except requests.exceptions.RequestException as e:
-        logger.error(f"❌ Erreur HTTP lors de l'appel à l'alert-engine: {e}")
+        logger.error("❌ Erreur HTTP lors de l'appel à l'alert-engine: %s", e)
         return {
             "status": "error",
             "error": "http_error",
             "message": str(e)
         }
     except Exception as e:
-        logger.error(f"❌ Erreur inattendue lors du déclenchement de l'alert-engine: {e}")
+        logger.error("❌ Erreur inattendue lors du déclenchement de l'alert-engine: %s", e)
         return {
             "status": "error",
             "error": "unexpected_error",
             "message": str(e)
         }
+
+
+
+def _chunk_error_results(chunk: list, error: str, message: str) -> list:
+    """Construit un résultat en erreur pour chaque task d'un lot"""
+    return [
+        {
+            "task_id": item.get('task_id'),
+            "status": "error",
+            "created": [],
+            "skipped": [],
+            "error": error,
+            "message": message
+        }
+        for item in chunk
+    ]
+
+
+def _alert_engine_request_error(e: Exception):
+    """(code, message) d'une erreur d'appel synchrone à l'alert-engine"""
+    import requests
+
+    if isinstance(e, requests.exceptions.Timeout):
+        return "timeout", "L'alert-engine n'a pas répondu dans les temps"
+    if isinstance(e, requests.exceptions.RequestException):
+        return "http_error", str(e)
+    return "unexpected_error", str(e)
+
+
+def _post_alert_engine(token: str, payload: dict, dry_run: bool = False) -> dict:
+    """POST vers l'alert-engine, retourne la réponse JSON (lève en cas d'erreur)"""
+    params = {}
+    if dry_run:
+        params['dry_run'] = 'true'
+
+    headers = {
+        'Authorization': f'Bearer {token}',
+        'Content-Type': 'application/json'
+    }
+
+    response = outbound_request(
+        'alert_engine', 'POST',
+        ALERT_ENGINE_URL,
+        headers=headers,
+        json=payload,
+        params=params,
+        timeout=30
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def _send_alert_engine_task(token: str, item: dict, dry_run: bool = False) -> list:
+    """Envoie une task seule (contrat single task) et retourne son résultat dans une liste"""
+    try:
+        result = _post_alert_engine(token, item, dry_run=dry_run)
+    except Exception as e:
+        error, message = _alert_engine_request_error(e)
+        logger.error("❌ Erreur lors de l'appel à l'alert-engine pour %s: %s", item.get('task_id'), message)
+        return _chunk_error_results([item], error, message)
+
+    return [_task_result(item.get('task_id'), result)]
+
+
+def _send_alert_engine_chunk(token: str, chunk: list, dry_run: bool = False) -> list:
+    """
+    Envoie un lot de tasks à l'alert-engine en une seule requête
+
+    Le payload est {"tasks": [{"task_id": ..., "task": {...}}, ...]} et
+    l'alert-engine répond avec {"results": [{"task_id": ..., "summary": {...}}]}.
+    Si la réponse ne contient pas de "results" (alert-engine sans contrat
+    batch), les tasks du lot sont renvoyées une par une.
+
+    Returns:
+        La liste des résultats par task (created/skipped), une entrée par task du lot
+    """
+    try:
+        result = _post_alert_engine(token, {'tasks': chunk}, dry_run=dry_run)
+    except Exception as e:
+        error, message = _alert_engine_request_error(e)
+        logger.error("❌ Erreur lors de l'appel batch à l'alert-engine (%s tasks): %s", len(chunk), message)
+        return _chunk_error_results(chunk, error, message)
+
+    if not isinstance(result.get('results'), list):
+        logger.warning("⚠️ Réponse batch sans 'results', envoi des %s tasks une par une", len(chunk))
+        return [task_result for item in chunk for task_result in _send_alert_engine_task(token, item, dry_run)]
+
+    return _chunk_results(chunk, result)
+
+
+def _task_result(task_id: str, task_result: dict) -> dict:
+    """Résultat created/skipped d'une task à partir de la réponse de l'alert-engine"""
+    summary = task_result.get('summary', {})
+    return {
+        "task_id": task_id,
+        "status": task_result.get('status', 'ok'),
+        "created": summary.get('created', []),
+        "skipped": summary.get('skipped', [])
+    }
+
+
+def _chunk_results(chunk: list, result: dict) -> list:
+    """Associe la réponse de l'alert-engine à chaque task du lot (created/skipped)"""
+    # Indexer les résultats renvoyés par task_id
+    results_by_task = {}
+    for task_result in result.get('results', []):
+        results_by_task[task_result.get('task_id')] = task_result
+
+    results = []
+    for item in chunk:
+        task_id = item.get('task_id')
+        task_result = results_by_task.get(task_id)
+
+        if task_result is None:
+            results.append({
+                "task_id": task_id,
+                "status": "error",
+                "created": [],
+                "skipped": [],
+                "error": "missing_result",
+                "message": "Aucun résultat retourné par l'alert-engine pour cette task"
+            })
+            continue
+
+        results.append(_task_result(task_id, task_result))
+
+    return results
+
+
+def trigger_alert_engine_batch(tasks: list, dry_run: bool = False) -> dict:
+    """
+    Déclenche l'alert-engine pour une liste de tasks (mode batch)
+
+    Avec ALERT_ENGINE_BATCH_ENDPOINT, les tasks sont envoyées par lots de
+    ALERT_ENGINE_BATCH_SIZE; sinon une requête single task par task. Au plus
+    ALERT_ENGINE_MAX_WORKERS requêtes simultanées, token obtenu une seule fois.
+
+    Args:
+        tasks: Liste de {"task_id": "...", "task": {...}}
+        dry_run: Si True, simule sans créer d'alerte
+
+    Returns:
+        Un résumé global et le détail created/skipped par task
+    """
+    if not tasks:
+        return _empty_batch_result()
+
+    try:
+        token = get_google_id_token(ALERT_ENGINE_URL)
+    except Exception as e:
+        logger.error("❌ Erreur inattendue lors du déclenchement de l'alert-engine: %s", e)
+        return {
+            "status": "error",
+            "error": "unexpected_error",
+            "message": str(e)
+        }
+
+    chunks = _batch_chunks(tasks)
+    send = _send_alert_engine_chunk if ALERT_ENGINE_BATCH_ENDPOINT else \
+        lambda token, chunk, dry_run: _send_alert_engine_task(token, chunk[0], dry_run)
+
+    logger.info("🚀 Déclenchement alert-engine (batch) - %d tasks, %d requêtes, dry_run=%s",
+                len(tasks), len(chunks), dry_run)
+
+    max_workers = max(1, min(ALERT_ENGINE_MAX_WORKERS, len(chunks)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Un contexte copié par requête: ID de requête et span conservés dans les threads
+        futures = [executor.submit(propagate(send), token, chunk, dry_run) for chunk in chunks]
+        chunk_results = [future.result() for future in futures]
+
+    return _batch_summary(chunk_results)
+
+
+def _batch_chunks(tasks: list) -> list:
+    """Découpe les tasks en requêtes: lots de ALERT_ENGINE_BATCH_SIZE, ou une task par requête"""
+    batch_size = max(1, ALERT_ENGINE_BATCH_SIZE) if ALERT_ENGINE_BATCH_ENDPOINT else 1
+    return [tasks[i:i + batch_size] for i in range(0, len(tasks), batch_size)]
+
+
+def _empty_batch_result() -> dict:
+    return {
+        "status": "ok",
+        "processed_tasks": 0,
+        "created_alerts": 0,
+        "skipped_existing": 0,
+        "errors": 0,
+        "results": []
+    }
+
+
+def _batch_summary(chunk_results: list) -> dict:
+    """Résumé global d'un déclenchement batch à partir des résultats de chaque lot"""
+    results = [task_result for chunk in chunk_results for task_result in chunk]
+    created = sum(len(r['created']) for r in results)
+    skipped = sum(len(r['skipped']) for r in results)
+    errors = sum(1 for r in results if r['status'] == 'error')
+
+    if errors == 0:
+        status = "ok"
+    elif errors < len(results):
+        status = "partial"
+    else:
+        status = "error"
+
+    logger.info("✅ Alert-engine batch terminé: %d créées, %d skipped, %d erreurs sur %d tasks",
+                created, skipped, errors, len(results))
+
+    return {
+        "status": status,
+        "processed_tasks": len(results),
+        "created_alerts": created,
+        "skipped_existing": skipped,
+        "errors": errors,
+        "chunks": len(chunk_results),
+        "results": results
+    }
+
+
+# ============================================================================
+# VARIANTES ASYNC (routes de asgi.py)
+# ============================================================================
+
+async def _alert_engine_request_async(token: str, method: str, **kwargs) -> dict:
+    """Appelle l'alert-engine avec le client httpx partagé et retourne la réponse JSON"""
+    headers = {
+        'Authorization': f'Bearer {token}',
+        'Content-Type': 'application/json'
+    }
+    response = await outbound_request_async(
+        'alert_engine', method, ALERT_ENGINE_URL, headers=headers, timeout=30, **kwargs
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def _alert_engine_error(e: Exception) -> dict:
+    """Résultat en erreur d'un appel async à l'alert-engine (mêmes codes que les appels synchrones)"""
+    import httpx
+
+    if isinstance(e, httpx.TimeoutException):
+        logger.error("❌ Timeout lors de l'appel à l'alert-engine")
+        return {
+            "status": "error",
+            "error": "timeout",
+            "message": "L'alert-engine n'a pas répondu dans les temps"
+        }
+    if isinstance(e, httpx.HTTPError):
+        logger.error("❌ Erreur HTTP lors de l'appel à l'alert-engine: %s", e)
+        return {
+            "status": "error",
+            "error": "http_error",
+            "message": str(e)
+        }
+    logger.error("❌ Erreur inattendue lors du déclenchement de l'alert-engine: %s", e)
+    return {
+        "status": "error",
+        "error": "unexpected_error",
+        "message": str(e)
+    }
+
+
+async def trigger_alert_engine_scan_async(limit: int = 0, dry_run: bool = False) -> dict:
+    """Équivalent async de trigger_alert_engine_scan (le token est obtenu dans un thread)"""
+    try:
+        token = await asyncio.to_thread(get_google_id_token, ALERT_ENGINE_URL)
+
+        params = {}
+        if limit > 0:
+            params['limit'] = limit
+        if dry_run:
+            params['dry_run'] = 'true'
+
+        logger.info("🚀 Déclenchement alert-engine (scan mode, async) - limit=%s, dry_run=%s", limit, dry_run)
+        result = await _alert_engine_request_async(token, 'GET', params=params)
+        logger.info("✅ Alert-engine scan terminé: %s créées, %s skipped, %s tasks traitées",
+                    result.get('created_alerts', 0), result.get('skipped_existing', 0),
+                    result.get('processed_tasks', 0))
+        return result
+
+    except Exception as e:
+        return _alert_engine_error(e)
+
+
+async def trigger_alert_engine_single_task_async(task_id: str, task: dict, dry_run: bool = False) -> dict:
+    """Équivalent async de trigger_alert_engine_single_task"""
+    try:
+        token = await asyncio.to_thread(get_google_id_token, ALERT_ENGINE_URL)
+
+        params = {}
+        if dry_run:
+            params['dry_run'] = 'true'
+
+        logger.info("🚀 Déclenchement alert-engine (single task, async) - task_id=%s, dry_run=%s", task_id, dry_run)
+        result = await _alert_engine_request_async(
+            token, 'POST', json={'task_id': task_id, 'task': task}, params=params
+        )
+        summary = result.get('summary', {})
+        logger.info("✅ Alert-engine single task terminé: %d créées, %d skipped",
+                    len(summary.get('created', [])), len(summary.get('skipped', [])))
+        return result
+
+    except Exception as e:
+        return _alert_engine_error(e)
+
+
+async def trigger_alert_engine_batch_async(tasks: list, dry_run: bool = False) -> dict:
+    """
+    Équivalent async de trigger_alert_engine_batch
+
+    Les requêtes (lots ou tasks seules) sont envoyées en coroutines, au plus
+    ALERT_ENGINE_MAX_WORKERS à la fois.
+    """
+    if not tasks:
+        return _empty_batch_result()
+
+    try:
+        token = await asyncio.to_thread(get_google_id_token, ALERT_ENGINE_URL)
+    except Exception as e:
+        return _alert_engine_error(e)
+
+    params = {'dry_run': 'true'} if dry_run else {}
+    chunks = _batch_chunks(tasks)
+    semaphore = asyncio.Semaphore(max(1, ALERT_ENGINE_MAX_WORKERS))
+
+    logger.info("🚀 Déclenchement alert-engine (batch, async) - %d tasks, %d requêtes, dry_run=%s",
+                len(tasks), len(chunks), dry_run)
+
+    async def send_task(item):
+        try:
+            result = await _alert_engine_request_async(token, 'POST', json=item, params=params)
+        except Exception as e:
+            error = _alert_engine_error(e)
+            return _chunk_error_results([item], error["error"], error["message"])
+        return [_task_result(item.get('task_id'), result)]
+
+    async def send_chunk(chunk):
+        async with semaphore:
+            if not ALERT_ENGINE_BATCH_ENDPOINT:
+                return await send_task(chunk[0])
+            try:
+                result = await _alert_engine_request_async(token, 'POST', json={'tasks': chunk}, params=params)
+            except Exception as e:
+                error = _alert_engine_error(e)
+                return _chunk_error_results(chunk, error["error"], error["message"])
+            if not isinstance(result.get('results'), list):
+                logger.warning("⚠️ Réponse batch sans 'results', envoi des %s tasks une par une", len(chunk))
+                return [task_result for item in chunk for task_result in await send_task(item)]
+            return _chunk_results(chunk, result)
+
+    return _batch_summary(await asyncio.gather(*(send_chunk(chunk) for chunk in chunks)))
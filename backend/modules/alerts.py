@@ -4,19 +4,18 @@ Auteur: Système d'alertes
 """
 
 from flask import Blueprint, request, jsonify
-from google.cloud import firestore
-from google.auth.transport.requests import Request
-from google.oauth2 import service_account
-import google.auth.transport.requests
-import google.auth
+import asyncio
 import time
-import requests
 import threading
 import logging
 import os
 from datetime import datetime
 import json
-from .alert_engine import trigger_alert_engine_scan, trigger_alert_engine_single_task
+from .alert_engine import trigger_alert_engine_scan, trigger_alert_engine_single_task, trigger_alert_engine_batch
+from .firestore_client import async_firestore_client, lazy_firestore_client, operation_async, stream_async
+from .health import firestore_probe
+from .metrics import outbound_request, outbound_request_async
+from .tracing import propagate, traced
 
 # Créer le blueprint pour les alertes
 alerts_bp = Blueprint('alerts', __name__)
@@ -33,19 +32,22 @@ MAX_ALERTS = int(os.getenv('MAX_ALERTS', '50'))
 CALL_TIMEOUT_SECONDS = int(os.getenv('CALL_TIMEOUT_SECONDS', '30'))
 GCP_PROJECT = os.getenv('GCP_PROJECT')
 
-# Initialize Firestore pour les alertes
-db = None
-if GCP_PROJECT:
-    try:
-        db = firestore.Client(project=GCP_PROJECT)
-        logger.info(f"✅ Firestore initialisé pour le projet: {GCP_PROJECT}")
-    except Exception as e:
-        logger.error(f"❌ Erreur Firestore: {e}")
+# Initialize Firestore pour les alertes (construit à la première utilisation si LAZY_BOOT)
+def _create_db():
+    if not GCP_PROJECT:
+        return None
+    from google.cloud import firestore
+    client = firestore.Client(project=GCP_PROJECT)
+    logger.info("✅ Firestore initialisé pour le projet: %s", GCP_PROJECT)
+    return client
+
+db = lazy_firestore_client(_create_db, 'alerts')
 
 # ============================================================================
 # FONCTIONS UTILITAIRES ALERTES
 # ============================================================================
 
+@traced('google.id_token')
 def get_id_token():
     """Obtient un ID token pour authentifier les appels vers alert-engine"""
     
@@ -57,6 +59,9 @@ def get_id_token():
         return None
     
     try:
+        import google.auth
+        import google.auth.transport.requests
+
         # Sur Google Cloud - utiliser les credentials par défaut
         credentials, project = google.auth.default()
         
@@ -94,7 +99,7 @@ def get_id_token():
         return credentials.token
         
     except Exception as e:
-        logger.error(f"Erreur lors de l'obtention de l'ID token: {e}")
+        logger.error("Erreur lors de l'obtention de l'ID token: %s", e)
         return None
 
 def get_last_refresh():
@@ -111,7 +116,7 @@ def get_last_refresh():
             return data.get('last_refresh_ts', 0)
         return 0
     except Exception as e:
-        logger.error(f"Erreur lors de la récupération du last_refresh: {e}")
+        logger.error("Erreur lors de la récupération du last_refresh: %s", e)
         return 0
 
 def update_last_refresh():
@@ -127,11 +132,12 @@ def update_last_refresh():
         logger.info("last_refresh_ts mis à jour")
         return True
     except Exception as e:
-        logger.error(f"Erreur lors de la mise à jour du last_refresh: {e}")
+        logger.error("Erreur lors de la mise à jour du last_refresh: %s", e)
         return False
 
 def trigger_alert_engine_background():
     """Déclenche alert-engine en arrière-plan (fire-and-forget)"""
+    @traced('alert_engine.background')
     def make_request():
         try:
             id_token = get_id_token()
@@ -145,9 +151,10 @@ def trigger_alert_engine_background():
                 'Authorization': f'Bearer {id_token}'
             }
             
-            logger.info(f"☁️ Déclenchement de alert-engine en background: {ALERT_ENGINE_URL}")
+            logger.info("☁️ Déclenchement de alert-engine en background: %s", ALERT_ENGINE_URL)
             
-            response = requests.post(
+            response = outbound_request(
+                'alert_engine', 'POST',
                 ALERT_ENGINE_URL,
                 headers=headers,
                 json={},  # Corps JSON vide
@@ -157,13 +164,13 @@ def trigger_alert_engine_background():
             if response.status_code == 200:
                 logger.info("Alert-engine déclenché avec succès en background")
             else:
-                logger.error(f"Erreur alert-engine background: {response.status_code} - {response.text}")
+                logger.error("Erreur alert-engine background: %s - %s", response.status_code, response.text)
                 
         except Exception as e:
-            logger.error(f"Erreur lors du déclenchement background de alert-engine: {e}")
+            logger.error("Erreur lors du déclenchement background de alert-engine: %s", e)
     
     # Lancer dans un thread séparé
-    thread = threading.Thread(target=make_request)
+    thread = threading.Thread(target=propagate(make_request))
     thread.daemon = True
     thread.start()
 
@@ -181,9 +188,10 @@ def trigger_alert_engine_sync():
             'Authorization': f'Bearer {id_token}'
         }
         
-        logger.info(f"☁️ Déclenchement de alert-engine en mode sync: {ALERT_ENGINE_URL}")
+        logger.info("☁️ Déclenchement de alert-engine en mode sync: %s", ALERT_ENGINE_URL)
         
-        response = requests.post(
+        response = outbound_request(
+            'alert_engine', 'POST',
             ALERT_ENGINE_URL,
             headers=headers,
             json={},  # Corps JSON vide, comme dans les tests réussis
@@ -197,37 +205,199 @@ def trigger_alert_engine_sync():
             except:
                 return {"status": "success", "message": "Scan completed"}
         else:
-            logger.error(f"Erreur alert-engine sync: {response.status_code} - {response.text}")
+            logger.error("Erreur alert-engine sync: %s - %s", response.status_code, response.text)
             return {"error": f"HTTP {response.status_code}", "message": response.text}
             
     except Exception as e:
-        logger.error(f"Erreur lors du déclenchement sync de alert-engine: {e}")
+        logger.error("Erreur lors du déclenchement sync de alert-engine: %s", e)
         return {"error": str(e)}
 
+def alerts_query(client):
+    """Requête des alertes les plus récentes (client synchrone ou firestore.AsyncClient)"""
+    # Trier par received_at desc, limiter le nombre
+    return client.collection('alerts')\
+        .order_by('received_at', direction='DESCENDING')\
+        .limit(MAX_ALERTS)
+
+def alert_list(docs):
+    """Alertes (avec l'ID de leur document) à partir des documents lus"""
+    alerts = []
+    for doc in docs:
+        alert_data = doc.to_dict()
+        alert_data['id'] = doc.id  # Ajouter l'ID du document
+        alerts.append(alert_data)
+    return alerts
+
 def get_alerts_from_firestore():
     """Récupère les alertes depuis Firestore"""
     if not db:
         logger.warning("Firestore non initialisé, retour de données vides")
         return []
-        
+
     try:
-        alerts_ref = db.collection('alerts')
-        
-        # Trier par received_at desc, limiter le nombre
-        query = alerts_ref.order_by('received_at', direction=firestore.Query.DESCENDING).limit(MAX_ALERTS)
-        docs = query.stream()
+        alerts = alert_list(alerts_query(db).stream())
         
-        alerts = []
-        for doc in docs:
-            alert_data = doc.to_dict()
-            alert_data['id'] = doc.id  # Ajouter l'ID du document
-            alerts.append(alert_data)
-        
-        logger.info(f"Récupéré {len(alerts)} alertes depuis Firestore")
+        logger.info("Récupéré %d alertes depuis Firestore", len(alerts))
         return alerts
         
     except Exception as e:
-        logger.error(f"Erreur lors de la récupération des alertes: {e}")
+        logger.error("Erreur lors de la récupération des alertes: %s", e)
+        return []
+
+def refresh_state(last_refresh, ttl_override=None):
+    """
+    Position par rapport au TTL de refresh (metadata de GET /alerts/)
+
+    Un refresh est dû quand time_since_refresh >= ttl.
+    """
+    # Utiliser le TTL override si fourni, sinon la valeur par défaut
+    effective_ttl = ttl_override if ttl_override is not None else ALERT_REFRESH_TTL
+    current_time = int(time.time())
+    return {
+        "last_refresh": last_refresh,
+        "time_since_refresh": current_time - last_refresh,
+        "ttl": effective_ttl,
+        "timestamp": current_time
+    }
+
+def alerts_response(alerts, state, triggered, trigger_mode, scan_result, mode):
+    """Corps de réponse de GET /alerts/"""
+    response_data = {
+        "alerts": alerts,
+        "triggered": triggered,
+        "trigger_mode": trigger_mode,
+        "metadata": {"count": len(alerts), **state, "mode": mode}
+    }
+
+    # Ajouter scan_result seulement si présent (mode sync)
+    if scan_result is not None:
+        response_data["scan_result"] = scan_result
+    return response_data
+
+def parse_trigger_body(body):
+    """
+    Mode de POST /alerts/trigger d'après le corps de la requête
+
+    Returns:
+        ('batch', [{task_id, task}, ...]), ('single_task', (task_id, task)) ou ('scan', None)
+
+    Raises:
+        ValueError: corps invalide pour le mode demandé
+    """
+    if 'tasks' in body:
+        tasks = body.get('tasks')
+
+        if not isinstance(tasks, list) or not all(
+            isinstance(item, dict) and item.get('task_id') for item in tasks
+        ):
+            raise ValueError('tasks doit être une liste de {task_id, task}')
+
+        return 'batch', [{'task_id': item['task_id'], 'task': item.get('task', {})} for item in tasks]
+
+    if body.get('task_id') or body.get('task'):
+        if not body.get('task_id'):
+            raise ValueError('task_id requis pour le mode single task')
+        return 'single_task', (body['task_id'], body.get('task', {}))
+
+    return 'scan', None
+
+def trigger_response(mode, result):
+    """Corps de réponse de POST /alerts/trigger"""
+    return {
+        'success': result.get('status') == 'ok',
+        'mode': mode,
+        'result': result,
+        'timestamp': datetime.now().isoformat()
+    }
+
+# ============================================================================
+# VARIANTES ASYNC (routes de asgi.py)
+# ============================================================================
+
+# Déclenchements en arrière-plan en cours (référence gardée jusqu'à la fin de la tâche)
+_background_triggers = set()
+
+async def get_last_refresh_async():
+    """Équivalent async de get_last_refresh"""
+    try:
+        reference = async_firestore_client().collection('_meta').document('alerts_refresh')
+        doc = await operation_async(reference, '_meta', 'get')
+        if doc.exists:
+            return doc.to_dict().get('last_refresh_ts', 0)
+        return 0
+    except Exception as e:
+        logger.error("Erreur lors de la récupération du last_refresh: %s", e)
+        return 0
+
+async def update_last_refresh_async():
+    """Équivalent async de update_last_refresh"""
+    try:
+        reference = async_firestore_client().collection('_meta').document('alerts_refresh')
+        await operation_async(reference, '_meta', 'set', {'last_refresh_ts': int(time.time())}, merge=True)
+        logger.info("last_refresh_ts mis à jour")
+        return True
+    except Exception as e:
+        logger.error("Erreur lors de la mise à jour du last_refresh: %s", e)
+        return False
+
+async def trigger_alert_engine_async():
+    """Équivalent async de trigger_alert_engine_sync (l'ID token est obtenu dans un thread)"""
+    try:
+        id_token = await asyncio.to_thread(get_id_token)
+
+        if not id_token:
+            logger.info("🏠 Mode local - Alert-engine non déclenché (normal en développement)")
+            return {"status": "skipped", "reason": "local_development"}
+
+        headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {id_token}'
+        }
+
+        logger.info("☁️ Déclenchement de alert-engine en mode async: %s", ALERT_ENGINE_URL)
+
+        response = await outbound_request_async(
+            'alert_engine', 'POST',
+            ALERT_ENGINE_URL,
+            headers=headers,
+            json={},
+            timeout=CALL_TIMEOUT_SECONDS
+        )
+
+        if response.status_code == 200:
+            logger.info("Alert-engine déclenché avec succès en mode async")
+            try:
+                return response.json()
+            except ValueError:
+                return {"status": "success", "message": "Scan completed"}
+        else:
+            logger.error("Erreur alert-engine async: %s - %s", response.status_code, response.text)
+            return {"error": f"HTTP {response.status_code}", "message": response.text}
+
+    except Exception as e:
+        logger.error("Erreur lors du déclenchement async de alert-engine: %s", e)
+        return {"error": str(e)}
+
+def trigger_alert_engine_background_async():
+    """Équivalent async de trigger_alert_engine_background: une tâche de la boucle, pas un thread"""
+    task = asyncio.get_running_loop().create_task(trigger_alert_engine_async())
+    _background_triggers.add(task)
+    task.add_done_callback(_background_triggers.discard)
+
+async def get_alerts_async():
+    """Équivalent async de get_alerts_from_firestore"""
+    if not await asyncio.to_thread(bool, db):
+        logger.warning("Firestore non initialisé, retour de données vides")
+        return []
+
+    try:
+        alerts = alert_list(await stream_async(alerts_query(async_firestore_client()), 'alerts'))
+
+        logger.info("Récupéré %d alertes depuis Firestore", len(alerts))
+        return alerts
+
+    except Exception as e:
+        logger.error("Erreur lors de la récupération des alertes: %s", e)
         return []
 
 # ============================================================================
@@ -242,15 +412,9 @@ def get_alerts():
         sync_mode = request.args.get('sync', 'false').lower() == 'true'
         ttl_override = request.args.get('ttl_override', type=int)
         
-        # Utiliser le TTL override si fourni, sinon la valeur par défaut
-        effective_ttl = ttl_override if ttl_override is not None else ALERT_REFRESH_TTL
-        
         # Vérifier si nous devons déclencher un refresh
-        current_time = int(time.time())
-        last_refresh = get_last_refresh()
-        time_since_refresh = current_time - last_refresh
-        
-        should_trigger = time_since_refresh >= effective_ttl
+        state = refresh_state(get_last_refresh(), ttl_override)
+        should_trigger = state["time_since_refresh"] >= state["ttl"]
         
         triggered = False
         trigger_mode = None
@@ -265,46 +429,29 @@ def get_alerts():
                     # Mode synchrone
                     trigger_mode = "sync"
                     scan_result = trigger_alert_engine_sync()
-                    logger.info(f"Alert-engine déclenché en mode sync")
+                    logger.info("Alert-engine déclenché en mode sync")
                 else:
                     # Mode background
                     trigger_mode = "background"
                     trigger_alert_engine_background()
-                    logger.info(f"Alert-engine déclenché en background")
+                    logger.info("Alert-engine déclenché en background")
             else:
                 logger.error("Impossible de mettre à jour last_refresh_ts")
         else:
             if not ALERT_ENGINE_URL:
                 logger.warning("ALERT_ENGINE_URL non configuré, pas de déclenchement")
             else:
-                logger.info(f"Trigger ignoré - dans le TTL (derniers {time_since_refresh}s < {effective_ttl}s)")
+                logger.info("Trigger ignoré - dans le TTL (derniers %ss < %ss)", state["time_since_refresh"], state["ttl"])
         
         # Récupérer les alertes depuis Firestore
         alerts = get_alerts_from_firestore()
         
-        # Préparer la réponse
-        response_data = {
-            "alerts": alerts,
-            "triggered": triggered,
-            "trigger_mode": trigger_mode,
-            "metadata": {
-                "count": len(alerts),
-                "last_refresh": last_refresh,
-                "time_since_refresh": time_since_refresh,
-                "ttl": effective_ttl,
-                "timestamp": current_time,
-                "mode": "firestore" if db else "offline"
-            }
-        }
-        
-        # Ajouter scan_result seulement si présent (mode sync)
-        if scan_result is not None:
-            response_data["scan_result"] = scan_result
-        
-        return jsonify(response_data)
+        return jsonify(alerts_response(
+            alerts, state, triggered, trigger_mode, scan_result, "firestore" if db else "offline"
+        ))
         
     except Exception as e:
-        logger.error(f"Erreur dans /alerts: {e}")
+        logger.error("Erreur dans /alerts: %s", e)
         return jsonify({
             "error": str(e),
             "alerts": [],
@@ -317,7 +464,7 @@ def get_alerts():
 def alerts_health():
     """Health check spécifique au module alertes"""
     config_status = {
-        "firestore": db is not None,
+        "firestore": bool(db),
         "alert_engine": ALERT_ENGINE_URL is not None,
         "gcp_project": GCP_PROJECT is not None
     }
@@ -343,7 +490,7 @@ def alerts_config():
         "version": "1.0.0",
         "gcp_project": GCP_PROJECT,
         "alert_engine_configured": ALERT_ENGINE_URL is not None,
-        "firestore_connected": db is not None,
+        "firestore_connected": bool(db),
         "settings": {
             "alert_refresh_ttl": ALERT_REFRESH_TTL,
             "max_alerts": MAX_ALERTS,
@@ -375,43 +522,32 @@ def trigger_alert_engine():
         limit = request.args.get('limit', type=int, default=0)
         dry_run = request.args.get('dry_run', '').lower() in ('true', '1', 'yes')
         
-        # Vérifier si c'est un appel single task
+        # Mode d'après le corps: batch (tasks), single task (task_id) ou scan
         body = request.get_json(silent=True) or {}
         
-        if body.get('task_id') or body.get('task'):
-            # Mode single task
-            task_id = body.get('task_id')
-            task = body.get('task', {})
-            
-            if not task_id:
-                return jsonify({
-                    'success': False,
-                    'error': 'task_id requis pour le mode single task'
-                }), 400
-            
-            logger.info(f"🔥 Déclenchement alert-engine (single task): {task_id}")
-            result = trigger_alert_engine_single_task(task_id, task, dry_run=dry_run)
-            
+        try:
+            mode, params = parse_trigger_body(body)
+        except ValueError as e:
             return jsonify({
-                'success': result.get('status') == 'ok',
-                'mode': 'single_task',
-                'result': result,
-                'timestamp': datetime.now().isoformat()
-            })
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        if mode == 'batch':
+            logger.info("🔥 Déclenchement alert-engine (batch): %s tasks", len(params))
+            result = trigger_alert_engine_batch(params, dry_run=dry_run)
+        elif mode == 'single_task':
+            task_id, task = params
+            logger.info("🔥 Déclenchement alert-engine (single task): %s", task_id)
+            result = trigger_alert_engine_single_task(task_id, task, dry_run=dry_run)
         else:
-            # Mode scan
-            logger.info(f"🔥 Déclenchement alert-engine (scan mode) - limit={limit}")
+            logger.info("🔥 Déclenchement alert-engine (scan mode) - limit=%s", limit)
             result = trigger_alert_engine_scan(limit=limit, dry_run=dry_run)
-            
-            return jsonify({
-                'success': result.get('status') == 'ok',
-                'mode': 'scan',
-                'result': result,
-                'timestamp': datetime.now().isoformat()
-            })
+        
+        return jsonify(trigger_response(mode, result))
             
     except Exception as e:
-        logger.error(f"❌ Erreur lors du déclenchement de l'alert-engine: {e}")
+        logger.error("❌ Erreur lors du déclenchement de l'alert-engine: %s", e)
         return jsonify({
             'success': False,
             'error': str(e),
@@ -429,12 +565,13 @@ def test_firestore():
         return jsonify({"error": "Firestore non initialisé"}), 500
     
     try:
-        # Test simple de lecture
-        collections = list(db.collections())
+        # Lecture d'un seul document (même sonde que /health)
+        debut = time.monotonic()
+        firestore_probe(db)()
         return jsonify({
             "status": "success",
             "message": "Connexion Firestore OK",
-            "collections_count": len(collections)
+            "latency_ms": round((time.monotonic() - debut) * 1000, 1)
         })
     except Exception as e:
         return jsonify({
@@ -0,0 +1,469 @@
+"""
+Module Async API - Variante ASGI des routes qui attendent Firestore ou un service lent
+Servie par hypercorn (asgi.py): ces routes sont des coroutines (firestore.AsyncClient,
+client httpx partagé), une instance peut donc attendre des milliers d'appels lents
+(scans alert-engine, questions à l'agent fiscal) sans bloquer un thread par requête.
+Toutes les autres routes sont transmises à l'application Flask, exécutée dans son
+propre pool de threads (distinct de celui de asyncio.to_thread, pour qu'une route
+Flask lente ne retarde pas les routes async). Mêmes chemins, mêmes réponses et mêmes hooks que l'application Flask
+(X-Request-Id, traces, /metrics, Server-Timing, authentification, CORS).
+"""
+
+from werkzeug.datastructures import Headers, MultiDict
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import Map, Rule
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from urllib.parse import parse_qsl
+import asyncio
+import json
+import logging
+import os
+import time
+from .alert_engine import (
+    trigger_alert_engine_batch_async, trigger_alert_engine_scan_async, trigger_alert_engine_single_task_async
+)
+from .alerts import (
+    ALERT_ENGINE_URL, alerts_response, get_alerts_async, get_last_refresh_async, parse_trigger_body,
+    refresh_state, trigger_alert_engine_async, trigger_alert_engine_background_async, trigger_response,
+    update_last_refresh_async
+)
+from .alerts import db as alerts_db
+from .auth_middleware import AUTH_REQUIRED, bearer_token, decode_token, is_public_path
+from .company_settings import get_company_settings_async
+from .firestore_client import async_firestore_client, stream_async
+from .metrics import close_async_http_client, observe_request
+from .request_accounting import accounting_headers, log_accounting, start_accounting, stop_accounting
+from .structured_logging import bind_request_id, request_id_from_headers, unbind_request_id
+from .tasks import compute_task_stats, org_task_list, org_tasks_query
+from .tasks import db as tasks_db
+from .tracing import end_server_span, set_server_span_route, start_server_span
+from .veille import agent_fiscal_answers_async, build_questions, build_veille_alertes, save_veille_alertes, \
+    veille_alertes_list, veille_alertes_query
+from . import veille
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+ASYNC_WSGI_THREADS = int(os.getenv('ASYNC_WSGI_THREADS', '8'))  # Threads des routes Flask (non async)
+ASYNC_BLOCKING_THREADS = int(os.getenv('ASYNC_BLOCKING_THREADS', '8'))  # Threads de asyncio.to_thread
+MAX_BODY_SIZE = 16 * 1024 * 1024  # Comme MAX_CONTENT_LENGTH de app.py
+
+_routes = []
+
+def route(rule: str, methods):
+    """Déclare une route async (règle werkzeug, même syntaxe que @app.route)"""
+    def decorator(func):
+        _routes.append(Rule(rule, endpoint=func, methods=methods))
+        return func
+    return decorator
+
+# ============================================================================
+# APPLICATION ASGI
+# ============================================================================
+
+class BodyTooLarge(Exception):
+    pass
+
+
+class AsyncRequest:
+    """Requête entrante (sous-ensemble de flask.Request utilisé par les routes async)"""
+
+    def __init__(self, scope, body: bytes):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.query_string = scope.get('query_string', b'').decode('latin-1')
+        self.headers = Headers([(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']])
+        self.args = MultiDict(parse_qsl(self.query_string, keep_blank_values=True))
+        self.body = body
+        self.user = None
+
+    @property
+    def full_path(self):
+        return f"{self.path}?{self.query_string}" if self.query_string else self.path
+
+    def get_json(self, silent=False):
+        """Corps JSON décodé (None si vide); avec silent=True, None si le corps est invalide"""
+        if not self.body:
+            return None
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            if silent:
+                return None
+            raise
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_SIZE:
+            raise BodyTooLarge()
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+class AsyncApp:
+    """
+    Application ASGI: routes async déclarées avec @route, les autres passées au fallback
+
+    Une requête dont le chemin ou la méthode ne correspond à aucune route async
+    (ex: OPTIONS, traité par flask_cors) est transmise telle quelle au fallback.
+    """
+
+    def __init__(self, routes, fallback, json_dumps, on_shutdown=None):
+        self.url_map = Map(routes)
+        self.fallback = fallback
+        self.json_dumps = json_dumps
+        self.on_shutdown = on_shutdown
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+
+        if scope['type'] == 'http':
+            try:
+                rule, view_args = self.url_map.bind('localhost').match(
+                    scope['path'], scope['method'], return_rule=True
+                )
+            except HTTPException:
+                rule = None
+            if rule is not None:
+                return await self._handle(scope, receive, send, rule, view_args)
+
+        await self.fallback(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Pool de asyncio.to_thread (les routes Flask ont le leur, voir WSGIFallback)
+                asyncio.get_running_loop().set_default_executor(
+                    ThreadPoolExecutor(max_workers=ASYNC_BLOCKING_THREADS, thread_name_prefix='to_thread')
+                )
+                logger.info("🚀 API async prête (%d routes async, %d threads pour les routes Flask)",
+                            len(list(self.url_map.iter_rules())), ASYNC_WSGI_THREADS)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await close_async_http_client()
+                if self.on_shutdown:
+                    self.on_shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _authenticate(self, request):
+        """Même règle que auth_middleware.authenticate_request (renseigne request.user)"""
+        if request.method == 'OPTIONS':
+            return None
+
+        token = bearer_token(request.headers)
+        if token:
+            request.user = decode_token(token)
+
+        if request.user is None and AUTH_REQUIRED and not is_public_path(request.path):
+            return {'error': 'Authentification requise'}, 401
+        return None
+
+    async def _handle(self, scope, receive, send, rule, view_args):
+        debut = time.perf_counter()
+        try:
+            request = AsyncRequest(scope, await _read_body(receive))
+        except BodyTooLarge:
+            return await self._send(send, 413, [('Content-Type', 'application/json')],
+                                    self.json_dumps({"error": "Requête trop volumineuse"}))
+
+        request_id = request_id_from_headers(request.headers)
+        request_id_token = bind_request_id(request_id)
+        root, trace_token = start_server_span(
+            request.method, request.path, request.full_path, request.headers.get('traceparent')
+        )
+        accountant, accounting_token = start_accounting()
+        error = None
+
+        try:
+            try:
+                data, status = self._authenticate(request) or await rule.endpoint(request, **view_args)
+            except Exception as e:
+                error = e
+                logger.error("❌ Erreur dans %s %s: %s", request.method, rule.rule, e)
+                data, status = {"error": str(e)}, 500
+
+            if root is not None:
+                set_server_span_route(root, request.method, rule.rule, status)
+
+            total_ms = round((time.perf_counter() - debut) * 1000, 1)
+            headers = [('Content-Type', 'application/json'), ('X-Request-Id', request_id)]
+            headers += accounting_headers(accountant, total_ms)
+            origin = request.headers.get('Origin')
+            if origin:
+                # Comme CORS(app): toutes les origines, origine de la requête renvoyée
+                headers += [('Access-Control-Allow-Origin', origin), ('Vary', 'Origin')]
+            log_accounting(accountant, request.method, request.path, total_ms)
+
+            await self._send(send, status, headers, self.json_dumps(data) + '\n')
+            observe_request(rule.rule, request.method, status, time.perf_counter() - debut)
+        finally:
+            stop_accounting(accounting_token)
+            if root is not None:
+                end_server_span(root, trace_token, error)
+            unbind_request_id(request_id_token)
+
+    @staticmethod
+    async def _send(send, status, headers, body: str):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        })
+        await send({'type': 'http.response.body', 'body': body.encode('utf-8')})
+
+
+class WSGIFallback:
+    """
+    Équivalent de hypercorn.middleware.AsyncioWSGIMiddleware avec un pool dédié
+
+    AsyncioWSGIMiddleware exécute l'application WSGI dans le pool par défaut de
+    la boucle, celui de asyncio.to_thread: des routes Flask lentes y
+    retarderaient les appels bloquants des routes async.
+    """
+
+    def __init__(self, wsgi_app, executor, max_body_size):
+        from hypercorn.app_wrappers import WSGIWrapper
+
+        self.wsgi_app = WSGIWrapper(wsgi_app, max_body_size)
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+
+        def call_soon(func, *args):
+            return asyncio.run_coroutine_threadsafe(func(*args), loop).result()
+
+        await self.wsgi_app(scope, receive, send, partial(loop.run_in_executor, self.executor), call_soon)
+
+
+def create_asgi_app(flask_app):
+    """
+    Application ASGI: routes async de ce module + flask_app pour toutes les autres
+
+    flask_app est exécutée dans un pool de ASYNC_WSGI_THREADS threads. Les
+    réponses JSON sont encodées par le fournisseur JSON de flask_app (mêmes
+    formats de dates que jsonify).
+    """
+    executor = ThreadPoolExecutor(max_workers=ASYNC_WSGI_THREADS, thread_name_prefix='wsgi')
+    fallback = WSGIFallback(flask_app, executor, MAX_BODY_SIZE)
+    return AsyncApp(_routes, fallback, flask_app.json.dumps, on_shutdown=executor.shutdown)
+
+# ============================================================================
+# ROUTES ALERTES
+# ============================================================================
+
+@route('/alerts/', methods=['GET'])
+async def get_alerts(request):
+    """Équivalent async de GET /alerts/ (alertes + déclenchement de l'alert-engine selon le TTL)"""
+    try:
+        sync_mode = request.args.get('sync', 'false').lower() == 'true'
+        ttl_override = request.args.get('ttl_override', type=int)
+
+        state = refresh_state(await get_last_refresh_async(), ttl_override)
+        should_trigger = state["time_since_refresh"] >= state["ttl"]
+
+        triggered = False
+        trigger_mode = None
+        scan_result = None
+
+        if should_trigger and ALERT_ENGINE_URL:
+            # Mettre à jour last_refresh de façon optimiste
+            if await update_last_refresh_async():
+                triggered = True
+
+                if sync_mode:
+                    trigger_mode = "sync"
+                    scan_result = await trigger_alert_engine_async()
+                else:
+                    trigger_mode = "background"
+                    trigger_alert_engine_background_async()
+            else:
+                logger.error("Impossible de mettre à jour last_refresh_ts")
+        elif not ALERT_ENGINE_URL:
+            logger.warning("ALERT_ENGINE_URL non configuré, pas de déclenchement")
+        else:
+            logger.info("Trigger ignoré - dans le TTL (derniers %ss < %ss)", state["time_since_refresh"], state["ttl"])
+
+        alerts = await get_alerts_async()
+        mode = "firestore" if await asyncio.to_thread(bool, alerts_db) else "offline"
+
+        return alerts_response(alerts, state, triggered, trigger_mode, scan_result, mode), 200
+
+    except Exception as e:
+        logger.error("Erreur dans /alerts: %s", e)
+        return {
+            "error": str(e),
+            "alerts": [],
+            "triggered": False,
+            "trigger_mode": None,
+            "metadata": {"mode": "error"}
+        }, 500
+
+@route('/alerts/trigger', methods=['POST'])
+async def trigger_alert_engine(request):
+    """Équivalent async de POST /alerts/trigger (modes scan, single task et batch)"""
+    try:
+        limit = request.args.get('limit', type=int, default=0)
+        dry_run = request.args.get('dry_run', '').lower() in ('true', '1', 'yes')
+
+        try:
+            mode, params = parse_trigger_body(request.get_json(silent=True) or {})
+        except ValueError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }, 400
+
+        if mode == 'batch':
+            result = await trigger_alert_engine_batch_async(params, dry_run=dry_run)
+        elif mode == 'single_task':
+            task_id, task = params
+            result = await trigger_alert_engine_single_task_async(task_id, task, dry_run=dry_run)
+        else:
+            result = await trigger_alert_engine_scan_async(limit=limit, dry_run=dry_run)
+
+        return trigger_response(mode, result), 200
+
+    except Exception as e:
+        logger.error("❌ Erreur lors du déclenchement de l'alert-engine: %s", e)
+        return {
+            'success': False,
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }, 500
+
+# ============================================================================
+# ROUTES TÂCHES
+# ============================================================================
+
+@route('/tasks/org/<org_id>', methods=['GET'])
+async def get_tasks_by_org(request, org_id):
+    """Équivalent async de GET /tasks/org/<org_id>"""
+    try:
+        # Même contrôle que la route Flask (client construit dans un thread si LAZY_BOOT)
+        if not await asyncio.to_thread(bool, tasks_db):
+            return {"error": "Firestore non disponible"}, 503
+
+        query = org_tasks_query(async_firestore_client(), org_id)
+        tasks = org_task_list(await stream_async(query, 'tasks'))
+
+        logger.info('📋 Récupéré %d tâches pour l\'organisation %s', len(tasks), org_id)
+        return {
+            "tasks": tasks,
+            "org_id": org_id,
+            "count": len(tasks)
+        }, 200
+
+    except Exception as e:
+        logger.error("❌ Erreur lors de la récupération des tâches pour %s: %s", org_id, e)
+        return {"error": str(e)}, 500
+
+@route('/tasks/stats/<org_id>', methods=['GET'])
+async def get_task_stats(request, org_id):
+    """Équivalent async de GET /tasks/stats/<org_id>"""
+    try:
+        if not await asyncio.to_thread(bool, tasks_db):
+            return {"error": "Firestore non disponible"}, 503
+
+        query = org_tasks_query(async_firestore_client(), org_id)
+        stats = compute_task_stats(doc.to_dict() for doc in await stream_async(query, 'tasks'))
+
+        logger.info('📊 Statistiques des tâches pour %s: %s', org_id, stats)
+        return {
+            "org_id": org_id,
+            "stats": stats
+        }, 200
+
+    except Exception as e:
+        logger.error("❌ Erreur lors de la récupération des statistiques pour %s: %s", org_id, e)
+        return {"error": str(e)}, 500
+
+# ============================================================================
+# ROUTES VEILLE
+# ============================================================================
+
+@route('/veille/company/<company_id>', methods=['GET'])
+async def get_alertes_veille(request, company_id):
+    """Équivalent async de GET /veille/company/<company_id>"""
+    try:
+        if not await asyncio.to_thread(bool, veille.db):
+            return {"error": "Firestore non configuré"}, 500
+
+        query = veille_alertes_query(async_firestore_client(), company_id)
+        alertes = veille_alertes_list(await stream_async(query, 'info_alerts'))
+
+        logger.info("✅ %d alertes récupérées pour %s", len(alertes), company_id)
+        return {
+            "success": True,
+            "alertes": alertes,
+            "total": len(alertes)
+        }, 200
+
+    except Exception as e:
+        logger.error("❌ Erreur get_alertes_veille: %s", e)
+        return {"error": str(e)}, 500
+
+@route('/veille/analyser/<company_id>', methods=['POST'])
+async def analyser_veille(request, company_id):
+    """
+    Équivalent async de POST /veille/analyser/<company_id>
+
+    Les questions à l'agent fiscal sont des coroutines; l'enregistrement des
+    alertes (WriteBatch, repli unitaire sur doublon) reste celui du module veille,
+    exécuté dans un thread.
+    """
+    try:
+        # Client synchrone utilisé par save_veille_alertes (construit dans un thread si LAZY_BOOT)
+        if not await asyncio.to_thread(bool, veille.db):
+            return {"error": "Firestore non configuré"}, 500
+
+        settings = await get_company_settings_async(company_id)
+        if settings is None:
+            return {"error": "Paramètres entreprise non trouvés"}, 404
+
+        debut = time.monotonic()
+        alertes = []
+        questions_metadata = []
+
+        for answer in await agent_fiscal_answers_async(build_questions(settings)):
+            questions_metadata.append({
+                "question": answer["question"],
+                "statut": answer["statut"],
+                "duree_ms": answer["duree_ms"],
+                "cache": answer["cache"]
+            })
+            if answer["result"] is not None:
+                alertes.extend(build_veille_alertes(company_id, settings, answer["question"], answer["result"]))
+
+        nouvelles_alertes, nb_existantes = await asyncio.to_thread(save_veille_alertes, company_id, alertes)
+
+        return {
+            "success": True,
+            "nb_nouvelles_alertes": len(nouvelles_alertes),
+            "nb_alertes_existantes": nb_existantes,
+            "alertes": nouvelles_alertes,
+            "complet": all(q["statut"] == "ok" for q in questions_metadata),
+            "metadata": {
+                "questions": questions_metadata,
+                "duree_totale_ms": int((time.monotonic() - debut) * 1000)
+            }
+        }, 200
+
+    except Exception as e:
+        logger.error("Erreur analyser_veille: %s", e)
+        return {"error": str(e)}, 500
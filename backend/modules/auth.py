@@ -1,39 +1,38 @@
 """
-"""
 Module d'authentification pour la démo Optimious
-"""
-Gère l'inscription et la connexion sans Firebase Auth
+Gère la connexion sans Firebase Auth (l'inscription est servie par /auth/register, app.py)
 """
 
-import hashlib
-import secrets
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 import jwt
-from google.cloud import firestore
+from .auth_middleware import JWT_SECRET, JWT_ALGORITHM
+from .firestore_client import lazy_firestore_client
+from .passwords import (
+    hash_password, verify_password, rehash_in_background,
+    stored_password_hash, password_hash_update
+)
 
-# Configuration JWT
-JWT_SECRET = "demo-secret-key-change-in-production"
-JWT_ALGORITHM = "HS256"
+# Configuration JWT (même secret que la vérification des requêtes)
 JWT_EXPIRATION_HOURS = 24
 
 class AuthService:
     def __init__(self):
-        self.db = firestore.Client()
+        self.db = lazy_firestore_client(self._create_db, 'auth')
+    
+    @staticmethod
+    def _create_db():
+        from google.cloud import firestore
+        return firestore.Client()
         
     def hash_password(self, password: str) -> str:
-        """Hash un mot de passe avec un salt"""
-        salt = secrets.token_hex(16)
-        pwd_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), 100000)
-        return f"{salt}:{pwd_hash.hex()}"
+        """Hash un mot de passe (schéma commun, voir modules/passwords.py)"""
+        return hash_password(password)
     
     def verify_password(self, password: str, hash_str: str) -> bool:
-        """Vérifie un mot de passe contre son hash"""
-        try:
-            salt, pwd_hash = hash_str.split(':')
-            return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), 100000).hex() == pwd_hash
-        except:
-            return False
+        """Vérifie un mot de passe contre son hash, quel que soit son format"""
+        valid, _ = verify_password(password, hash_str)
+        return valid
     
     def generate_token(self, user_id: str) -> str:
         """Génère un JWT token pour l'utilisateur"""
@@ -54,52 +53,6 @@ class AuthService:
         except jwt.InvalidTokenError:
             return None
     
-    async def register_user(self, email: str, password: str, company_name: str) -> Dict[str, Any]:
-        """Inscrit un nouvel utilisateur"""
-        try:
-            # Vérifier si l'utilisateur existe déjà
-            users_ref = self.db.collection('users')
-            existing_user = users_ref.where('email', '==', email).limit(1).get()
-            
-            if len(list(existing_user)) > 0:
-                raise ValueError("Un compte existe déjà avec cette adresse e-mail")
-            
-            # Créer l'utilisateur (toujours avec les mêmes IDs pour la démo)
-            user_id = "test_user"  # Toujours le même pour la démo
-            company_id = "demo_company"  # Toujours le même pour la démo
-            
-            # Hash du mot de passe
-            password_hash = self.hash_password(password)
-            
-            # Créer le document utilisateur
-            user_data = {
-                'email': email,
-                'password_hash': password_hash,
-                'companyId': company_id,
-                'companyName': company_name,
-                'createdAt': firestore.SERVER_TIMESTAMP
-            }
-            
-            # Sauvegarder dans Firestore
-            self.db.collection('users').document(user_id).set(user_data)
-            
-            # Générer un token
-            token = self.generate_token(user_id)
-            
-            return {
-                'success': True,
-                'user': {
-                    'uid': user_id,
-                    'email': email,
-                    'companyId': company_id
-                },
-                'token': token
-            }
-            
-        except Exception as e:
-            print(f"Erreur lors de l'inscription: {e}")
-            raise e
-    
     async def login_user(self, email: str, password: str) -> Dict[str, Any]:
         """Connecte un utilisateur"""
         try:
@@ -114,10 +67,15 @@ class AuthService:
             user_doc = user_docs[0]
             user_data = user_doc.to_dict()
             
-            # Vérifier le mot de passe
-            if not self.verify_password(password, user_data.get('password_hash', '')):
+            # Vérifier le mot de passe (et migrer les anciens hash 'salt:hash')
+            valid, needs_rehash = verify_password(password, stored_password_hash(user_data))
+            if not valid:
                 raise ValueError("Mot de passe incorrect")
             
+            if needs_rehash:
+                user_ref = user_doc.reference
+                rehash_in_background(password, lambda new_hash: user_ref.update(password_hash_update(new_hash)))
+            
             # Pour la démo, toujours retourner les mêmes IDs
             user_id = "test_user"
             company_id = "demo_company"
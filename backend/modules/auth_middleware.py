@@ -0,0 +1,136 @@
+"""
+Module Auth Middleware - Vérification des tokens JWT (Authorization: Bearer ...)
+Les claims décodés sont gardés en cache jusqu'à l'expiration du token pour ne pas
+refaire la vérification HMAC et le parsing à chaque requête.
+"""
+
+from flask import g, jsonify, request
+import hashlib
+import jwt
+import logging
+import os
+import time
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+JWT_SECRET = os.getenv('JWT_SECRET', 'votre-secret-jwt')
+JWT_ALGORITHM = 'HS256'
+AUTH_REQUIRED = os.getenv('AUTH_REQUIRED', 'false').lower() == 'true'  # Refuser les requêtes sans token valide
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', '4096'))
+
+# Routes accessibles sans token quand AUTH_REQUIRED est activé
+PUBLIC_PATHS = ('/', '/health', '/metrics', '/_ah/warmup')
+PUBLIC_PREFIXES = ('/auth/',)
+
+# Routes appelées par Cloud Scheduler: acceptent aussi un token OIDC Google
+# (audience SCHEDULER_AUDIENCE, compte de service SCHEDULER_SERVICE_ACCOUNT si défini)
+SCHEDULER_PATHS = ('/veille/sweep',)
+SCHEDULER_AUDIENCE = os.getenv('SCHEDULER_AUDIENCE')  # URL du service configurée dans le job
+SCHEDULER_SERVICE_ACCOUNT = os.getenv('SCHEDULER_SERVICE_ACCOUNT')
+
+token_cache = TTLCache(maxsize=AUTH_TOKEN_CACHE_SIZE, ttl=3600)
+
+# ============================================================================
+# VÉRIFICATION DES TOKENS
+# ============================================================================
+
+def decode_token(token: str):
+    """
+    Vérifie un token JWT et retourne ses claims
+
+    Les claims sont mis en cache (clé: hash du token) jusqu'à l'expiration du token.
+
+    Returns:
+        Le dict des claims, ou None si le token est invalide ou expiré
+    """
+    key = hashlib.sha256(token.encode('utf-8')).hexdigest()
+    claims = token_cache.get(key)
+    if claims is not None:
+        return claims
+
+    try:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.InvalidTokenError:
+        return None
+
+    remaining = claims.get('exp', 0) - time.time()
+    token_cache.set(key, claims, ttl=remaining)
+    return claims
+
+def decode_scheduler_token(token: str):
+    """
+    Vérifie un token OIDC Google (Cloud Scheduler) et retourne ses claims
+
+    Désactivé tant que SCHEDULER_AUDIENCE n'est pas défini. Les claims sont mis
+    en cache comme ceux des JWT de l'application.
+
+    Returns:
+        Le dict des claims, ou None si le token est invalide ou non autorisé
+    """
+    if not SCHEDULER_AUDIENCE:
+        return None
+
+    key = 'oidc:' + hashlib.sha256(token.encode('utf-8')).hexdigest()
+    claims = token_cache.get(key)
+    if claims is not None:
+        return claims
+
+    from google.oauth2 import id_token
+    from google.auth.transport import requests as google_requests
+
+    try:
+        claims = id_token.verify_oauth2_token(token, google_requests.Request(), audience=SCHEDULER_AUDIENCE)
+    except ValueError as e:
+        logger.warning("Token OIDC refusé: %s", e)
+        return None
+
+    if SCHEDULER_SERVICE_ACCOUNT and claims.get('email') != SCHEDULER_SERVICE_ACCOUNT:
+        logger.warning("Token OIDC d'un compte de service non autorisé: %s", claims.get('email'))
+        return None
+
+    token_cache.set(key, claims, ttl=claims.get('exp', 0) - time.time())
+    return claims
+
+def bearer_token(headers=None):
+    """Extrait le token du header Authorization (de la requête Flask par défaut), ou None"""
+    auth_header = (request.headers if headers is None else headers).get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        return auth_header[len('Bearer '):].strip() or None
+    return None
+
+def is_public_path(path: str) -> bool:
+    return path in PUBLIC_PATHS or path.startswith(PUBLIC_PREFIXES)
+
+def authenticate_request():
+    """
+    before_request: valide le token et renseigne g.user (claims du token, ou None)
+
+    Sans AUTH_REQUIRED, une requête sans token ou avec un token invalide passe
+    avec g.user = None. Avec AUTH_REQUIRED, elle est refusée (401) sauf sur les
+    routes publiques. Les routes de SCHEDULER_PATHS acceptent aussi le token
+    OIDC envoyé par Cloud Scheduler.
+    """
+    g.user = None
+
+    if request.method == 'OPTIONS':
+        return None
+
+    token = bearer_token()
+    if token:
+        g.user = decode_token(token)
+        if g.user is None and request.path in SCHEDULER_PATHS:
+            g.user = decode_scheduler_token(token)
+
+    if g.user is None and AUTH_REQUIRED and not is_public_path(request.path):
+        return jsonify({'error': 'Authentification requise'}), 401
+
+    return None
+
+def init_auth_middleware(app):
+    """Enregistre la vérification des tokens sur l'application Flask"""
+    app.before_request(authenticate_request)
@@ -0,0 +1,161 @@
+"""
+Module Batch - Plusieurs appels API en une seule requête HTTP
+POST /batch reçoit une liste de sous-requêtes (méthode, chemin, corps) et les
+exécute sur l'application elle-même: chaque sous-requête passe par les mêmes
+hooks (authentification, ID de requête, trace, métriques) qu'un appel direct.
+Les GET consécutifs sont exécutés en parallèle, les écritures une par une dans
+l'ordre de la liste.
+"""
+
+from flask import Blueprint, current_app, g, jsonify, request
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import Context
+from werkzeug.test import EnvironBuilder
+import logging
+import os
+from .tracing import inject_headers
+
+batch_bp = Blueprint('batch', __name__)
+logger = logging.getLogger(__name__)
+
+# Configuration
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', '20'))  # Sous-requêtes max par batch
+BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', '8'))  # GET exécutés simultanément
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+# Headers de la requête batch transmis à chaque sous-requête
+BATCH_FORWARDED_HEADERS = ('Authorization', 'Accept-Language')
+# Headers de réponse inutiles dans le corps du batch
+BATCH_DROPPED_HEADERS = ('Content-Length', 'Access-Control-Allow-Origin', 'Vary')
+
+# ============================================================================
+# EXÉCUTION DES SOUS-REQUÊTES
+# ============================================================================
+
+def validate_sub_request(item):
+    """Retourne un message d'erreur si la sous-requête est invalide, sinon None"""
+    if not isinstance(item, dict):
+        return "Sous-requête invalide (objet attendu)"
+    if str(item.get('method', 'GET')).upper() not in BATCH_METHODS:
+        return f"Méthode non supportée: {item.get('method')}"
+    path = item.get('path')
+    if not isinstance(path, str) or not path.startswith('/'):
+        return "Chemin invalide (doit commencer par /)"
+    if path.split('?')[0].rstrip('/') == '/batch':
+        return "Un batch ne peut pas contenir /batch"
+    return None
+
+def response_headers(response):
+    """
+    Headers d'une réponse en dict, valeurs répétées jointes par ", "
+
+    Un header envoyé plusieurs fois (Server-Timing firestore + app) garde
+    ainsi toutes ses valeurs, comme le ferait un proxy HTTP.
+    """
+    headers = {}
+    for key in response.headers.keys():
+        if key not in BATCH_DROPPED_HEADERS and key not in headers:
+            headers[key] = ', '.join(response.headers.getlist(key))
+    return headers
+
+def dispatch(app, item, headers):
+    """
+    Exécute une sous-requête sur l'application WSGI et retourne sa réponse
+
+    Exécutée dans un contexte vide: la sous-requête a son propre contexte
+    d'application (g, utilisateur, ID de requête) au lieu de celui du batch.
+    """
+    builder = EnvironBuilder(
+        path=item['path'],
+        method=str(item.get('method', 'GET')).upper(),
+        headers={**headers, **(item.get('headers') or {})},
+        json=item.get('body')
+    )
+    try:
+        response = Context().run(app.response_class.from_app, app.wsgi_app, builder.get_environ(), True)
+    finally:
+        builder.close()
+
+    body = response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
+    return {
+        "status": response.status_code,
+        "headers": response_headers(response),
+        "body": body
+    }
+
+def run_batch(app, items, headers):
+    """
+    Exécute les sous-requêtes et retourne leurs réponses dans l'ordre de items
+
+    Les GET consécutifs sont exécutés en parallèle; une écriture attend la fin
+    des GET qui la précèdent et les GET suivants attendent l'écriture.
+    """
+    results = [None] * len(items)
+    # Lus dans le thread de la requête: trace rattachée au span du batch et
+    # ID de chaque sous-requête dérivé de celui du batch
+    headers = inject_headers(headers)
+    request_id = getattr(g, 'request_id', None)
+
+    def run(index):
+        item = items[index]
+        error = validate_sub_request(item)
+        if error:
+            result = {"status": 400, "headers": {}, "body": {"error": error}}
+        else:
+            item_headers = {**headers, 'X-Request-Id': f"{request_id}-{index}"} if request_id else headers
+            try:
+                result = dispatch(app, item, item_headers)
+            except Exception as e:
+                logger.error("❌ Sous-requête %s du batch en erreur: %s", index, e)
+                result = {"status": 500, "headers": {}, "body": {"error": str(e)}}
+        if isinstance(item, dict) and 'id' in item:
+            result["id"] = item['id']
+        results[index] = result
+
+    def is_get(item):
+        return isinstance(item, dict) and str(item.get('method', 'GET')).upper() == 'GET'
+
+    with ThreadPoolExecutor(max_workers=max(1, BATCH_MAX_WORKERS)) as executor:
+        pending_gets = []
+        for index, item in enumerate(items):
+            if is_get(item):
+                pending_gets.append(executor.submit(run, index))
+                continue
+            for future in pending_gets:
+                future.result()
+            pending_gets = []
+            run(index)
+        for future in pending_gets:
+            future.result()
+
+    return results
+
+# ============================================================================
+# ENDPOINTS DU MODULE BATCH
+# ============================================================================
+
+@batch_bp.route('', methods=['POST'])
+def batch():
+    """
+    Exécute une liste de sous-requêtes et retourne toutes les réponses
+
+    Corps: {"requests": [{"method": "GET", "path": "/tasks/stats/org_demo"}, ...]}
+    (ou directement la liste). Chaque sous-requête peut porter un "id" (repris
+    dans sa réponse), un "body" JSON et des "headers".
+    """
+    try:
+        data = request.get_json(silent=True)
+        items = data.get('requests') if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            return jsonify({"error": "Liste de sous-requêtes requise (requests)"}), 400
+        if len(items) > BATCH_MAX_REQUESTS:
+            return jsonify({"error": f"Trop de sous-requêtes ({len(items)} > {BATCH_MAX_REQUESTS})"}), 400
+
+        headers = {name: request.headers[name] for name in BATCH_FORWARDED_HEADERS if name in request.headers}
+        responses = run_batch(current_app._get_current_object(), items, headers)
+
+        logger.info("📦 Batch de %d sous-requêtes exécuté", len(items))
+        return jsonify({"responses": responses, "count": len(responses)}), 200
+
+    except Exception as e:
+        logger.error("❌ Erreur batch: %s", e)
+        return jsonify({"error": str(e)}), 500
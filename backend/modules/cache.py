@@ -0,0 +1,76 @@
+"""
+Module Cache - Cache mémoire LRU avec expiration (TTL)
+Partagé par les modules qui veulent éviter des appels répétés (Firestore, agent fiscal...)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Cache LRU borné dont les entrées expirent après un TTL
+
+    Thread-safe (gunicorn sert les requêtes sur plusieurs threads).
+    Quand le cache est plein, l'entrée la moins récemment utilisée est évincée.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Retourne la valeur associée à key, ou default si absente/expirée"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        """Ajoute ou remplace une entrée (ttl en secondes, défaut: TTL du cache)"""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        """Supprime une entrée du cache"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Vide le cache"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """Statistiques du cache (taille, hits, misses)"""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses
+            }
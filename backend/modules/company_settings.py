@@ -0,0 +1,122 @@
+"""
+Module Company Settings - Accès en lecture aux paramètres entreprise (collection 'settings')
+Les profils sont gardés dans un cache mémoire par processus pour éviter un aller-retour
+Firestore à chaque appel. Le backend n'écrit pas dans 'settings' (le frontend écrit
+directement dans Firestore): un profil modifié est relu après SETTINGS_CACHE_TTL, ou
+dès la modification avec SETTINGS_CACHE_WATCH.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from .cache import TTLCache
+from .firestore_client import async_firestore_client, lazy_firestore_client, operation_async
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+GCP_PROJECT = os.getenv('GCP_PROJECT')
+SETTINGS_CACHE_TTL = int(os.getenv('SETTINGS_CACHE_TTL', '60'))  # Durée de vie d'un profil en cache
+SETTINGS_CACHE_SIZE = int(os.getenv('SETTINGS_CACHE_SIZE', '1024'))
+# Écouter les changements de 'settings' (le frontend écrit directement dans Firestore)
+SETTINGS_CACHE_WATCH = os.getenv('SETTINGS_CACHE_WATCH', 'false').lower() == 'true'
+
+def _create_db():
+    if not GCP_PROJECT:
+        return None
+    from google.cloud import firestore
+    client = firestore.Client(project=GCP_PROJECT)
+    logger.info("✅ Firestore initialisé pour les paramètres entreprise: %s", GCP_PROJECT)
+    return client
+
+db = lazy_firestore_client(_create_db, 'company_settings')
+
+settings_cache = TTLCache(maxsize=SETTINGS_CACHE_SIZE, ttl=SETTINGS_CACHE_TTL)
+
+_watch = None
+_watch_lock = threading.Lock()
+
+# ============================================================================
+# INVALIDATION
+# ============================================================================
+
+def _on_settings_snapshot(col_snapshot, changes, read_time):
+    """Met à jour le cache à chaque modification d'un document 'settings'"""
+    for change in changes:
+        company_id = change.document.id
+        if change.type.name == 'REMOVED':
+            settings_cache.invalidate(company_id)
+        else:
+            settings_cache.set(company_id, change.document.to_dict())
+
+def start_settings_watch():
+    """Démarre (une seule fois) l'écoute des changements de la collection 'settings'"""
+    global _watch
+
+    if not (SETTINGS_CACHE_WATCH and db) or _watch is not None:
+        return
+
+    with _watch_lock:
+        if _watch is not None:
+            return
+        try:
+            _watch = db.collection('settings').on_snapshot(_on_settings_snapshot)
+            logger.info("👂 Écoute des changements de 'settings' activée")
+        except Exception as e:
+            logger.error("Impossible d'écouter les changements de 'settings': %s", e)
+
+# ============================================================================
+# ACCÈS AUX PARAMÈTRES
+# ============================================================================
+
+def get_company_settings(company_id):
+    """
+    Retourne les paramètres d'une entreprise (settings/{company_id})
+
+    Lus depuis le cache mémoire si présents, sinon depuis Firestore.
+
+    Returns:
+        Une copie du dict des paramètres, ou None si l'entreprise n'a pas de paramètres
+    """
+    start_settings_watch()
+
+    settings = settings_cache.get(company_id)
+    if settings is not None:
+        return dict(settings)
+
+    if not db:
+        return None
+
+    doc = db.collection('settings').document(company_id).get()
+    if not doc.exists:
+        return None
+
+    settings = doc.to_dict()
+    settings_cache.set(company_id, settings)
+    return dict(settings)
+
+async def get_company_settings_async(company_id):
+    """Équivalent async de get_company_settings (même cache, lecture par l'AsyncClient)"""
+    # Construction du client synchrone et de l'écoute dans un thread (une seule fois)
+    if SETTINGS_CACHE_WATCH and _watch is None:
+        await asyncio.to_thread(start_settings_watch)
+
+    settings = settings_cache.get(company_id)
+    if settings is not None:
+        return dict(settings)
+
+    if not await asyncio.to_thread(bool, db):
+        return None
+
+    reference = async_firestore_client().collection('settings').document(company_id)
+    doc = await operation_async(reference, 'settings', 'get')
+    if not doc.exists:
+        return None
+
+    settings = doc.to_dict()
+    settings_cache.set(company_id, settings)
+    return dict(settings)
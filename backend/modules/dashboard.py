@@ -0,0 +1,110 @@
+"""
+Module Dashboard - Données du tableau de bord en une seule requête
+Remplace les quatre appels du Dashboard frontend (alertes, statistiques des
+tâches, démarches, veille): les lectures Firestore sont faites en parallèle
+côté serveur et le résultat est renvoyé en une seule réponse.
+"""
+
+from flask import Blueprint, jsonify, request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import logging
+import time
+from . import alerts, procedures, tasks, veille
+from .tracing import propagate
+
+dashboard_bp = Blueprint('dashboard', __name__)
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# SECTIONS DU TABLEAU DE BORD
+# ============================================================================
+
+def dashboard_alerts():
+    """
+    Alertes (sans déclencher l'alert-engine, comme le Dashboard frontend)
+
+    Même requête que get_alerts_from_firestore, mais une erreur Firestore est
+    levée (section en erreur) au lieu d'être rendue comme une liste vide.
+    """
+    if not alerts.db:
+        raise RuntimeError("Firestore non disponible")
+    data = alerts.alert_list(alerts.alerts_query(alerts.db).stream())
+    return {"alerts": data, "count": len(data)}
+
+def dashboard_task_stats(org_id):
+    """Statistiques des tâches de l'organisation"""
+    if not tasks.db:
+        raise RuntimeError("Firestore non disponible")
+    return {"org_id": org_id, "stats": tasks.compute_task_stats(tasks.get_org_tasks(org_id))}
+
+def dashboard_procedures(user_id=None):
+    """Démarches au format frontend (transform_firestore_to_frontend)"""
+    data = procedures.get_procedures_from_firestore(user_id)
+    return {"data": data, "count": len(data)}
+
+def dashboard_veille(company_id):
+    """Alertes de veille de l'entreprise, les plus récentes en premier"""
+    if not veille.db:
+        raise RuntimeError("Firestore non configuré")
+    alertes = veille.get_veille_alertes(company_id)
+    return {"alertes": alertes, "total": len(alertes)}
+
+def collect_dashboard(company_id, org_id, user_id=None):
+    """
+    Lit les quatre sections en parallèle
+
+    Une section en erreur est remplacée par {"error": ...} sans faire échouer
+    les autres.
+    """
+    sections = {
+        "alerts": (dashboard_alerts,),
+        "tasks": (dashboard_task_stats, org_id),
+        "procedures": (dashboard_procedures, user_id),
+        "veille": (dashboard_veille, company_id),
+    }
+
+    payload = {}
+    with ThreadPoolExecutor(max_workers=len(sections)) as executor:
+        futures = {
+            name: executor.submit(propagate(func), *args)
+            for name, (func, *args) in sections.items()
+        }
+        for name, future in futures.items():
+            try:
+                payload[name] = future.result()
+            except Exception as e:
+                logger.error("❌ Section %s du dashboard indisponible: %s", name, e)
+                payload[name] = {"error": str(e)}
+    return payload
+
+# ============================================================================
+# ENDPOINTS DU MODULE DASHBOARD
+# ============================================================================
+
+@dashboard_bp.route('/<company_id>', methods=['GET'])
+def get_dashboard(company_id):
+    """
+    Alertes, statistiques des tâches, démarches et veille d'une entreprise
+
+    Paramètres optionnels: org_id (organisation des tâches, companyId par
+    défaut) et user_id (filtre des démarches, comme /api/procedures).
+    """
+    try:
+        org_id = request.args.get('org_id', company_id)
+        user_id = request.args.get('user_id', None)
+
+        debut = time.monotonic()
+        payload = collect_dashboard(company_id, org_id, user_id)
+        duree_ms = int((time.monotonic() - debut) * 1000)
+
+        logger.info("📊 Dashboard de %s construit en %d ms", company_id, duree_ms)
+        return jsonify({
+            "company_id": company_id,
+            **payload,
+            "timestamp": datetime.now().isoformat()
+        }), 200
+
+    except Exception as e:
+        logger.error("❌ Erreur dashboard pour %s: %s", company_id, e)
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,328 @@
+"""
+Module Firestore Client - Construction différée des clients Firestore
+Avec LAZY_BOOT=true, les imports lourds (google.cloud.firestore, grpc) et la création
+des clients sont repoussés à la première utilisation, pour réduire le temps de démarrage
+à froid sur Cloud Run. /_ah/warmup permet de les préparer à la demande.
+Les références obtenues via db.collection(...) et db.batch() sont instrumentées
+(nombre et durée des opérations par collection, exposés par /metrics) et les
+documents lus/écrits sont imputés à la requête HTTP en cours. Chaque opération
+est aussi un span de la trace en cours.
+Avec STORAGE_BACKEND=memory, tous les modules partagent un stockage en mémoire
+(modules/memory_store.py) à la place de Firestore.
+Les routes async (asgi.py) utilisent un firestore.AsyncClient partagé, mesuré par
+operation_async() et stream_async().
+"""
+
+import logging
+import os
+import threading
+import time
+from .metrics import observe_firestore, observe_firestore_documents
+from .request_accounting import record_firestore
+from .tracing import span, start_span
+
+logger = logging.getLogger(__name__)
+
+LAZY_BOOT = os.getenv('LAZY_BOOT', 'false').lower() == 'true'
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'firestore').lower()  # firestore ou memory
+
+_registry = []
+
+# Méthodes qui retournent une nouvelle référence ou requête (instrumentée à son tour)
+_CHAIN_METHODS = frozenset({
+    'document', 'where', 'order_by', 'limit', 'limit_to_last', 'offset', 'select',
+    'start_at', 'start_after', 'end_at', 'end_before', 'count'
+})
+# Opérations mesurées
+_OPERATIONS = frozenset({'get', 'set', 'update', 'create', 'delete', 'add'})
+_BATCH_OPERATIONS = frozenset({'set', 'update', 'create', 'delete'})
+
+# ============================================================================
+# INSTRUMENTATION
+# ============================================================================
+
+def _record(collection: str, operation: str, seconds: float, reads: int = 0, writes: int = 0):
+    """Enregistre une opération dans /metrics et dans le bilan de la requête en cours"""
+    observe_firestore(collection, operation, seconds)
+    observe_firestore_documents(collection, reads=reads, writes=writes)
+    record_firestore(seconds, reads=reads, writes=writes)
+
+def _span_attributes(collection: str, operation: str) -> dict:
+    return {"db.system": "firestore", "db.operation": operation, "db.collection": collection}
+
+def _documents_read(result) -> int:
+    # DocumentReference.get -> un snapshot, Query.get -> une liste de snapshots
+    return len(result) if isinstance(result, list) else 1
+
+def _unwrap(reference):
+    return reference._target if isinstance(reference, InstrumentedReference) else reference
+
+
+class InstrumentedReference:
+    """
+    Enveloppe une référence/requête Firestore et mesure ses opérations
+
+    Les lectures (get, stream) et écritures (set, update, create, delete, add) sont
+    comptées par collection. stream() est mesuré jusqu'à la fin de l'itération.
+    """
+
+    def __init__(self, target, collection: str):
+        self._target = target
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+
+        if name in _CHAIN_METHODS:
+            def chained(*args, **kwargs):
+                return InstrumentedReference(attr(*args, **kwargs), self._collection)
+            return chained
+
+        if name == 'collection':
+            # Sous-collection: users/{uid}/tasks -> 'users/tasks'
+            def subcollection(*args, **kwargs):
+                return InstrumentedReference(attr(*args, **kwargs), f"{self._collection}/{args[0]}")
+            return subcollection
+
+        if name in _OPERATIONS:
+            def operation(*args, **kwargs):
+                debut = time.perf_counter()
+                result = None
+                done = False
+                with span(f"firestore.{name}", 'CLIENT', **_span_attributes(self._collection, name)) as current:
+                    try:
+                        result = attr(*args, **kwargs)
+                        done = True
+                        return result
+                    finally:
+                        reads = _documents_read(result) if done and name == 'get' else 0
+                        writes = 1 if done and name != 'get' else 0
+                        if name == 'get':
+                            current.set_attribute("db.documents_read", reads)
+                        _record(self._collection, name, time.perf_counter() - debut, reads=reads, writes=writes)
+            return operation
+
+        if name == 'stream':
+            def stream(*args, **kwargs):
+                # Span non activé: le générateur rend la main à l'appelant entre deux documents
+                current = start_span('firestore.stream', 'CLIENT', _span_attributes(self._collection, 'stream'))
+                debut = time.perf_counter()
+                count = 0
+                try:
+                    for document in attr(*args, **kwargs):
+                        count += 1
+                        yield document
+                finally:
+                    current.set_attribute("db.documents_read", count)
+                    current.end()
+                    _record(self._collection, 'stream', time.perf_counter() - debut, reads=count)
+            return stream
+
+        return attr
+
+
+class InstrumentedBatch:
+    """Enveloppe un WriteBatch: les écritures sont comptées par collection au commit"""
+
+    def __init__(self, batch):
+        self._batch = batch
+        self._pending = []
+
+    def __getattr__(self, name):
+        attr = getattr(self._batch, name)
+
+        if name in _BATCH_OPERATIONS:
+            def operation(reference, *args, **kwargs):
+                collection = getattr(reference, '_collection', None) or reference._path[0]
+                self._pending.append((collection, name))
+                return attr(_unwrap(reference), *args, **kwargs)
+            return operation
+
+        return attr
+
+    def commit(self, *args, **kwargs):
+        debut = time.perf_counter()
+        done = False
+        with span('firestore.commit', 'CLIENT', **_span_attributes('_batch', 'commit')) as current:
+            current.set_attribute("db.writes", len(self._pending))
+            try:
+                result = self._batch.commit(*args, **kwargs)
+                done = True
+                return result
+            finally:
+                self._record_commit(time.perf_counter() - debut, done)
+
+    def _record_commit(self, seconds: float, done: bool):
+        observe_firestore('_batch', 'commit', seconds)
+        record_firestore(seconds, writes=len(self._pending) if done else 0)
+        if done:
+            for collection, operation in self._pending:
+                observe_firestore(collection, operation)
+                observe_firestore_documents(collection, writes=1)
+        self._pending = []
+
+# ============================================================================
+# CLIENTS
+# ============================================================================
+
+
+class LazyFirestoreClient:
+    """
+    Client Firestore construit à la première utilisation
+
+    S'utilise comme le client (db.collection(...)). Évalué en booléen, il vaut
+    False si la construction a échoué ou si la factory retourne None (ex: projet
+    non configuré), comme l'ancien `db = None` des modules.
+    """
+
+    def __init__(self, factory, name: str):
+        self._factory = factory
+        self._name = name
+        self._client = None
+        self._initialized = False
+        self._lock = threading.Lock()
+        self.init_ms = None
+        _registry.append(self)
+
+    def _create_client(self):
+        if STORAGE_BACKEND == 'memory':
+            from .memory_store import memory_client
+            return memory_client()
+        return self._factory()
+
+    def get_client(self):
+        """Retourne le client (construit au premier appel), ou None s'il est indisponible"""
+        if self._initialized:
+            return self._client
+
+        with self._lock:
+            if not self._initialized:
+                debut = time.monotonic()
+                try:
+                    self._client = self._create_client()
+                except Exception as e:
+                    logger.error("❌ Erreur Firestore (%s): %s", self._name, e)
+                    self._client = None
+                self.init_ms = int((time.monotonic() - debut) * 1000)
+                self._initialized = True
+
+        return self._client
+
+    def __bool__(self):
+        return self.get_client() is not None
+
+    def __getattr__(self, name):
+        client = self.get_client()
+        if client is None:
+            raise RuntimeError(f"Client Firestore '{self._name}' non disponible")
+
+        if name == 'collection':
+            return lambda path, *args, **kwargs: InstrumentedReference(client.collection(path, *args, **kwargs), path)
+        if name == 'batch':
+            return lambda: InstrumentedBatch(client.batch())
+        return getattr(client, name)
+
+
+def lazy_firestore_client(factory, name: str) -> LazyFirestoreClient:
+    """
+    Déclare un client Firestore pour un module
+
+    Args:
+        factory: Fonction qui importe google.cloud.firestore et construit le client (ou retourne None)
+        name: Nom du module, pour les logs et /_ah/warmup
+
+    En mode eager (LAZY_BOOT=false, défaut), le client est construit immédiatement.
+    """
+    client = LazyFirestoreClient(factory, name)
+    if not LAZY_BOOT:
+        client.get_client()
+    return client
+
+# ============================================================================
+# CLIENT ASYNC (routes de asgi.py)
+# ============================================================================
+
+_async_client = None
+
+def async_firestore_client():
+    """
+    Client firestore.AsyncClient partagé par les routes async (modules/async_api.py)
+
+    Construit au premier appel, dans la boucle d'évènements qui l'utilise (une
+    seule par processus). Avec STORAGE_BACKEND=memory, retourne le client mémoire
+    async, qui partage les données des clients synchrones.
+    """
+    global _async_client
+
+    if _async_client is None:
+        if STORAGE_BACKEND == 'memory':
+            from .memory_store import memory_async_client
+            _async_client = memory_async_client()
+        else:
+            from google.cloud import firestore
+            _async_client = firestore.AsyncClient(project=os.getenv('GCP_PROJECT'))
+            logger.info("✅ Firestore AsyncClient initialisé")
+    return _async_client
+
+async def operation_async(reference, collection: str, name: str, *args, **kwargs):
+    """
+    Exécute une opération (get, set, update, create, delete) d'une référence async
+
+    Mesurée et tracée comme les opérations des références synchrones instrumentées.
+    """
+    debut = time.perf_counter()
+    result = None
+    done = False
+    with span(f"firestore.{name}", 'CLIENT', **_span_attributes(collection, name)) as current:
+        try:
+            result = await getattr(reference, name)(*args, **kwargs)
+            done = True
+            return result
+        finally:
+            reads = _documents_read(result) if done and name == 'get' else 0
+            writes = 1 if done and name != 'get' else 0
+            if name == 'get':
+                current.set_attribute("db.documents_read", reads)
+            _record(collection, name, time.perf_counter() - debut, reads=reads, writes=writes)
+
+async def stream_async(query, collection: str) -> list:
+    """Lit tous les documents d'une requête async (mesuré comme stream())"""
+    debut = time.perf_counter()
+    documents = []
+    with span('firestore.stream', 'CLIENT', **_span_attributes(collection, 'stream')) as current:
+        try:
+            async for document in query.stream():
+                documents.append(document)
+            return documents
+        finally:
+            current.set_attribute("db.documents_read", len(documents))
+            _record(collection, 'stream', time.perf_counter() - debut, reads=len(documents))
+
+# ============================================================================
+# PRÉCHAUFFAGE
+# ============================================================================
+
+def warm_up() -> dict:
+    """
+    Construit tous les clients Firestore déclarés et charge les dépendances lourdes
+
+    Returns:
+        Le temps d'initialisation (ms) et la disponibilité de chaque client
+    """
+    debut = time.monotonic()
+
+    # Dépendances des appels sortants (alert-engine, agent fiscal)
+    import requests  # noqa: F401
+    import google.auth.transport.requests  # noqa: F401
+    import google.oauth2.id_token  # noqa: F401
+
+    clients = {}
+    for client in _registry:
+        available = client.get_client() is not None
+        clients[client._name] = {"available": available, "init_ms": client.init_ms}
+
+    return {
+        "lazy_boot": LAZY_BOOT,
+        "clients": clients,
+        "duration_ms": int((time.monotonic() - debut) * 1000)
+    }
@@ -0,0 +1,194 @@
+"""
+Module Health - Sondes des dépendances (Firestore, alert-engine, agent fiscal)
+Les sondes tournent dans un thread en arrière-plan; /health sert le dernier état connu
+sans générer d'appel vers les dépendances.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+HEALTH_PROBE_MIN_INTERVAL = 5  # Borne basse de l'intervalle (0 ferait tourner la boucle en continu)
+HEALTH_PROBE_INTERVAL = max(HEALTH_PROBE_MIN_INTERVAL, int(os.getenv('HEALTH_PROBE_INTERVAL', '30')))  # Secondes entre deux tours
+HEALTH_PROBE_TIMEOUT = float(os.getenv('HEALTH_PROBE_TIMEOUT', '5'))  # Timeout d'une sonde
+HEALTH_LATENCY_WINDOW = int(os.getenv('HEALTH_LATENCY_WINDOW', '100'))  # Mesures gardées pour p50/p99
+HEALTH_PROBES_ENABLED = os.getenv('HEALTH_PROBES_ENABLED', 'true').lower() == 'true'
+# Dépendances HTTP sondées, ex: "alert_engine=https://.../health,agent_fiscal=https://.../health".
+# Uniquement des endpoints peu coûteux: une dépendance absente de la liste n'est pas sondée
+HEALTH_HTTP_PROBES = os.getenv('HEALTH_HTTP_PROBES', '')
+
+HEALTH_PROBE_COLLECTION = '_health'
+
+_probes = {}
+_state = {}
+_state_lock = threading.Lock()
+_thread = None
+_thread_lock = threading.Lock()
+
+# ============================================================================
+# SONDES
+# ============================================================================
+
+def firestore_probe(client):
+    """
+    Sonde Firestore: lecture d'un seul document (_health/probe)
+
+    Le document n'a pas besoin d'exister: seule la réponse du serveur compte.
+    """
+    def probe():
+        if not client:
+            raise RuntimeError("Firestore non initialisé")
+        client.collection(HEALTH_PROBE_COLLECTION).document('probe').get(retry=None, timeout=HEALTH_PROBE_TIMEOUT)
+    return probe
+
+def http_probe(url):
+    """
+    Sonde HTTP: requête HEAD sans authentification vers un endpoint de santé
+
+    L'URL doit être un endpoint peu coûteux: sur une fonction publique (agent fiscal)
+    ou qui traite les GET (alert-engine), l'URL principale exécuterait la fonction
+    à chaque tour. Tout statut < 500 est considéré comme sain.
+    """
+    def probe():
+        import requests
+
+        if not url:
+            raise RuntimeError("URL non configurée")
+        response = requests.head(url, timeout=HEALTH_PROBE_TIMEOUT, allow_redirects=False)
+        if response.status_code >= 500:
+            raise RuntimeError(f"HTTP {response.status_code}")
+    return probe
+
+def http_probe_targets(spec: str = None) -> dict:
+    """'a=url1,b=url2' (HEALTH_HTTP_PROBES par défaut) -> {'a': 'url1', 'b': 'url2'}"""
+    targets = {}
+    for item in (HEALTH_HTTP_PROBES if spec is None else spec).split(','):
+        name, _, url = item.partition('=')
+        if name.strip() and url.strip():
+            targets[name.strip()] = url.strip()
+    return targets
+
+def register_probe(name, probe):
+    """Déclare une sonde (fonction sans argument qui lève une exception si la dépendance est KO)"""
+    _probes[name] = probe
+    with _state_lock:
+        _state[name] = {
+            "status": "unknown",
+            "last_check": None,
+            "last_error": None,
+            "latency_ms": {"last": None, "p50": None, "p99": None},
+            "_samples": deque(maxlen=HEALTH_LATENCY_WINDOW)
+        }
+
+def _percentile(sorted_samples, pct):
+    index = min(len(sorted_samples) - 1, int(round(pct / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+def run_probe(name):
+    """Exécute une sonde et met à jour son état (statut, erreur, latences)"""
+    debut = time.monotonic()
+    error = None
+    try:
+        _probes[name]()
+    except Exception as e:
+        error = str(e)
+    duree_ms = round((time.monotonic() - debut) * 1000, 1)
+
+    with _state_lock:
+        state = _state[name]
+        previous = state["status"]
+        state["_samples"].append(duree_ms)
+        samples = sorted(state["_samples"])
+        state["status"] = "down" if error else "up"
+        state["last_check"] = int(time.time())
+        state["last_error"] = error
+        state["latency_ms"] = {
+            "last": duree_ms,
+            "p50": _percentile(samples, 50),
+            "p99": _percentile(samples, 99)
+        }
+
+    # Logguer uniquement les changements d'état
+    if error and previous != "down":
+        logger.warning("⚠️ Sonde %s en échec: %s", name, error)
+    elif not error and previous == "down":
+        logger.info("✅ Sonde %s rétablie", name)
+
+    return error is None
+
+def _probe_loop():
+    while True:
+        for name in list(_probes):
+            run_probe(name)
+        time.sleep(HEALTH_PROBE_INTERVAL)
+
+def start_health_probes():
+    """
+    Démarre (une seule fois) le thread des sondes
+
+    Appelé à la première requête /health ou /_ah/warmup plutôt qu'à l'import, pour
+    ne pas construire les clients Firestore au démarrage en mode LAZY_BOOT.
+    """
+    global _thread
+
+    if not HEALTH_PROBES_ENABLED or _thread is not None:
+        return
+
+    with _thread_lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_probe_loop, name='health-probes', daemon=True)
+        _thread.start()
+        logger.info("🩺 Sondes de santé démarrées (toutes les %ss)", HEALTH_PROBE_INTERVAL)
+
+# ============================================================================
+# ÉTAT
+# ============================================================================
+
+def health_snapshot():
+    """
+    Retourne le dernier état connu des dépendances
+
+    Statut global: 'healthy' si toutes les sondes sont up, 'degraded' si au moins
+    une est down ou stale, 'starting' tant que des sondes n'ont pas encore tourné.
+    Une dépendance non sondée depuis plus de 3 intervalles est marquée 'stale'.
+    """
+    now = int(time.time())
+    dependencies = {}
+
+    with _state_lock:
+        for name, state in _state.items():
+            status = state["status"]
+            if state["last_check"] and now - state["last_check"] > 3 * HEALTH_PROBE_INTERVAL:
+                status = "stale"
+            dependencies[name] = {
+                "status": status,
+                "last_check": state["last_check"],
+                "last_error": state["last_error"],
+                "latency_ms": dict(state["latency_ms"])
+            }
+
+    statuses = {dep["status"] for dep in dependencies.values()}
+    if not HEALTH_PROBES_ENABLED:
+        overall = "healthy"
+    elif statuses & {"down", "stale"}:
+        overall = "degraded"
+    elif "unknown" in statuses:
+        overall = "starting"
+    else:
+        overall = "healthy"
+
+    return {
+        "status": overall,
+        "probes_enabled": HEALTH_PROBES_ENABLED,
+        "probe_interval": HEALTH_PROBE_INTERVAL,
+        "dependencies": dependencies
+    }
@@ -0,0 +1,548 @@
+"""
+Module Memory Store - Stockage en mémoire pour STORAGE_BACKEND=memory
+Remplace le client Firestore avec le seul sous-ensemble de l'API que les modules
+appellent: collection/document, where ('==', 'in')/order_by/limit/select,
+get/stream, set (merge)/update/create/delete, WriteBatch, DELETE_FIELD/ArrayUnion,
+on_snapshot d'une collection, et pour les routes async collection/where/order_by/
+limit/stream et get/set d'un document. Toute autre méthode (transaction, get_all,
+add, offset, sous-collections...) lève UnsupportedOperation au lieu de se comporter
+différemment de Firestore: un module qui en a besoin doit l'ajouter ici.
+"""
+
+import copy
+import enum
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Fichier JSON chargé au démarrage: {"collection": {"doc_id": {...}}}
+STORAGE_SEED_FILE = os.getenv('STORAGE_SEED_FILE')
+
+_DELETE = object()
+
+
+class UnsupportedOperation(NotImplementedError, AttributeError):
+    """Méthode de l'API Firestore absente du stockage mémoire"""
+
+
+class _FirestoreSubset:
+    """Lève UnsupportedOperation pour toute méthode publique non implémentée"""
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        raise UnsupportedOperation(
+            f"{type(self).__name__}.{name} non supporté par le stockage mémoire (STORAGE_BACKEND=memory)"
+        )
+
+# ============================================================================
+# VALEURS SPÉCIALES (transforms Firestore)
+# ============================================================================
+
+def _now():
+    return datetime.now(timezone.utc)
+
+def _transform(value, current):
+    """
+    Applique une valeur spéciale de google.cloud.firestore à la valeur actuelle du champ
+
+    Seuls DELETE_FIELD et ArrayUnion sont utilisés par les modules; les types sont
+    reconnus par leur nom pour ne pas importer google.cloud.firestore.
+    """
+    kind = type(value).__name__
+    if kind == 'Sentinel' and 'delete' in value.description:
+        return _DELETE
+    if kind == 'ArrayUnion':
+        existing = list(current) if isinstance(current, list) else []
+        return existing + [v for v in value.values if v not in existing]
+    if type(value).__module__.startswith('google.cloud.firestore'):
+        raise UnsupportedOperation(f"Valeur spéciale non supportée par le stockage mémoire: {value!r}")
+    if isinstance(value, dict):
+        return {k: v for k, v in ((k, _transform(v, None)) for k, v in value.items()) if v is not _DELETE}
+    return copy.deepcopy(value)
+
+def _set_path(data, field_path, value):
+    """Affecte data['a']['b'] pour le chemin 'a.b' (DELETE supprime le champ)"""
+    *parents, last = field_path.split('.')
+    for part in parents:
+        if not isinstance(data.get(part), dict):
+            data[part] = {}
+        data = data[part]
+    value = _transform(value, data.get(last))
+    if value is _DELETE:
+        data.pop(last, None)
+    else:
+        data[last] = value
+
+def _merge(target, updates):
+    """set(merge=True): fusionne récursivement les dicts, remplace les autres valeurs"""
+    for key, value in updates.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+            continue
+        value = _transform(value, target.get(key))
+        if value is _DELETE:
+            target.pop(key, None)
+        else:
+            target[key] = value
+
+def _get_path(data, field_path):
+    """Retourne (trouvé, valeur) pour un chemin 'a.b'"""
+    for part in field_path.split('.'):
+        if not isinstance(data, dict) or part not in data:
+            return False, None
+        data = data[part]
+    return True, data
+
+def _sort_key(value):
+    # Ordre des types de Firestore: null < booléens < nombres < dates < chaînes < ...
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, datetime):
+        return (3, value if value.tzinfo else value.replace(tzinfo=timezone.utc))
+    if isinstance(value, str):
+        return (4, value)
+    return (5, repr(value))
+
+# ============================================================================
+# DOCUMENTS
+# ============================================================================
+
+class WriteResult:
+    def __init__(self, update_time):
+        self.update_time = update_time
+
+
+class MemoryDocumentSnapshot(_FirestoreSubset):
+    """Équivalent de DocumentSnapshot (données copiées au moment de la lecture)"""
+
+    def __init__(self, reference, data):
+        self.reference = reference
+        self._data = data
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path):
+        found, value = _get_path(self._data or {}, field_path)
+        if not found:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class MemoryDocumentReference(_FirestoreSubset):
+    """Équivalent de DocumentReference (retry/timeout acceptés et ignorés, comme le probe de health.py)"""
+
+    def __init__(self, store, path: tuple):
+        self._store = store
+        self._path = path
+
+    @property
+    def id(self):
+        return self._path[-1]
+
+    @property
+    def path(self):
+        return '/'.join(self._path)
+
+    def get(self, retry=None, timeout=None):
+        return self._store.read(self)
+
+    def create(self, document_data):
+        return self._store.commit([('create', self, document_data, {})])[0]
+
+    def set(self, document_data, merge=False):
+        return self._store.commit([('set', self, document_data, {'merge': merge})])[0]
+
+    def update(self, field_updates):
+        return self._store.commit([('update', self, field_updates, {})])[0]
+
+    def delete(self):
+        return self._store.commit([('delete', self, None, {})])[0].update_time
+
+    def __eq__(self, other):
+        return isinstance(other, MemoryDocumentReference) and other._path == self._path
+
+    def __hash__(self):
+        return hash(self._path)
+
+# ============================================================================
+# REQUÊTES
+# ============================================================================
+
+_OPERATORS = {
+    '==': lambda a, b: a == b,
+    'in': lambda a, b: a in b,
+}
+
+
+class MemoryQuery(_FirestoreSubset):
+    """Équivalent de Query: filtres, tri, projection et limite appliqués en mémoire"""
+
+    def __init__(self, store, path: tuple, filters=(), orders=(), limit=None, projection=None):
+        self._store = store
+        self._path = path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._projection = projection
+
+    def _copy(self, **changes):
+        params = dict(filters=self._filters, orders=self._orders, limit=self._limit, projection=self._projection)
+        params.update(changes)
+        return MemoryQuery(self._store, self._path, **params)
+
+    def where(self, field_path, op_string, value):
+        if op_string not in _OPERATORS:
+            raise UnsupportedOperation(f"Opérateur non supporté par le stockage mémoire: {op_string}")
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction='ASCENDING'):
+        return self._copy(orders=self._orders + ((field_path, direction == 'DESCENDING'),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def select(self, field_paths):
+        return self._copy(projection=list(field_paths))
+
+    def _matches(self, data):
+        for field_path, op_string, value in self._filters:
+            found, current = _get_path(data, field_path)
+            if not found or not _OPERATORS[op_string](current, value):
+                return False
+        # Firestore exclut les documents sans le champ de tri
+        return all(_get_path(data, field_path)[0] for field_path, _ in self._orders)
+
+    def stream(self):
+        documents = [(reference, data) for reference, data in self._store.scan(self._path) if self._matches(data)]
+
+        for field_path, descending in reversed(self._orders):
+            documents.sort(key=lambda d: _sort_key(_get_path(d[1], field_path)[1]), reverse=descending)
+
+        if self._limit is not None:
+            documents = documents[:self._limit]
+
+        for reference, data in documents:
+            if self._projection is not None:
+                projected = {}
+                for field_path in self._projection:
+                    found, value = _get_path(data, field_path)
+                    if found:
+                        _set_path(projected, field_path, value)
+                data = projected
+            yield MemoryDocumentSnapshot(reference, data)
+
+    def get(self):
+        return list(self.stream())
+
+
+class MemoryCollectionReference(MemoryQuery):
+    """Équivalent de CollectionReference"""
+
+    def __init__(self, store, path: tuple):
+        super().__init__(store, path)
+
+    @property
+    def id(self):
+        return self._path[-1]
+
+    def document(self, document_id):
+        return MemoryDocumentReference(self._store, self._path + (document_id,))
+
+    def on_snapshot(self, callback):
+        """callback(documents, changes, read_time), voir MemoryWatch"""
+        return MemoryWatch(self._store, self, callback)
+
+# ============================================================================
+# ÉCOUTE DES CHANGEMENTS (on_snapshot)
+# ============================================================================
+
+class ChangeType(enum.Enum):
+    """Équivalent de google.cloud.firestore_v1.watch.ChangeType"""
+    ADDED = 1
+    REMOVED = 2
+    MODIFIED = 3
+
+
+class DocumentChange:
+    """Équivalent de DocumentChange"""
+
+    def __init__(self, type, document, old_index, new_index):
+        self.type = type
+        self.document = document
+        self.old_index = old_index
+        self.new_index = new_index
+
+
+class MemoryWatch:
+    """
+    Équivalent de Watch (retourné par on_snapshot d'une collection), synchrone
+
+    Le callback est appelé une première fois avec l'état courant (tous les documents
+    en ADDED), puis dans le thread qui écrit, après chaque commit qui touche la
+    collection, avec les documents ajoutés, modifiés ou retirés.
+    """
+
+    def __init__(self, store, collection, callback):
+        self._store = store
+        self._collection = collection
+        self._callback = callback
+        self._lock = threading.Lock()
+        self._documents = {}  # id -> dernier snapshot transmis
+        store.add_watch(self)
+        self.refresh(initial=True)
+
+    def affected_by(self, references):
+        return any(reference._path[:-1] == self._collection._path for reference in references)
+
+    def refresh(self, initial=False):
+        """Compare l'état courant de la collection au dernier transmis et appelle le callback si besoin"""
+        with self._lock:
+            snapshots = self._collection.get()
+            previous = self._documents
+            current = {snapshot.id: snapshot for snapshot in snapshots}
+            old_indexes = {doc_id: index for index, doc_id in enumerate(previous)}
+
+            changes = [
+                DocumentChange(ChangeType.REMOVED, snapshot, old_indexes[doc_id], -1)
+                for doc_id, snapshot in previous.items() if doc_id not in current
+            ]
+            for new_index, snapshot in enumerate(snapshots):
+                old = previous.get(snapshot.id)
+                if old is None:
+                    changes.append(DocumentChange(ChangeType.ADDED, snapshot, -1, new_index))
+                elif old._data != snapshot._data:
+                    changes.append(DocumentChange(ChangeType.MODIFIED, snapshot, old_indexes[snapshot.id], new_index))
+            self._documents = current
+
+        if changes or initial:
+            self._callback(snapshots, changes, _now())
+
+    def unsubscribe(self):
+        self._store.remove_watch(self)
+
+# ============================================================================
+# BATCH ET CLIENT
+# ============================================================================
+
+class MemoryWriteBatch(_FirestoreSubset):
+    """Équivalent de WriteBatch: toutes les écritures sont appliquées ou aucune"""
+
+    def __init__(self, store):
+        self._store = store
+        self._writes = []
+
+    def create(self, reference, document_data):
+        self._writes.append(('create', reference, document_data, {}))
+
+    def set(self, reference, document_data, merge=False):
+        self._writes.append(('set', reference, document_data, {'merge': merge}))
+
+    def update(self, reference, field_updates):
+        self._writes.append(('update', reference, field_updates, {}))
+
+    def delete(self, reference):
+        self._writes.append(('delete', reference, None, {}))
+
+    def commit(self):
+        writes, self._writes = self._writes, []
+        return self._store.commit(writes)
+
+    def __len__(self):
+        return len(self._writes)
+
+
+class MemoryStore:
+    """Données de toutes les collections: {chemin de collection: {id: données}}"""
+
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.RLock()
+        self._watches = []
+
+    def add_watch(self, watch):
+        with self._lock:
+            self._watches.append(watch)
+
+    def remove_watch(self, watch):
+        with self._lock:
+            if watch in self._watches:
+                self._watches.remove(watch)
+
+    def _notify(self, references):
+        """Prévient les écoutes concernées, après l'écriture et hors du verrou du stockage"""
+        with self._lock:
+            watches = [watch for watch in self._watches if watch.affected_by(references)]
+        for watch in watches:
+            try:
+                watch.refresh()
+            except Exception as e:
+                logger.error("Erreur dans un callback on_snapshot: %s", e)
+
+    def read(self, reference):
+        with self._lock:
+            data = self._collections.get(reference._path[:-1], {}).get(reference.id)
+        return MemoryDocumentSnapshot(reference, copy.deepcopy(data))
+
+    def scan(self, collection_path):
+        with self._lock:
+            entries = list(self._collections.get(collection_path, {}).items())
+        return [
+            (MemoryDocumentReference(self, collection_path + (doc_id,)), copy.deepcopy(data))
+            for doc_id, data in entries
+        ]
+
+    def commit(self, writes):
+        """Applique des écritures de façon atomique (préconditions vérifiées avant toute écriture)"""
+        from google.api_core.exceptions import AlreadyExists, NotFound
+
+        with self._lock:
+            for operation, reference, _, _ in writes:
+                exists = reference.id in self._collections.get(reference._path[:-1], {})
+                if operation == 'create' and exists:
+                    raise AlreadyExists(f"Document already exists: {reference.path}")
+                if operation == 'update' and not exists:
+                    raise NotFound(f"No document to update: {reference.path}")
+
+            for operation, reference, data, options in writes:
+                documents = self._collections.setdefault(reference._path[:-1], {})
+
+                if operation == 'delete':
+                    documents.pop(reference.id, None)
+                elif operation == 'update':
+                    new_data = copy.deepcopy(documents[reference.id])
+                    for field_path, value in data.items():
+                        _set_path(new_data, field_path, value)
+                    documents[reference.id] = new_data
+                elif operation == 'set' and options.get('merge') and reference.id in documents:
+                    new_data = copy.deepcopy(documents[reference.id])
+                    _merge(new_data, data)
+                    documents[reference.id] = new_data
+                else:
+                    documents[reference.id] = _transform(data, None)
+
+        self._notify([reference for _, reference, _, _ in writes])
+        now = _now()
+        return [WriteResult(now) for _ in writes]
+
+    def load(self, collections: dict):
+        """Charge des documents: {collection: {id: données}}"""
+        with self._lock:
+            for collection_path, documents in collections.items():
+                target = self._collections.setdefault((collection_path,), {})
+                for doc_id, data in documents.items():
+                    target[doc_id] = copy.deepcopy(data)
+
+
+class MemoryClient(_FirestoreSubset):
+    """Équivalent de firestore.Client, adossé à un MemoryStore"""
+
+    def __init__(self, store=None):
+        self._store = store or MemoryStore()
+
+    def collection(self, collection_id):
+        return MemoryCollectionReference(self._store, (collection_id,))
+
+    def batch(self):
+        return MemoryWriteBatch(self._store)
+
+# ============================================================================
+# CLIENT ASYNC (équivalent de firestore.AsyncClient)
+# ============================================================================
+
+class MemoryAsyncQuery(_FirestoreSubset):
+    """Équivalent de AsyncQuery: mêmes requêtes, lecture en coroutine"""
+
+    def __init__(self, query):
+        self._query = query
+
+    def where(self, field_path, op_string, value):
+        return MemoryAsyncQuery(self._query.where(field_path, op_string, value))
+
+    def order_by(self, field_path, direction='ASCENDING'):
+        return MemoryAsyncQuery(self._query.order_by(field_path, direction))
+
+    def limit(self, count):
+        return MemoryAsyncQuery(self._query.limit(count))
+
+    async def stream(self):
+        for snapshot in self._query.stream():
+            yield snapshot
+
+
+class MemoryAsyncCollectionReference(MemoryAsyncQuery):
+    """Équivalent de AsyncCollectionReference"""
+
+    def document(self, document_id):
+        return MemoryAsyncDocumentReference(self._query.document(document_id))
+
+
+class MemoryAsyncDocumentReference(_FirestoreSubset):
+    """Équivalent de AsyncDocumentReference (get et set, seules opérations de operation_async utilisées)"""
+
+    def __init__(self, reference):
+        self._reference = reference
+
+    @property
+    def id(self):
+        return self._reference.id
+
+    async def get(self):
+        return self._reference.get()
+
+    async def set(self, document_data, merge=False):
+        return self._reference.set(document_data, merge=merge)
+
+
+class MemoryAsyncClient(_FirestoreSubset):
+    """Équivalent de firestore.AsyncClient, adossé au même MemoryStore que le client synchrone"""
+
+    def __init__(self, client: MemoryClient):
+        self._client = client
+
+    def collection(self, collection_id):
+        return MemoryAsyncCollectionReference(self._client.collection(collection_id))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def memory_client() -> MemoryClient:
+    """
+    Client mémoire partagé par tous les modules (une seule base par processus)
+
+    Chargé depuis STORAGE_SEED_FILE s'il est défini.
+    """
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            _client = MemoryClient()
+            if STORAGE_SEED_FILE:
+                with open(STORAGE_SEED_FILE) as f:
+                    _client._store.load(json.load(f))
+                logger.info("💾 Stockage mémoire chargé depuis %s", STORAGE_SEED_FILE)
+            else:
+                logger.info("💾 Stockage mémoire initialisé (vide)")
+    return _client
+
+def memory_async_client() -> MemoryAsyncClient:
+    """Client mémoire async, qui partage les données du client synchrone (memory_client)"""
+    return MemoryAsyncClient(memory_client())
@@ -0,0 +1,252 @@
+"""
+Module Metrics - Compteurs et histogrammes au format Prometheus (exposés par /metrics)
+Registre en mémoire par processus (gunicorn tourne avec un seul worker), sans dépendance
+externe: le format texte d'exposition est généré directement.
+"""
+
+from flask import g, request
+import os
+import threading
+import time
+from bisect import bisect_left
+from .tracing import inject_headers, span
+
+# Connexions simultanées du client httpx des routes async (appels sortants)
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv('ASYNC_HTTP_MAX_CONNECTIONS', '1000'))
+
+# Bornes des histogrammes (secondes), celles de prometheus_client plus 30s pour les appels sortants
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+# ============================================================================
+# TYPES DE MÉTRIQUES
+# ============================================================================
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    """Compteur monotone, avec labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {value}")
+        return lines
+
+
+class Histogram:
+    """Histogramme cumulatif (durées en secondes), avec labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # labelvalues -> [compteurs par bucket (+Inf inclus), somme]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+
+        for labelvalues, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                labels = _format_labels(self.labelnames, labelvalues, ('le', le))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    """Retourne toutes les métriques au format texte Prometheus (version 0.0.4)"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+# ============================================================================
+# MÉTRIQUES DU BACKEND
+# ============================================================================
+
+http_requests_total = Counter(
+    'http_requests_total', "Requêtes HTTP traitées", ('route', 'method', 'status')
+)
+http_request_duration_seconds = Histogram(
+    'http_request_duration_seconds', "Durée de traitement des requêtes HTTP", ('route', 'method')
+)
+firestore_operations_total = Counter(
+    'firestore_operations_total', "Opérations Firestore", ('collection', 'operation')
+)
+firestore_operation_duration_seconds = Histogram(
+    'firestore_operation_duration_seconds', "Durée des opérations Firestore", ('collection', 'operation')
+)
+firestore_documents_total = Counter(
+    'firestore_documents_total', "Documents Firestore lus/écrits", ('collection', 'kind')
+)
+outbound_requests_total = Counter(
+    'outbound_requests_total', "Appels sortants (alert-engine, agent fiscal)", ('target', 'outcome')
+)
+outbound_request_duration_seconds = Histogram(
+    'outbound_request_duration_seconds', "Durée des appels sortants", ('target',)
+)
+
+def observe_firestore(collection: str, operation: str, seconds: float = None):
+    """Enregistre une opération Firestore (durée optionnelle: écritures en batch)"""
+    firestore_operations_total.inc(collection, operation)
+    if seconds is not None:
+        firestore_operation_duration_seconds.observe(seconds, collection, operation)
+
+def observe_firestore_documents(collection: str, reads: int = 0, writes: int = 0):
+    """Compte les documents lus/écrits par une opération Firestore"""
+    if reads:
+        firestore_documents_total.inc(collection, 'read', amount=reads)
+    if writes:
+        firestore_documents_total.inc(collection, 'write', amount=writes)
+
+def observe_outbound(target: str, seconds: float, outcome: str):
+    """Enregistre un appel sortant (outcome: ok, http_<code>, timeout, erreur)"""
+    outbound_requests_total.inc(target, outcome)
+    outbound_request_duration_seconds.observe(seconds, target)
+
+def outbound_request(target: str, method: str, url: str, **kwargs):
+    """
+    requests.request() mesuré (durée et résultat par cible) et tracé
+
+    Le header traceparent est ajouté pour relier la trace au service appelé.
+    Les exceptions de requests sont propagées telles quelles.
+    """
+    import requests
+
+    debut = time.perf_counter()
+    outcome = 'erreur'
+    attributes = {"http.method": method, "http.url": url, "peer.service": target}
+    with span(f"{method} {target}", 'CLIENT', **attributes) as current:
+        try:
+            kwargs['headers'] = inject_headers(kwargs.get('headers'))
+            response = requests.request(method, url, **kwargs)
+            current.set_attribute("http.status_code", response.status_code)
+            outcome = 'ok' if response.status_code < 400 else f"http_{response.status_code}"
+            return response
+        except requests.exceptions.Timeout:
+            outcome = 'timeout'
+            raise
+        finally:
+            observe_outbound(target, time.perf_counter() - debut, outcome)
+
+_async_http_client = None
+
+def async_http_client():
+    """
+    Client httpx.AsyncClient partagé par les appels sortants des routes async
+
+    Construit au premier appel dans la boucle d'évènements (une par processus),
+    avec au plus ASYNC_HTTP_MAX_CONNECTIONS connexions simultanées.
+    """
+    global _async_http_client
+    import httpx
+
+    if _async_http_client is None:
+        _async_http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=ASYNC_HTTP_MAX_CONNECTIONS, max_keepalive_connections=100)
+        )
+    return _async_http_client
+
+async def close_async_http_client():
+    """Ferme le client httpx partagé (arrêt de l'application ASGI)"""
+    global _async_http_client
+
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+        _async_http_client = None
+
+async def outbound_request_async(target: str, method: str, url: str, **kwargs):
+    """
+    Équivalent async de outbound_request(), avec le client httpx partagé
+
+    Les exceptions de httpx sont propagées telles quelles.
+    """
+    import httpx
+
+    debut = time.perf_counter()
+    outcome = 'erreur'
+    attributes = {"http.method": method, "http.url": url, "peer.service": target}
+    with span(f"{method} {target}", 'CLIENT', **attributes) as current:
+        try:
+            kwargs['headers'] = inject_headers(kwargs.get('headers'))
+            response = await async_http_client().request(method, url, **kwargs)
+            current.set_attribute("http.status_code", response.status_code)
+            outcome = 'ok' if response.status_code < 400 else f"http_{response.status_code}"
+            return response
+        except httpx.TimeoutException:
+            outcome = 'timeout'
+            raise
+        finally:
+            observe_outbound(target, time.perf_counter() - debut, outcome)
+
+# ============================================================================
+# INSTRUMENTATION FLASK
+# ============================================================================
+
+def observe_request(route: str, method: str, status_code: int, seconds: float):
+    """Enregistre une requête HTTP traitée (route déclarée, pas le chemin)"""
+    http_requests_total.inc(route, method, str(status_code))
+    http_request_duration_seconds.observe(seconds, route, method)
+
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+
+def _record_request(response):
+    start = getattr(g, 'metrics_start', None)
+    if start is None:
+        return response
+
+    # Route déclarée (ex: /tasks/org/<org_id>) pour garder une cardinalité bornée
+    route = request.url_rule.rule if request.url_rule else '<unmatched>'
+    observe_request(route, request.method, response.status_code, time.perf_counter() - start)
+    return response
+
+def init_metrics(app):
+    """Mesure chaque requête de l'application Flask (à appeler avant les autres before_request)"""
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
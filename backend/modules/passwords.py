@@ -0,0 +1,235 @@
+"""
+Module Passwords - Hachage et vérification des mots de passe
+Un seul vérificateur pour tous les formats stockés (bcrypt, PBKDF2, ancien format
+'salt:hash' d'AuthService), reconnus par leur préfixe. Les hash qui ne correspondent
+pas au schéma/paramètres configurés sont recalculés à la connexion.
+Les calculs tournent dans un pool dédié et borné pour qu'une rafale de connexions
+ne monopolise pas les threads gunicorn qui servent les autres endpoints.
+"""
+
+import bcrypt
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+PASSWORD_HASH_SCHEME = os.getenv('PASSWORD_HASH_SCHEME', 'bcrypt')  # 'bcrypt' ou 'pbkdf2_sha256'
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))  # Facteur de coût bcrypt (2^rounds itérations)
+PBKDF2_ITERATIONS = int(os.getenv('PBKDF2_ITERATIONS', '600000'))  # Itérations PBKDF2-SHA256
+LEGACY_PBKDF2_ITERATIONS = 100000  # Ancien format 'salt:hash' d'AuthService
+REQUEST_THREADS = int(os.getenv('REQUEST_THREADS', '8'))  # Threads gunicorn qui servent les requêtes
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))  # Calculs de hachage simultanés
+# Calculs en attente max. Chaque calcul (en cours ou en attente) bloque un thread de
+# requête: par défaut au plus la moitié des threads attendent un hachage, les autres
+# restent disponibles pour les autres routes
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv(
+    'PASSWORD_HASH_QUEUE_SIZE', str(max(0, REQUEST_THREADS // 2 - PASSWORD_HASH_WORKERS))
+))
+PASSWORD_HASH_METRICS_WINDOW = 1000  # Nombre de mesures conservées pour les percentiles
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE)
+
+_metrics_lock = threading.Lock()
+_queue_times_ms = deque(maxlen=PASSWORD_HASH_METRICS_WINDOW)
+_run_times_ms = deque(maxlen=PASSWORD_HASH_METRICS_WINDOW)
+_rejected = 0
+
+
+class PasswordHasherBusy(Exception):
+    """Levée quand PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE calculs sont déjà en cours"""
+
+
+# ============================================================================
+# POOL DE HACHAGE
+# ============================================================================
+
+def _run_in_pool(fn, *args):
+    """Exécute fn dans le pool de hachage et attend son résultat"""
+    global _rejected
+
+    if not _slots.acquire(blocking=False):
+        with _metrics_lock:
+            _rejected += 1
+        raise PasswordHasherBusy("File de hachage des mots de passe pleine")
+
+    submitted_at = time.monotonic()
+
+    def task():
+        started_at = time.monotonic()
+        try:
+            return fn(*args)
+        finally:
+            with _metrics_lock:
+                _queue_times_ms.append((started_at - submitted_at) * 1000)
+                _run_times_ms.append((time.monotonic() - started_at) * 1000)
+
+    try:
+        future = _executor.submit(task)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+
+    return future.result()
+
+def _percentile(values, pct):
+    """Percentile simple (valeur la plus proche) d'une liste de mesures"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 2)
+
+def hasher_stats() -> dict:
+    """Statistiques du pool de hachage (temps d'attente et de calcul en ms)"""
+    with _metrics_lock:
+        queue_times = list(_queue_times_ms)
+        run_times = list(_run_times_ms)
+        rejected = _rejected
+
+    return {
+        "scheme": PASSWORD_HASH_SCHEME,
+        "rounds": BCRYPT_ROUNDS,
+        "workers": PASSWORD_HASH_WORKERS,
+        "queue_size": PASSWORD_HASH_QUEUE_SIZE,
+        "samples": len(run_times),
+        "rejected": rejected,
+        "queue_ms": {"p50": _percentile(queue_times, 50), "p99": _percentile(queue_times, 99)},
+        "hash_ms": {"p50": _percentile(run_times, 50), "p99": _percentile(run_times, 99)}
+    }
+
+# ============================================================================
+# HACHAGE / VÉRIFICATION
+# ============================================================================
+
+def bcrypt_rounds_of(password_hash: str) -> int:
+    """Extrait le facteur de coût d'un hash bcrypt ($2b$<rounds>$...)"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return 0
+
+def identify_hash(password_hash: str) -> str:
+    """
+    Identifie le format d'un hash stocké à partir de son préfixe
+
+    Returns:
+        'bcrypt' ($2a$/$2b$/$2y$), 'pbkdf2_sha256' (pbkdf2_sha256$...),
+        'legacy_pbkdf2' ('salt:hash' d'AuthService) ou 'unknown'
+    """
+    if password_hash.startswith(('$2a$', '$2b$', '$2y$')):
+        return 'bcrypt'
+    if password_hash.startswith('pbkdf2_sha256$'):
+        return 'pbkdf2_sha256'
+    if password_hash.count(':') == 1:
+        return 'legacy_pbkdf2'
+    return 'unknown'
+
+def _pbkdf2(password: str, salt: str, iterations: int) -> str:
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), iterations).hex()
+
+def _hash(password: str, scheme: str, rounds: int = None) -> str:
+    """Calcule un hash au format du schéma donné (bloquant)"""
+    if scheme == 'pbkdf2_sha256':
+        salt = secrets.token_hex(16)
+        return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${salt}${_pbkdf2(password, salt, PBKDF2_ITERATIONS)}"
+
+    rounds = BCRYPT_ROUNDS if rounds is None else rounds
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+def _verify(password: str, password_hash: str, kind: str) -> bool:
+    """Vérifie un mot de passe contre un hash d'un format donné (bloquant)"""
+    if kind == 'bcrypt':
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    if kind == 'pbkdf2_sha256':
+        _, iterations, salt, expected = password_hash.split('$')
+        return hmac.compare_digest(_pbkdf2(password, salt, int(iterations)), expected)
+
+    if kind == 'legacy_pbkdf2':
+        salt, expected = password_hash.split(':')
+        return hmac.compare_digest(_pbkdf2(password, salt, LEGACY_PBKDF2_ITERATIONS), expected)
+
+    return False
+
+def _needs_rehash(password_hash: str, kind: str) -> bool:
+    """Indique si un hash valide ne correspond pas au schéma et aux paramètres configurés"""
+    if kind != PASSWORD_HASH_SCHEME:
+        return True
+    if kind == 'bcrypt':
+        return bcrypt_rounds_of(password_hash) != BCRYPT_ROUNDS
+    return int(password_hash.split('$')[1]) != PBKDF2_ITERATIONS
+
+def hash_password(password: str, rounds: int = None) -> str:
+    """Hache un mot de passe au schéma configuré (dans le pool dédié)"""
+    return _run_in_pool(_hash, password, PASSWORD_HASH_SCHEME, rounds)
+
+def verify_password(password: str, password_hash: str):
+    """
+    Vérifie un mot de passe contre un hash stocké, quel que soit son format (dans le pool dédié)
+
+    Returns:
+        (mot de passe valide, hash à recalculer car son schéma ou ses paramètres
+         diffèrent de la configuration)
+    """
+    if not password_hash:
+        return False, False
+
+    kind = identify_hash(password_hash)
+    if kind == 'unknown':
+        return False, False
+
+    try:
+        valid = _run_in_pool(_verify, password, password_hash, kind)
+    except ValueError:
+        # Hash stocké invalide
+        return False, False
+
+    return valid, valid and _needs_rehash(password_hash, kind)
+
+def stored_password_hash(user_data: dict) -> str:
+    """Hash stocké d'un utilisateur ('passwordHash', ou 'password_hash' pour les comptes AuthService)"""
+    return user_data.get('passwordHash') or user_data.get('password_hash', '')
+
+def password_hash_update(new_hash: str) -> dict:
+    """Mise à jour Firestore d'un hash: champ unique 'passwordHash', ancien champ supprimé"""
+    from google.cloud import firestore
+
+    return {
+        'passwordHash': new_hash,
+        'password_hash': firestore.DELETE_FIELD
+    }
+
+def rehash_in_background(password: str, on_rehashed):
+    """
+    Recalcule le hash au schéma courant sans bloquer la requête de connexion
+
+    Args:
+        on_rehashed: Appelé avec le nouveau hash (ex: écriture Firestore)
+    """
+    def task():
+        try:
+            on_rehashed(_hash(password, PASSWORD_HASH_SCHEME))
+        except Exception as e:
+            logger.error("❌ Erreur lors du recalcul du hash: %s", e)
+        finally:
+            _slots.release()
+
+    # Tâche facultative: ignorée si la file est pleine
+    if not _slots.acquire(blocking=False):
+        logger.info("File de hachage pleine, recalcul du hash reporté à la prochaine connexion")
+        return
+
+    _executor.submit(task)
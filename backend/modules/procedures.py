@@ -4,10 +4,10 @@ Auteur: Système de démarches
 """
 
 from flask import Blueprint, request, jsonify
-from google.cloud import firestore
 import logging
 import os
 from datetime import datetime
+from .firestore_client import lazy_firestore_client
 
 # Créer le blueprint pour les démarches
 procedures_bp = Blueprint('procedures', __name__)
@@ -21,14 +21,16 @@ logger = logging.getLogger(__name__)
 GCP_PROJECT = os.getenv('GCP_PROJECT')
 MAX_PROCEDURES = int(os.getenv('MAX_PROCEDURES', '100'))
 
-# Initialize Firestore pour les démarches
-db = None
-if GCP_PROJECT:
-    try:
-        db = firestore.Client(project=GCP_PROJECT)
-        logger.info(f"✅ Firestore initialisé pour les démarches: {GCP_PROJECT}")
-    except Exception as e:
-        logger.error(f"❌ Erreur Firestore pour démarches: {e}")
+# Initialize Firestore pour les démarches (construit à la première utilisation si LAZY_BOOT)
+def _create_db():
+    if not GCP_PROJECT:
+        return None
+    from google.cloud import firestore
+    client = firestore.Client(project=GCP_PROJECT)
+    logger.info("✅ Firestore initialisé pour les démarches: %s", GCP_PROJECT)
+    return client
+
+db = lazy_firestore_client(_create_db, 'procedures')
 
 # ============================================================================
 # FONCTIONS UTILITAIRES PROCEDURES
@@ -45,7 +47,7 @@ def transform_firestore_to_frontend(doc_data, doc_id):
         try:
             current_step = int(current_step) if current_step is not None else 0
         except (ValueError, TypeError):
-            logger.warning(f"Valeur non numérique détectée pour current_step: {current_step}")
+            logger.warning("Valeur non numérique détectée pour current_step: %s", current_step)
             current_step = 0
             
         # Si total_steps n'est pas défini, définir une valeur par défaut basée sur le type
@@ -60,7 +62,7 @@ def transform_firestore_to_frontend(doc_data, doc_id):
             try:
                 total_steps = int(total_steps)
             except (ValueError, TypeError):
-                logger.warning(f"Valeur non numérique détectée pour total_steps: {total_steps}")
+                logger.warning("Valeur non numérique détectée pour total_steps: %s", total_steps)
                 total_steps = 5
         
         progress = int((current_step / total_steps) * 100) if total_steps > 0 else 0
@@ -130,11 +132,11 @@ def transform_firestore_to_frontend(doc_data, doc_id):
         }
         
     except Exception as e:
-        logger.error(f"Erreur transformation données: {e}")
-        logger.error(f"Document ID: {doc_id}")
-        logger.error(f"Données document: {doc_data}")
+        logger.error("Erreur transformation données: %s", e)
+        logger.error("Document ID: %s", doc_id)
+        logger.error("Données document: %s", doc_data)
         import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("Traceback: %s", traceback.format_exc())
         return None
 
 def calculate_deadline_from_period(periode, declaration_type):
@@ -174,7 +176,7 @@ def calculate_deadline_from_period(periode, declaration_type):
         return deadline.strftime('%Y-%m-%d')
         
     except Exception as e:
-        logger.error(f"Erreur calcul deadline: {e}")
+        logger.error("Erreur calcul deadline: %s", e)
         # Fallback
         from datetime import timedelta
         deadline = datetime.now() + timedelta(days=30)
@@ -190,7 +192,7 @@ def get_procedures_from_firestore(user_id=None):
         declarations_ref = db.collection('declarations')
         
         # Pour debug : récupérer toutes les démarches d'abord
-        logger.info("🔍 Debug: Récupération de toutes les démarches pour analyse...")
+        logger.debug("🔍 Debug: Récupération de toutes les démarches pour analyse...")
         query = declarations_ref.limit(10)  # Limiter pour le debug
         
         docs = query.stream()
@@ -198,25 +200,25 @@ def get_procedures_from_firestore(user_id=None):
         procedures = []
         for doc in docs:
             doc_data = doc.to_dict()
-            logger.info(f"📄 Document trouvé: {doc.id}")
-            logger.info(f"   Champs: {list(doc_data.keys())}")
-            logger.info(f"   user_id: {doc_data.get('user_id', 'NON TROUVÉ')}")
-            logger.info(f"   type: {doc_data.get('type', 'NON TROUVÉ')}")
+            # Détail par document en DEBUG (arguments formatés seulement si le log est écrit)
+            logger.debug("📄 Document trouvé: %s (champs: %s, user_id: %s, type: %s)",
+                         doc.id, list(doc_data), doc_data.get('user_id', 'NON TROUVÉ'),
+                         doc_data.get('type', 'NON TROUVÉ'))
             
             # Filtrer par user_id si spécifié
             if user_id and doc_data.get('user_id') != user_id:
-                logger.info(f"   ⏭️ Ignoré (user_id ne correspond pas)")
+                logger.debug("   ⏭️ Ignoré (user_id ne correspond pas)")
                 continue
                 
             transformed = transform_firestore_to_frontend(doc_data, doc.id)
             if transformed:
                 procedures.append(transformed)
         
-        logger.info(f"Récupéré {len(procedures)} démarches depuis Firestore")
+        logger.info("Récupéré %d démarches depuis Firestore", len(procedures))
         return procedures
         
     except Exception as e:
-        logger.error(f"Erreur lors de la récupération des démarches: {e}")
+        logger.error("Erreur lors de la récupération des démarches: %s", e)
         return []
 
 # ============================================================================
@@ -232,7 +234,7 @@ def get_procedures():
         # les documents réels qui ont d'autres valeurs comme 'gemini_detection'.
         user_id = request.args.get('user_id', None)
 
-        logger.info(f"Récupération des démarches pour user_id: {user_id if user_id else 'ALL'}")
+        logger.info("Récupération des démarches pour user_id: %s", user_id or 'ALL')
 
         # Récupérer depuis Firestore
         procedures = get_procedures_from_firestore(user_id)
@@ -245,7 +247,7 @@ def get_procedures():
         })
         
     except Exception as e:
-        logger.error(f"Erreur endpoint /procedures: {e}")
+        logger.error("Erreur endpoint /procedures: %s", e)
         return jsonify({
             'success': False,
             'error': str(e),
@@ -258,7 +260,7 @@ def procedures_health():
     try:
         status = "healthy"
         checks = {
-            "firestore": db is not None,
+            "firestore": bool(db),
             "gcp_project": GCP_PROJECT is not None
         }
         
@@ -287,7 +289,7 @@ def procedures_config():
         "config": {
             "gcp_project": GCP_PROJECT,
             "max_procedures": MAX_PROCEDURES,
-            "firestore_connected": db is not None
+            "firestore_connected": bool(db)
         }
     })
 
@@ -0,0 +1,127 @@
+"""
+Module Request Accounting - Lectures/écritures Firestore par requête HTTP
+Chaque requête reçoit un compteur (documents lus/écrits, temps passé dans Firestore),
+renvoyé dans le header Server-Timing et loggué avec des champs structurés.
+"""
+
+from flask import g, request
+from contextvars import ContextVar
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Logguer le bilan Firestore des requêtes qui lisent au moins N documents (-1 = jamais).
+# Par défaut seules les requêtes coûteuses sont logguées; Server-Timing couvre les autres.
+REQUEST_ACCOUNTING_LOG_MIN_READS = int(os.getenv('REQUEST_ACCOUNTING_LOG_MIN_READS', '500'))
+
+_current = ContextVar('request_accountant', default=None)
+
+# ============================================================================
+# COMPTEUR PAR REQUÊTE
+# ============================================================================
+
+class RequestAccountant:
+    """Documents lus/écrits et temps passé dans Firestore pendant une requête"""
+
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        self.operations = 0
+        self.firestore_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, reads: int = 0, writes: int = 0):
+        with self._lock:
+            self.operations += 1
+            self.reads += reads
+            self.writes += writes
+            self.firestore_seconds += seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "firestore_reads": self.reads,
+            "firestore_writes": self.writes,
+            "firestore_operations": self.operations,
+            "firestore_ms": round(self.firestore_seconds * 1000, 1)
+        }
+
+
+def record_firestore(seconds: float, reads: int = 0, writes: int = 0):
+    """
+    Impute une opération Firestore à la requête en cours
+
+    Sans requête en cours (thread en arrière-plan, script), l'appel est ignoré.
+    """
+    accountant = _current.get()
+    if accountant is not None:
+        accountant.record(seconds, reads=reads, writes=writes)
+
+def current_accountant():
+    """Retourne le compteur de la requête en cours, ou None"""
+    return _current.get()
+
+def start_accounting():
+    """Ouvre un compteur pour la requête en cours; retourne (compteur, token pour stop_accounting)"""
+    accountant = RequestAccountant()
+    return accountant, _current.set(accountant)
+
+def stop_accounting(token):
+    _current.reset(token)
+
+def accounting_headers(accountant: RequestAccountant, total_ms: float) -> list:
+    """Headers (nom, valeur) Server-Timing du bilan d'une requête"""
+    return [
+        ('Server-Timing',
+         f'firestore;dur={round(accountant.firestore_seconds * 1000, 1)};'
+         f'desc="reads={accountant.reads} writes={accountant.writes}"'),
+        ('Server-Timing', f'app;dur={total_ms}'),
+        # Permet au frontend (autre origine) de lire Server-Timing via l'API Performance
+        ('Timing-Allow-Origin', '*'),
+    ]
+
+def log_accounting(accountant: RequestAccountant, method: str, path: str, total_ms: float):
+    """Loggue le bilan Firestore d'une requête (selon REQUEST_ACCOUNTING_LOG_MIN_READS)"""
+    if accountant.operations and 0 <= REQUEST_ACCOUNTING_LOG_MIN_READS <= accountant.reads:
+        stats = accountant.as_dict()
+        logger.info(
+            "📊 %s %s reads=%d writes=%d firestore=%sms total=%sms",
+            method, path, accountant.reads, accountant.writes, stats['firestore_ms'], total_ms,
+            extra={**stats, "http_method": method, "http_path": path, "duration_ms": total_ms}
+        )
+
+# ============================================================================
+# INSTRUMENTATION FLASK
+# ============================================================================
+
+def _start_accounting():
+    g.request_accounting_start = time.perf_counter()
+    g.request_accountant, g.request_accounting_token = start_accounting()
+
+def _emit_accounting(response):
+    accountant = getattr(g, 'request_accountant', None)
+    if accountant is None:
+        return response
+
+    total_ms = round((time.perf_counter() - g.request_accounting_start) * 1000, 1)
+    for name, value in accounting_headers(accountant, total_ms):
+        response.headers.add(name, value)
+    log_accounting(accountant, request.method, request.path, total_ms)
+    return response
+
+def _end_accounting(exc):
+    token = getattr(g, 'request_accounting_token', None)
+    if token is not None:
+        stop_accounting(token)
+
+def init_request_accounting(app):
+    """Compte les lectures/écritures Firestore de chaque requête de l'application Flask"""
+    app.before_request(_start_accounting)
+    app.after_request(_emit_accounting)
+    app.teardown_request(_end_accounting)
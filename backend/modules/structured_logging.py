@@ -0,0 +1,224 @@
+"""
+Module Structured Logging - Logs JSON écrits par un thread dédié
+Les logs passent par un QueueHandler: le thread de la requête ne fait qu'insérer
+les arguments dans le message et ajouter l'enregistrement à une file, le formatage
+(JSON, traceback) et l'écriture sur stdout sont faits par un QueueListener. Chaque log porte l'ID de la requête
+(header X-Request-Id) et la trace en cours. Les messages fréquents de certains
+loggers peuvent être échantillonnés (LOG_SAMPLING).
+"""
+
+from flask import g, request
+from contextvars import ContextVar
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from datetime import datetime, timezone
+from .tracing import current_span
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# json (Cloud Logging) ou text; JSON par défaut sur Cloud Run
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json' if os.getenv('K_SERVICE') else 'text').lower()
+LOG_ASYNC = os.getenv('LOG_ASYNC', 'true').lower() == 'true'  # Écriture par un thread dédié
+# Taux gardé par logger pour les messages INFO/DEBUG, ex: "modules.procedures=0.1,modules.tasks=0.5"
+LOG_SAMPLING = os.getenv('LOG_SAMPLING', '')
+GCP_PROJECT = os.getenv('GCP_PROJECT')
+
+_request_id = ContextVar('request_id', default=None)
+_listener = None
+
+# Attributs standards d'un LogRecord (les autres viennent de extra=...)
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+def parse_sampling(spec: str) -> dict:
+    """'a=0.1,b=0.5' -> {'a': 0.1, 'b': 0.5}"""
+    rates = {}
+    for item in spec.split(','):
+        name, _, rate = item.partition('=')
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+# ============================================================================
+# FILTRES (exécutés dans le thread qui logge)
+# ============================================================================
+
+class ContextFilter(logging.Filter):
+    """Ajoute l'ID de requête et la trace en cours à chaque enregistrement"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        span = current_span()
+        record.trace_id = span.trace_id if span is not None else None
+        record.span_id = span.span_id if span is not None else None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Ne garde qu'une fraction des messages INFO/DEBUG des loggers configurés
+
+    Les WARNING et au-delà ne sont jamais échantillonnés. Le taux d'un logger
+    s'applique aussi à ses enfants ('modules' couvre 'modules.tasks').
+    """
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+
+    def _rate(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        return random.random() < self._rate(record.name)
+
+# ============================================================================
+# FORMATAGE (exécuté par le thread d'écriture)
+# ============================================================================
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par log, champs reconnus par Cloud Logging (severity, trace...)"""
+
+    def format(self, record):
+        entry = {
+            "severity": record.levelname,
+            "message": record.getMessage(),
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "logger": record.name,
+        }
+
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            entry["request_id"] = request_id
+        trace_id = getattr(record, 'trace_id', None)
+        if trace_id:
+            entry["logging.googleapis.com/trace"] = (
+                f"projects/{GCP_PROJECT}/traces/{trace_id}" if GCP_PROJECT else trace_id
+            )
+            entry["logging.googleapis.com/spanId"] = record.span_id
+
+        # Champs passés avec extra={...}
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in ('request_id', 'trace_id', 'span_id'):
+                entry[key] = value
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler qui ne formate pas l'enregistrement dans le thread appelant
+
+    QueueHandler.prepare() applique tout le formateur (JSON, traceback) avant de
+    mettre en file; ici seul le message est calculé (msg % args) dans le thread
+    appelant, pour qu'un argument modifié après l'appel (dict, liste) soit logué
+    avec sa valeur au moment de l'appel. Le reste du formatage est fait par le
+    QueueListener.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+# ============================================================================
+# INITIALISATION
+# ============================================================================
+
+def configure_logging():
+    """
+    Remplace logging.basicConfig: handler racine unique, file + thread d'écriture
+
+    Returns:
+        Le handler installé sur le logger racine
+    """
+    global _listener
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == 'json':
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(levelname)s:%(name)s:%(message)s'))
+
+    if LOG_ASYNC:
+        log_queue = queue.SimpleQueue()
+        handler = DeferredQueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+    else:
+        handler = stream_handler
+
+    # Échantillonnage d'abord: les messages écartés ne coûtent rien de plus
+    rates = parse_sampling(LOG_SAMPLING)
+    if rates:
+        handler.addFilter(SamplingFilter(rates))
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    return handler
+
+# ============================================================================
+# ID DE REQUÊTE
+# ============================================================================
+
+def current_request_id():
+    """Retourne l'ID de la requête en cours, ou None"""
+    return _request_id.get()
+
+def request_id_from_headers(headers) -> str:
+    """ID fourni par l'appelant, sinon celui de la trace Cloud Run, sinon un nouvel ID"""
+    return headers.get('X-Request-Id') \
+        or headers.get('X-Cloud-Trace-Context', '').split('/')[0] \
+        or uuid.uuid4().hex
+
+def bind_request_id(request_id: str):
+    """Associe les logs du contexte courant à request_id; retourne le token pour unbind_request_id"""
+    return _request_id.set(request_id)
+
+def unbind_request_id(token):
+    _request_id.reset(token)
+
+def _start_request():
+    request_id = request_id_from_headers(request.headers)
+    g.request_id = request_id
+    g.request_id_token = bind_request_id(request_id)
+
+def _add_request_id(response):
+    request_id = getattr(g, 'request_id', None)
+    if request_id:
+        response.headers['X-Request-Id'] = request_id
+    return response
+
+def _end_request(exc):
+    token = getattr(g, 'request_id_token', None)
+    if token is not None:
+        unbind_request_id(token)
+
+def init_request_id(app):
+    """Attribue un ID à chaque requête (logs et header X-Request-Id)"""
+    app.before_request(_start_request)
+    app.after_request(_add_request_id)
+    app.teardown_request(_end_request)
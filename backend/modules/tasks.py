@@ -4,9 +4,9 @@ Les tâches sont créées à partir des règles d'alertes
 """
 
 from flask import Blueprint, jsonify, request
-from google.cloud import firestore
 import logging
 import os
+from .firestore_client import lazy_firestore_client
 
 # Initialisation du logger
 logger = logging.getLogger(__name__)
@@ -14,13 +14,57 @@ logger = logging.getLogger(__name__)
 # Blueprint pour les tâches
 tasks_bp = Blueprint('tasks', __name__)
 
-# Initialisation Firestore
-try:
-    db = firestore.Client()
+# Initialisation Firestore (construit à la première utilisation si LAZY_BOOT)
+def _create_db():
+    from google.cloud import firestore
+    client = firestore.Client()
     logger.info('✅ Firestore client initialisé pour le module tâches')
-except Exception as e:
-    db = None
-    logger.error(f'❌ Erreur Firestore pour tâches: {e}')
+    return client
+
+db = lazy_firestore_client(_create_db, 'tasks')
+
+def compute_task_stats(tasks):
+    """Compte les tâches par statut (et celles à revoir) à partir de leurs données"""
+    stats = {
+        'total': 0,
+        'open': 0,
+        'in_progress': 0,
+        'completed': 0,
+        'cancelled': 0,
+        'needs_review': 0
+    }
+
+    for task_data in tasks:
+        stats['total'] += 1
+
+        status = task_data.get('status', 'open')
+        if status in stats:
+            stats[status] += 1
+
+        if task_data.get('needs_review', False):
+            stats['needs_review'] += 1
+
+    return stats
+
+def org_tasks_query(client, org_id):
+    """Requête des tâches d'une organisation (client synchrone ou firestore.AsyncClient)"""
+    return client.collection('tasks').where('org_id', '==', org_id)
+
+def org_task_list(docs):
+    """Tâches (avec leur ID) à partir des documents lus, les plus récentes en premier"""
+    tasks = []
+    for doc in docs:
+        task_data = doc.to_dict()
+        task_data['id'] = doc.id
+        tasks.append(task_data)
+
+    # Trier par date de création (plus récentes en premier)
+    tasks.sort(key=lambda x: x.get('created_at', 0), reverse=True)
+    return tasks
+
+def get_org_tasks(org_id):
+    """Tâches d'une organisation (avec leur ID), les plus récentes en premier"""
+    return org_task_list(org_tasks_query(db, org_id).stream())
 
 @tasks_bp.route('/health', methods=['GET'])
 def health_check():
@@ -46,14 +90,14 @@ def get_all_tasks():
             task_data['id'] = doc.id
             tasks.append(task_data)
         
-        logger.info(f'📋 Récupéré {len(tasks)} tâches')
+        logger.info('📋 Récupéré %d tâches', len(tasks))
         return jsonify({
             "tasks": tasks,
             "count": len(tasks)
         }), 200
         
     except Exception as e:
-        logger.error(f'❌ Erreur lors de la récupération des tâches: {e}')
+        logger.error("❌ Erreur lors de la récupération des tâches: %s", e)
         return jsonify({"error": str(e)}), 500
 
 @tasks_bp.route('/org/<org_id>', methods=['GET'])
@@ -64,18 +108,9 @@ def get_tasks_by_org(org_id):
             return jsonify({"error": "Firestore non disponible"}), 503
         
         # Récupérer les tâches de l'organisation
-        tasks_ref = db.collection('tasks').where('org_id', '==', org_id)
-        tasks = []
-        
-        for doc in tasks_ref.stream():
-            task_data = doc.to_dict()
-            task_data['id'] = doc.id
-            tasks.append(task_data)
+        tasks = get_org_tasks(org_id)
         
-        # Trier par date de création (plus récentes en premier)
-        tasks.sort(key=lambda x: x.get('created_at', 0), reverse=True)
-        
-        logger.info(f'📋 Récupéré {len(tasks)} tâches pour l\'organisation {org_id}')
+        logger.info('📋 Récupéré %d tâches pour l\'organisation %s', len(tasks), org_id)
         return jsonify({
             "tasks": tasks,
             "org_id": org_id,
@@ -83,7 +118,7 @@ def get_tasks_by_org(org_id):
         }), 200
         
     except Exception as e:
-        logger.error(f'❌ Erreur lors de la récupération des tâches pour {org_id}: {e}')
+        logger.error("❌ Erreur lors de la récupération des tâches pour %s: %s", org_id, e)
         return jsonify({"error": str(e)}), 500
 
 @tasks_bp.route('/<task_id>', methods=['GET'])
@@ -102,11 +137,11 @@ def get_task_by_id(task_id):
         task_data = doc.to_dict()
         task_data['id'] = doc.id
         
-        logger.info(f'📋 Tâche récupérée: {task_id}')
+        logger.info('📋 Tâche récupérée: %s', task_id)
         return jsonify({"task": task_data}), 200
         
     except Exception as e:
-        logger.error(f'❌ Erreur lors de la récupération de la tâche {task_id}: {e}')
+        logger.error("❌ Erreur lors de la récupération de la tâche %s: %s", task_id, e)
         return jsonify({"error": str(e)}), 500
 
 @tasks_bp.route('/<task_id>/status', methods=['PATCH'])
@@ -150,14 +185,14 @@ def update_task_status(task_id):
         task_data = updated_doc.to_dict()
         task_data['id'] = updated_doc.id
         
-        logger.info(f'✅ Statut de la tâche {task_id} mis à jour: {new_status}')
+        logger.info('✅ Statut de la tâche %s mis à jour: %s', task_id, new_status)
         return jsonify({
             "task": task_data,
             "message": f"Statut mis à jour: {new_status}"
         }), 200
         
     except Exception as e:
-        logger.error(f'❌ Erreur lors de la mise à jour du statut de la tâche {task_id}: {e}')
+        logger.error("❌ Erreur lors de la mise à jour du statut de la tâche %s: %s", task_id, e)
         return jsonify({"error": str(e)}), 500
 
 @tasks_bp.route('/stats/<org_id>', methods=['GET'])
@@ -167,34 +202,14 @@ def get_task_stats(org_id):
         if not db:
             return jsonify({"error": "Firestore non disponible"}), 503
         
-        tasks_ref = db.collection('tasks').where('org_id', '==', org_id)
-        
-        stats = {
-            'total': 0,
-            'open': 0,
-            'in_progress': 0,
-            'completed': 0,
-            'cancelled': 0,
-            'needs_review': 0
-        }
+        stats = compute_task_stats(doc.to_dict() for doc in org_tasks_query(db, org_id).stream())
         
-        for doc in tasks_ref.stream():
-            task_data = doc.to_dict()
-            stats['total'] += 1
-            
-            status = task_data.get('status', 'open')
-            if status in stats:
-                stats[status] += 1
-            
-            if task_data.get('needs_review', False):
-                stats['needs_review'] += 1
-        
-        logger.info(f'📊 Statistiques des tâches pour {org_id}: {stats}')
+        logger.info('📊 Statistiques des tâches pour %s: %s', org_id, stats)
         return jsonify({
             "org_id": org_id,
             "stats": stats
         }), 200
         
     except Exception as e:
-        logger.error(f'❌ Erreur lors de la récupération des statistiques pour {org_id}: {e}')
+        logger.error("❌ Erreur lors de la récupération des statistiques pour %s: %s", org_id, e)
         return jsonify({"error": str(e)}), 500
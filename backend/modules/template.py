@@ -42,7 +42,7 @@ def get_main():
             "data": {}
         })
     except Exception as e:
-        logger.error(f"Erreur dans /{template_bp.name}: {e}")
+        logger.error("Erreur dans /%s: %s", template_bp.name, e)
         return jsonify({
             "error": str(e),
             "status": "error"
@@ -0,0 +1,276 @@
+"""
+Module Tracing - Spans des requêtes, opérations Firestore et appels sortants
+Modèle compatible OpenTelemetry (trace_id/span_id W3C, header traceparent, attributs
+des conventions sémantiques), sans dépendance externe. Exporteurs: console (une ligne
+JSON par span) ou mémoire (dernières traces consultables sur /debug/traces).
+"""
+
+from flask import g, request
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from collections import OrderedDict
+import functools
+import json
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', 'none').lower()  # none, console ou memory
+TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', '1.0'))  # Part des requêtes tracées
+TRACING_MEMORY_TRACES = int(os.getenv('TRACING_MEMORY_TRACES', '100'))  # Traces gardées par l'exporteur mémoire
+
+TRACING_ENABLED = TRACING_EXPORTER in ('console', 'memory')
+
+_current_span = ContextVar('current_span', default=None)
+
+# ============================================================================
+# SPANS
+# ============================================================================
+
+class Span:
+    """Opération chronométrée d'une trace (équivalent d'un span OpenTelemetry)"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: str = None, kind: str = 'INTERNAL',
+                 attributes: dict = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.status = 'UNSET'
+        self.status_message = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        self.status = 'ERROR'
+        self.status_message = f"{type(exc).__name__}: {exc}"
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            if self.status == 'UNSET':
+                self.status = 'OK'
+            _export(self)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            "status": self.status,
+            "status_message": self.status_message,
+            "attributes": self.attributes
+        }
+
+
+class _NoopSpan:
+    """Span retourné quand la trace n'est pas échantillonnée (aucun coût d'export)"""
+
+    trace_id = None
+    span_id = None
+    traceparent = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def record_exception(self, exc):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+def current_span():
+    """Retourne le span actif, ou None"""
+    return _current_span.get()
+
+def start_span(name: str, kind: str = 'INTERNAL', attributes: dict = None, parent=None):
+    """
+    Crée un span enfant du span actif (ou de parent), sans l'activer
+
+    Hors trace (pas de span actif ni de parent), retourne NOOP_SPAN: seules les
+    requêtes échantillonnées produisent des spans.
+    """
+    parent = parent or _current_span.get()
+    if not TRACING_ENABLED or parent is None:
+        return NOOP_SPAN
+    return Span(name, parent.trace_id, parent.span_id, kind, attributes)
+
+@contextmanager
+def span(name: str, kind: str = 'INTERNAL', **attributes):
+    """Crée et active un span enfant du span actif pour la durée du bloc"""
+    current = start_span(name, kind, attributes)
+    if current is NOOP_SPAN:
+        yield current
+        return
+
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+def traced(name: str, kind: str = 'INTERNAL'):
+    """Décorateur: exécute la fonction dans un span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def propagate(func):
+    """
+    Retourne func liée au contexte courant (span actif), pour un thread ou un pool
+
+    Les threads ne recopient pas les ContextVar: sans cela, les spans créés dans le
+    thread seraient détachés de la requête.
+    """
+    context = copy_context()
+    return functools.partial(context.run, func)
+
+def inject_headers(headers: dict = None) -> dict:
+    """Ajoute le header traceparent du span actif (appels sortants)"""
+    headers = dict(headers or {})
+    current = _current_span.get()
+    if current is not None and current.traceparent:
+        headers['traceparent'] = current.traceparent
+    return headers
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+_traces = OrderedDict()  # trace_id -> liste des spans terminés (exporteur mémoire)
+_traces_lock = threading.Lock()
+
+def _export(finished: Span):
+    if TRACING_EXPORTER == 'console':
+        logger.info(json.dumps(finished.to_dict(), default=str))
+    elif TRACING_EXPORTER == 'memory':
+        with _traces_lock:
+            _traces.setdefault(finished.trace_id, []).append(finished.to_dict())
+            _traces.move_to_end(finished.trace_id)
+            while len(_traces) > TRACING_MEMORY_TRACES:
+                _traces.popitem(last=False)
+
+def recent_traces(limit: int = 20) -> list:
+    """
+    Dernières traces de l'exporteur mémoire, de la plus récente à la plus ancienne
+
+    Chaque span porte offset_ms (début relatif au premier span de la trace) pour
+    lire la trace comme une cascade.
+    """
+    with _traces_lock:
+        items = list(_traces.items())[-limit:]
+
+    traces = []
+    for trace_id, spans in reversed(items):
+        origin = min(s["start_time_unix_nano"] for s in spans)
+        ordered = sorted(spans, key=lambda s: s["start_time_unix_nano"])
+        for s in ordered:
+            s["offset_ms"] = round((s["start_time_unix_nano"] - origin) / 1e6, 3)
+        traces.append({"trace_id": trace_id, "spans": ordered})
+    return traces
+
+# ============================================================================
+# INSTRUMENTATION FLASK
+# ============================================================================
+
+def _parse_traceparent(header: str):
+    """Retourne (trace_id, parent_span_id) d'un header traceparent W3C, ou (None, None)"""
+    parts = (header or '').strip().split('-')
+    if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+        return parts[1], parts[2]
+    return None, None
+
+def start_server_span(method: str, path: str, target: str, traceparent: str = None):
+    """
+    Ouvre et active le span racine d'une requête entrante
+
+    Returns:
+        (span, token) à passer à end_server_span, ou (None, None) si la requête
+        n'est pas tracée (traces désactivées ou non échantillonnée)
+    """
+    if not TRACING_ENABLED:
+        return None, None
+
+    trace_id, parent_id = _parse_traceparent(traceparent)
+    if trace_id is None:
+        if random.random() >= TRACING_SAMPLE_RATE:
+            return None, None
+        trace_id = secrets.token_hex(16)
+
+    root = Span(f"{method} {path}", trace_id, parent_id, 'SERVER', {
+        "http.method": method,
+        "http.target": target,
+    })
+    return root, _current_span.set(root)
+
+def set_server_span_route(root: Span, method: str, route: str, status_code: int):
+    """Renomme le span racine d'après la route déclarée et note le statut HTTP"""
+    root.name = f"{method} {route}"
+    root.set_attribute("http.route", route)
+    root.set_attribute("http.status_code", status_code)
+    if status_code >= 500:
+        root.status = 'ERROR'
+
+def end_server_span(root: Span, token, exc: BaseException = None):
+    """Désactive et termine le span racine ouvert par start_server_span"""
+    if exc is not None:
+        root.record_exception(exc)
+    _current_span.reset(token)
+    root.end()
+
+def _start_request_span():
+    g.trace_span, g.trace_token = start_server_span(
+        request.method, request.path, request.full_path.rstrip('?'), request.headers.get('traceparent')
+    )
+
+def _finish_request_span(response):
+    root = getattr(g, 'trace_span', None)
+    if root is not None:
+        route = request.url_rule.rule if request.url_rule else request.path
+        set_server_span_route(root, request.method, route, response.status_code)
+    return response
+
+def _end_request_span(exc):
+    root = getattr(g, 'trace_span', None)
+    if root is not None:
+        end_server_span(root, g.trace_token, exc)
+
+def init_tracing(app):
+    """Ouvre un span par requête de l'application Flask (no-op si TRACING_EXPORTER=none)"""
+    app.before_request(_start_request_span)
+    app.after_request(_finish_request_span)
+    app.teardown_request(_end_request_span)
@@ -2,12 +2,20 @@
 Module Veille - Gestion de la veille réglementaire
 """
 
-from flask import Blueprint, request, jsonify
-from google.cloud import firestore
-import requests
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+import asyncio
+import hashlib
 import logging
 import os
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from .cache import TTLCache
+from .company_settings import get_company_settings, settings_cache
+from .firestore_client import lazy_firestore_client
+from .metrics import outbound_request, outbound_request_async
+from .tracing import propagate
 
 veille_bp = Blueprint('veille', __name__)
 logger = logging.getLogger(__name__)
@@ -15,15 +23,490 @@ logger = logging.getLogger(__name__)
 # Configuration
 AGENT_FISCAL_URL = os.getenv('AGENT_FISCAL_URL', 'https://us-west1-agent-gcp-f6005.cloudfunctions.net/agent-fiscal-v2')
 GCP_PROJECT = os.getenv('GCP_PROJECT')
+AGENT_FISCAL_TIMEOUT = int(os.getenv('AGENT_FISCAL_TIMEOUT', '30'))  # Timeout par question
+VEILLE_DEADLINE_SECONDS = int(os.getenv('VEILLE_DEADLINE_SECONDS', '40'))  # Échéance globale d'une analyse
+FIRESTORE_BATCH_LIMIT = 500  # Nombre max d'écritures par WriteBatch
+VEILLE_INDEX_COLLECTION = '_veille_index'  # Un document d'empreintes par entreprise
+VEILLE_HASH_LENGTH = 16  # Caractères hexadécimaux conservés par empreinte dans l'index
+# Empreintes max par index (~17 octets chacune): le document reste sous la limite de 1 Mio de Firestore
+VEILLE_INDEX_MAX_HASHES = int(os.getenv('VEILLE_INDEX_MAX_HASHES', '20000'))
+AGENT_FISCAL_CACHE_TTL = int(os.getenv('AGENT_FISCAL_CACHE_TTL', '86400'))  # Durée de vie des réponses en cache
+AGENT_FISCAL_CACHE_SIZE = int(os.getenv('AGENT_FISCAL_CACHE_SIZE', '256'))
+AGENT_FISCAL_CACHE_FIRESTORE = os.getenv('AGENT_FISCAL_CACHE_FIRESTORE', 'false').lower() == 'true'
+AGENT_FISCAL_CACHE_COLLECTION = '_cache_agent_fiscal'
+AGENT_FISCAL_RATE_LIMIT = float(os.getenv('AGENT_FISCAL_RATE_LIMIT', '5'))  # Appels/s max vers l'agent fiscal (0 = illimité)
+VEILLE_SWEEP_WORKERS = int(os.getenv('VEILLE_SWEEP_WORKERS', '4'))  # Appels simultanés pendant un balayage
 
-# Initialize Firestore
-db = None
-if GCP_PROJECT:
+class RateLimiter:
+    """Limiteur de débit global (intervalle minimal entre deux appels), thread-safe"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def _reserve(self):
+        """Réserve le prochain créneau et retourne l'attente nécessaire (secondes)"""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        return wait
+
+    def acquire(self):
+        """Bloque jusqu'au prochain créneau disponible"""
+        if not self.interval:
+            return
+
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Attend le prochain créneau disponible sans bloquer la boucle d'évènements"""
+        if not self.interval:
+            return
+
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+# Débit global vers AGENT_FISCAL_URL, partagé par les analyses et les balayages
+agent_fiscal_limiter = RateLimiter(AGENT_FISCAL_RATE_LIMIT)
+
+# Cache des réponses de l'agent fiscal (partagé entre entreprises au profil identique)
+agent_fiscal_cache = TTLCache(maxsize=AGENT_FISCAL_CACHE_SIZE, ttl=AGENT_FISCAL_CACHE_TTL)
+
+# Initialize Firestore (construit à la première utilisation si LAZY_BOOT)
+def _create_db():
+    if not GCP_PROJECT:
+        return None
+    from google.cloud import firestore
+    client = firestore.Client(project=GCP_PROJECT)
+    logger.info("✅ Firestore initialisé pour veille: %s", GCP_PROJECT)
+    return client
+
+db = lazy_firestore_client(_create_db, 'veille')
+
+def veille_content_hash(source_url, titre):
+    """Empreinte (sha256 hexadécimal) d'une alerte de veille: URL source + titre normalisé"""
+    contenu = f"{source_url or ''}|{normalize_question(str(titre or ''))}"
+    return hashlib.sha256(contenu.encode('utf-8')).hexdigest()
+
+def veille_alert_id(company_id, source_url, titre):
+    """
+    ID de document déterministe pour une alerte de veille
+
+    Dérivé de companyId + empreinte (URL source + titre normalisé): une même
+    alerte signalée deux fois pour la même entreprise retombe sur le même
+    document, ce qui permet de dédupliquer avec create() sans lecture préalable.
+    L'index de veille conserve le début de la même empreinte.
+    """
+    return f"{company_id}_{veille_content_hash(source_url, titre)[:32]}"
+
+def build_questions(settings):
+    """Construit les questions pour l'agent fiscal à partir du profil entreprise"""
+    return [
+        f"Nouvelles réglementations TVA pour {settings.get('secteurActivite')}",
+        f"Changements impôt sociétés {settings.get('regimeFiscal')}",
+        f"Obligations fiscales entreprise {settings.get('formeJuridique')}"
+    ]
+
+def normalize_question(question):
+    """Normalise une question (casse, espaces) pour servir de clé de cache"""
+    return " ".join(question.lower().split())
+
+def get_cached_answer(question):
+    """
+    Cherche une réponse de l'agent fiscal en cache
+
+    Cache mémoire d'abord, puis Firestore si AGENT_FISCAL_CACHE_FIRESTORE est activé
+    (partagé entre instances Cloud Run).
+
+    Returns:
+        (result, "memoire"/"firestore") ou (None, None)
+    """
+    key = normalize_question(question)
+    result = agent_fiscal_cache.get(key)
+    if result is not None:
+        return result, "memoire"
+
+    if not (AGENT_FISCAL_CACHE_FIRESTORE and db):
+        return None, None
+
+    try:
+        doc_id = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        doc = db.collection(AGENT_FISCAL_CACHE_COLLECTION).document(doc_id).get()
+        if doc.exists:
+            data = doc.to_dict()
+            remaining = (data['expiresAt'] - datetime.now(timezone.utc)).total_seconds()
+            if remaining > 0:
+                agent_fiscal_cache.set(key, data['result'], ttl=remaining)
+                return data['result'], "firestore"
+    except Exception as e:
+        logger.warning("Lecture du cache Firestore agent fiscal impossible: %s", e)
+
+    return None, None
+
+def set_cached_answer(question, result):
+    """Met en cache une réponse de l'agent fiscal (mémoire + Firestore si activé)"""
+    key = normalize_question(question)
+    agent_fiscal_cache.set(key, result)
+
+    if not (AGENT_FISCAL_CACHE_FIRESTORE and db):
+        return
+
+    try:
+        doc_id = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        db.collection(AGENT_FISCAL_CACHE_COLLECTION).document(doc_id).set({
+            "question": key,
+            "result": result,
+            # Champ utilisable par une politique TTL Firestore pour purger les entrées
+            "expiresAt": datetime.now(timezone.utc) + timedelta(seconds=AGENT_FISCAL_CACHE_TTL)
+        })
+    except Exception as e:
+        logger.warning("Écriture du cache Firestore agent fiscal impossible: %s", e)
+
+def ask_agent_fiscal(question):
+    """
+    Pose une question à l'agent fiscal (ou répond depuis le cache)
+
+    Returns:
+        {"question", "statut" (ok/timeout/erreur), "duree_ms", "cache", "result"}
+    """
+    import requests
+
+    debut = time.monotonic()
+    statut = "erreur"
+
+    result, cache = get_cached_answer(question)
+    if result is not None:
+        return {
+            "question": question,
+            "statut": "ok",
+            "duree_ms": int((time.monotonic() - debut) * 1000),
+            "cache": cache,
+            "result": result
+        }
+
+    try:
+        agent_fiscal_limiter.acquire()
+        response = outbound_request(
+            'agent_fiscal', 'POST',
+            AGENT_FISCAL_URL,
+            json={"question": question},
+            timeout=AGENT_FISCAL_TIMEOUT
+        )
+
+        if response.status_code == 200:
+            result = response.json()
+            statut = "ok"
+            set_cached_answer(question, result)
+        else:
+            logger.error("Erreur agent fiscal: HTTP %s pour la question: %s", response.status_code, question)
+
+    except requests.exceptions.Timeout:
+        statut = "timeout"
+        logger.warning("Timeout pour la question: %s", question)
+    except Exception as e:
+        logger.error("Erreur lors de l'appel agent fiscal: %s", e)
+
+    return {
+        "question": question,
+        "statut": statut,
+        "duree_ms": int((time.monotonic() - debut) * 1000),
+        "cache": None,
+        "result": result
+    }
+
+def iter_agent_fiscal_answers(questions, deadline=None):
+    """
+    Pose les questions à l'agent fiscal en parallèle et renvoie les réponses
+    au fur et à mesure qu'elles arrivent.
+
+    Les questions sans réponse à l'échéance globale (VEILLE_DEADLINE_SECONDS)
+    sont renvoyées avec le statut "deadline" et sans résultat.
+    """
+    deadline = VEILLE_DEADLINE_SECONDS if deadline is None else deadline
+    executor = ThreadPoolExecutor(max_workers=max(1, len(questions)))
+    futures = {executor.submit(propagate(ask_agent_fiscal), question): question for question in questions}
+
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            yield future.result()
+    except FuturesTimeoutError:
+        for future, question in futures.items():
+            if not future.done():
+                logger.warning("Échéance globale atteinte pour la question: %s", question)
+                yield {
+                    "question": question,
+                    "statut": "deadline",
+                    "duree_ms": int(deadline * 1000),
+                    "cache": None,
+                    "result": None
+                }
+    finally:
+        # Ne pas attendre les appels encore en cours au-delà de l'échéance
+        executor.shutdown(wait=False, cancel_futures=True)
+
+async def ask_agent_fiscal_async(question):
+    """
+    Équivalent async de ask_agent_fiscal (client httpx partagé, aucun thread bloqué)
+
+    Le cache Firestore optionnel (AGENT_FISCAL_CACHE_FIRESTORE) est lu et écrit
+    dans un thread avec le client synchrone.
+    """
+    import httpx
+
+    debut = time.monotonic()
+    statut = "erreur"
+
+    if AGENT_FISCAL_CACHE_FIRESTORE:
+        result, cache = await asyncio.to_thread(get_cached_answer, question)
+    else:
+        result, cache = get_cached_answer(question)
+    if result is not None:
+        return {
+            "question": question,
+            "statut": "ok",
+            "duree_ms": int((time.monotonic() - debut) * 1000),
+            "cache": cache,
+            "result": result
+        }
+
+    try:
+        await agent_fiscal_limiter.acquire_async()
+        response = await outbound_request_async(
+            'agent_fiscal', 'POST',
+            AGENT_FISCAL_URL,
+            json={"question": question},
+            timeout=AGENT_FISCAL_TIMEOUT
+        )
+
+        if response.status_code == 200:
+            result = response.json()
+            statut = "ok"
+            if AGENT_FISCAL_CACHE_FIRESTORE:
+                await asyncio.to_thread(set_cached_answer, question, result)
+            else:
+                set_cached_answer(question, result)
+        else:
+            logger.error("Erreur agent fiscal: HTTP %s pour la question: %s", response.status_code, question)
+
+    except httpx.TimeoutException:
+        statut = "timeout"
+        logger.warning("Timeout pour la question: %s", question)
+    except Exception as e:
+        logger.error("Erreur lors de l'appel agent fiscal: %s", e)
+
+    return {
+        "question": question,
+        "statut": statut,
+        "duree_ms": int((time.monotonic() - debut) * 1000),
+        "cache": None,
+        "result": result
+    }
+
+async def agent_fiscal_answers_async(questions, deadline=None):
+    """
+    Équivalent async de iter_agent_fiscal_answers: pose les questions en parallèle
+
+    Returns:
+        Les réponses dans l'ordre des questions; celles qui n'ont pas répondu à
+        l'échéance globale ont le statut "deadline" (appel annulé)
+    """
+    deadline = VEILLE_DEADLINE_SECONDS if deadline is None else deadline
+    tasks = [asyncio.ensure_future(ask_agent_fiscal_async(question)) for question in questions]
+    if not tasks:
+        return []
+    await asyncio.wait(tasks, timeout=deadline)
+
+    answers = []
+    for task, question in zip(tasks, questions):
+        if task.done():
+            answers.append(task.result())
+            continue
+        task.cancel()
+        logger.warning("Échéance globale atteinte pour la question: %s", question)
+        answers.append({
+            "question": question,
+            "statut": "deadline",
+            "duree_ms": int(deadline * 1000),
+            "cache": None,
+            "result": None
+        })
+    return answers
+
+def build_veille_alertes(company_id, settings, question, result):
+    """Construit les alertes de veille à partir d'une réponse de l'agent fiscal"""
+    if result.get('documents_trouves', 0) <= 0:
+        return []
+
+    alertes = []
+    for source in result.get('sources', []):
+        alertes.append({
+            "companyId": company_id,
+            "userId": settings.get('userId', ''),
+            "type": "veille",
+            "titre": source.get('titre', question),
+            "message": result.get('reponse', '')[:300],
+            "source": source.get('url', ''),
+            "priorite": "haute" if source.get('score', 0) > 0.7 else "moyenne",
+            "statut": "non_lu",
+            "dateCreation": datetime.now(),
+            "dateEcheance": None,
+            "metadata": {
+                "categorie": question.split()[1] if len(question.split()) > 1 else "fiscal",
+                "score_pertinence": source.get('score', 0),
+                "question_origine": question
+            }
+        })
+    return alertes
+
+def load_veille_index(company_id):
+    """
+    Charge l'index des empreintes déjà signalées pour une entreprise
+
+    L'index tient dans un seul document (_veille_index/{company_id}): une
+    lecture par analyse suffit pour filtrer en mémoire toutes ses alertes.
+
+    Returns:
+        {empreinte: False} dans l'ordre d'ajout (les plus anciennes d'abord);
+        save_veille_alertes passe à True les empreintes traitées par l'analyse.
+    """
     try:
-        db = firestore.Client(project=GCP_PROJECT)
-        logger.info(f"✅ Firestore initialisé pour veille: {GCP_PROJECT}")
+        doc = db.collection(VEILLE_INDEX_COLLECTION).document(company_id).get()
+        if doc.exists:
+            return dict.fromkeys(doc.to_dict().get('hashes', []), False)
     except Exception as e:
-        logger.error(f"❌ Erreur Firestore veille: {e}")
+        logger.warning("Lecture de l'index de veille impossible pour %s: %s", company_id, e)
+    return {}
+
+def veille_index_update(index, empreintes):
+    """
+    Données à écrire (set merge=True) dans le document d'index pour y ajouter des empreintes
+
+    ArrayUnion tant que l'index reste sous VEILLE_INDEX_MAX_HASHES; au-delà, la
+    liste est réécrite sans ses empreintes les plus anciennes. Une empreinte
+    perdue n'est qu'une écriture de plus: create() rejette toujours le doublon.
+    """
+    from google.cloud import firestore
+
+    if len(index) + len(empreintes) <= VEILLE_INDEX_MAX_HASHES:
+        hashes = firestore.ArrayUnion(empreintes)
+    else:
+        hashes = (list(index) + empreintes)[-VEILLE_INDEX_MAX_HASHES:]
+    return {"hashes": hashes, "updatedAt": datetime.now()}
+
+def save_veille_alertes(company_id, alertes, index=None):
+    """
+    Enregistre les nouvelles alertes de veille par WriteBatch
+
+    Les alertes dont l'empreinte (URL source + titre normalisé) figure dans
+    l'index de l'entreprise sont ignorées sans lecture ni écriture. Les autres
+    sont créées avec create() et leur ID déterministe (veille_alert_id), et
+    leurs empreintes sont ajoutées à l'index dans le même lot. Si Firestore
+    rejette un lot parce qu'une alerte existe déjà (index incomplet), les
+    créations sont rejouées une par une et les doublons comptés comme existants.
+
+    Args:
+        index: Index déjà chargé (load_veille_index), mis à jour en place: une
+               seule lecture pour toutes les questions d'une analyse.
+
+    Returns:
+        (alertes créées avec leur 'id', nombre d'alertes qui existaient déjà en base)
+    """
+    from google.api_core.exceptions import AlreadyExists
+
+    if index is None:
+        index = load_veille_index(company_id)
+    alertes_ref = db.collection('alertes')
+    index_ref = db.collection(VEILLE_INDEX_COLLECTION).document(company_id)
+
+    # Dédupliquer dans la liste (une même source peut répondre à plusieurs questions)
+    par_empreinte = {}
+    for alerte in alertes:
+        empreinte = veille_content_hash(alerte['source'], alerte['titre'])[:VEILLE_HASH_LENGTH]
+        par_empreinte.setdefault(empreinte, alerte)
+
+    # puis contre l'index: False = signalée par une analyse précédente (comptée une
+    # fois), True = déjà traitée par cette analyse
+    nb_existantes = 0
+    items = []
+    for empreinte, alerte in par_empreinte.items():
+        if empreinte in index:
+            if not index[empreinte]:
+                nb_existantes += 1
+                index[empreinte] = True
+            continue
+        items.append((empreinte, veille_alert_id(company_id, alerte['source'], alerte['titre']), alerte))
+
+    nouvelles = []
+
+    # Une écriture par lot est réservée à la mise à jour de l'index
+    taille_lot = FIRESTORE_BATCH_LIMIT - 1
+    for i in range(0, len(items), taille_lot):
+        lot = items[i:i + taille_lot]
+        empreintes = [empreinte for empreinte, _, _ in lot]
+
+        batch = db.batch()
+        for _, alerte_id, alerte in lot:
+            batch.create(alertes_ref.document(alerte_id), alerte)
+        batch.set(index_ref, veille_index_update(index, empreintes), merge=True)
+
+        try:
+            batch.commit()
+            created = lot
+        except AlreadyExists:
+            logger.info("Lot de %d alertes contenant des doublons, création unitaire", len(lot))
+            created = []
+            for item in lot:
+                _, alerte_id, alerte = item
+                try:
+                    alertes_ref.document(alerte_id).create(alerte)
+                    created.append(item)
+                except AlreadyExists:
+                    nb_existantes += 1
+            # Toutes les alertes du lot existent désormais: les ajouter à l'index
+            index_ref.set(veille_index_update(index, empreintes), merge=True)
+
+        for empreinte in empreintes:
+            index[empreinte] = True
+        while len(index) > VEILLE_INDEX_MAX_HASHES:
+            del index[next(iter(index))]
+
+        for _, alerte_id, alerte in created:
+            alerte['id'] = alerte_id
+            nouvelles.append(alerte)
+
+    return nouvelles, nb_existantes
+
+def sort_veille_alertes(alertes, limit=50):
+    """Trie les alertes de veille par date de détection (les plus récentes en premier) et garde les `limit` premières"""
+    alertes.sort(key=lambda x: x.get('detectedDate', ''), reverse=True)
+    return alertes[:limit]
+
+def veille_alertes_query(client, company_id):
+    """Requête des alertes de veille d'une entreprise (client synchrone ou firestore.AsyncClient)"""
+    # Requête simplifiée sans index composite
+    return client.collection('info_alerts')\
+        .where('companyId', '==', company_id)\
+        .limit(100)
+
+def veille_alertes_list(docs):
+    """Alertes (avec leur ID) à partir des documents lus, triées par sort_veille_alertes"""
+    alertes = []
+    for doc in docs:
+        data = doc.to_dict()
+        data['id'] = doc.id
+        alertes.append(data)
+
+    return sort_veille_alertes(alertes)
+
+def get_veille_alertes(company_id):
+    """Alertes de veille d'une entreprise (collection info_alerts), triées par sort_veille_alertes"""
+    logger.debug("🚀 Exécution de la requête Firestore...")
+    return veille_alertes_list(veille_alertes_query(db, company_id).stream())
 
 @veille_bp.route('/company/<company_id>', methods=['GET'])
 def get_alertes_veille(company_id):
@@ -32,30 +515,11 @@ def get_alertes_veille(company_id):
         if not db:
             return jsonify({"error": "Firestore non configuré"}), 500
 
-        logger.info(f"🔍 Recherche alertes pour companyId: {company_id}")
-        logger.info(f"📚 Collection utilisée: info_alerts")
-
-        # Récupérer les alertes de veille depuis la collection info_alerts
-        # Requête simplifiée sans index composite
-        alertes_ref = db.collection('info_alerts')\
-            .where('companyId', '==', company_id)\
-            .limit(100)
-
-        logger.info(f"🚀 Exécution de la requête Firestore...")
-
-        alertes = []
-        for doc in alertes_ref.stream():
-            data = doc.to_dict()
-            data['id'] = doc.id
-            alertes.append(data)
-
-        # Trier par date de détection (les plus récentes en premier)
-        alertes.sort(key=lambda x: x.get('detectedDate', ''), reverse=True)
+        logger.info("🔍 Recherche alertes pour companyId: %s (collection info_alerts)", company_id)
 
-        # Limiter à 50 résultats
-        alertes = alertes[:50]
+        alertes = get_veille_alertes(company_id)
 
-        logger.info(f"✅ {len(alertes)} alertes récupérées pour {company_id}")
+        logger.info("✅ %d alertes récupérées pour %s", len(alertes), company_id)
 
         return jsonify({
             "success": True,
@@ -64,8 +528,8 @@ def get_alertes_veille(company_id):
         }), 200
 
     except Exception as e:
-        logger.error(f"❌ Erreur get_alertes_veille: {e}")
-        logger.error(f"❌ Type d'erreur: {type(e)}")
+        logger.error("❌ Erreur get_alertes_veille: %s", e)
+        logger.error("❌ Type d'erreur: %s", type(e))
         return jsonify({"error": str(e)}), 500
 
 @veille_bp.route('/analyser/<company_id>', methods=['POST'])
@@ -75,75 +539,233 @@ def analyser_veille(company_id):
         if not db:
             return jsonify({"error": "Firestore non configuré"}), 500
 
-        # Récupérer les paramètres de l'entreprise
-        settings_ref = db.collection('settings').document(company_id)
-        settings_doc = settings_ref.get()
+        # Récupérer les paramètres de l'entreprise (cache mémoire)
+        settings = get_company_settings(company_id)
 
-        if not settings_doc.exists:
+        if settings is None:
             return jsonify({"error": "Paramètres entreprise non trouvés"}), 404
 
-        settings = settings_doc.to_dict()
+        questions = build_questions(settings)
 
-        # Construire les questions pour l'agent fiscal
-        questions = [
-            f"Nouvelles réglementations TVA pour {settings.get('secteurActivite')}",
-            f"Changements impôt sociétés {settings.get('regimeFiscal')}",
-            f"Obligations fiscales entreprise {settings.get('formeJuridique')}"
-        ]
+        alertes = []
+        questions_metadata = []
+        debut = time.monotonic()
 
-        nouvelles_alertes = []
+        for answer in iter_agent_fiscal_answers(questions):
+            questions_metadata.append({
+                "question": answer["question"],
+                "statut": answer["statut"],
+                "duree_ms": answer["duree_ms"],
+                "cache": answer["cache"]
+            })
+            if answer["result"] is not None:
+                alertes.extend(build_veille_alertes(company_id, settings, answer["question"], answer["result"]))
 
-        for question in questions:
-            try:
-                response = requests.post(
-                    AGENT_FISCAL_URL,
-                    json={"question": question},
-                    timeout=30
-                )
-
-                if response.status_code == 200:
-                    result = response.json()
-                    if result.get('documents_trouves', 0) > 0:
-                        for source in result.get('sources', []):
-                            # Créer une alerte de veille
-                            alerte = {
-                                "companyId": company_id,
-                                "userId": settings.get('userId', ''),
-                                "type": "veille",
-                                "titre": source.get('titre', question),
-                                "message": result.get('reponse', '')[:300],
-                                "source": source.get('url', ''),
-                                "priorite": "haute" if source.get('score', 0) > 0.7 else "moyenne",
-                                "statut": "non_lu",
-                                "dateCreation": datetime.now(),
-                                "dateEcheance": None,
-                                "metadata": {
-                                    "categorie": question.split()[1] if len(question.split()) > 1 else "fiscal",
-                                    "score_pertinence": source.get('score', 0),
-                                    "question_origine": question
-                                }
-                            }
-
-                            # Sauvegarder dans Firestore
-                            doc_ref = db.collection('alertes').add(alerte)
-                            alerte['id'] = doc_ref[1].id
-                            nouvelles_alertes.append(alerte)
-
-            except requests.exceptions.Timeout:
-                logger.warning(f"Timeout pour la question: {question}")
-            except Exception as e:
-                logger.error(f"Erreur lors de l'appel agent fiscal: {e}")
+        nouvelles_alertes, nb_existantes = save_veille_alertes(company_id, alertes)
 
         return jsonify({
             "success": True,
             "nb_nouvelles_alertes": len(nouvelles_alertes),
-            "alertes": nouvelles_alertes
+            "nb_alertes_existantes": nb_existantes,
+            "alertes": nouvelles_alertes,
+            "complet": all(q["statut"] == "ok" for q in questions_metadata),
+            "metadata": {
+                "questions": questions_metadata,
+                "duree_totale_ms": int((time.monotonic() - debut) * 1000)
+            }
         }), 200
 
     except Exception as e:
-        logger.error(f"Erreur analyser_veille: {e}")
+        logger.error("Erreur analyser_veille: %s", e)
         return jsonify({"error": str(e)}), 500
 
+def run_veille_sweep(dry_run=False):
+    """
+    Lance la veille pour toutes les entreprises (documents 'settings')
+
+    Les entreprises sont regroupées par jeu de questions identique et
+    chaque question distincte n'est posée qu'une fois à l'agent fiscal
+    (pool borné à VEILLE_SWEEP_WORKERS, débit global agent_fiscal_limiter).
+    Les réponses sont ensuite réparties sur les entreprises concernées.
+
+    Args:
+        dry_run: Si True, pose les questions mais n'écrit aucune alerte
+
+    Returns:
+        Un résumé du balayage et le détail par entreprise
+    """
+    debut = time.monotonic()
+
+    # Regrouper les entreprises par profil (jeu de questions)
+    profils = {}
+    for doc in db.collection('settings').stream():
+        settings = doc.to_dict()
+        settings_cache.set(doc.id, settings)
+        questions = tuple(build_questions(settings))
+        profils.setdefault(questions, []).append((doc.id, settings))
+
+    questions_uniques = list({q for questions in profils for q in questions})
+    logger.info("🔁 Balayage veille: %d entreprises, %d profils, %d questions distinctes",
+                sum(len(c) for c in profils.values()), len(profils), len(questions_uniques))
+
+    # Poser chaque question distincte une seule fois
+    with ThreadPoolExecutor(max_workers=max(1, VEILLE_SWEEP_WORKERS)) as executor:
+        answers = {
+            answer["question"]: answer
+            for answer in executor.map(ask_agent_fiscal, questions_uniques)
+        }
+
+    # Répartir les réponses sur les entreprises de chaque profil
+    def traiter_entreprise(company_id, settings, questions):
+        alertes = []
+        for question in questions:
+            result = answers[question]["result"]
+            if result is not None:
+                alertes.extend(build_veille_alertes(company_id, settings, question, result))
+
+        if dry_run:
+            return {"companyId": company_id, "nb_nouvelles_alertes": 0,
+                    "nb_alertes_existantes": 0, "nb_alertes_trouvees": len(alertes)}
+
+        try:
+            nouvelles, nb_existantes = save_veille_alertes(company_id, alertes)
+        except Exception as e:
+            logger.error("Erreur balayage veille pour %s: %s", company_id, e)
+            return {"companyId": company_id, "error": str(e)}
+
+        return {"companyId": company_id, "nb_nouvelles_alertes": len(nouvelles),
+                "nb_alertes_existantes": nb_existantes, "nb_alertes_trouvees": len(alertes)}
+
+    with ThreadPoolExecutor(max_workers=max(1, VEILLE_SWEEP_WORKERS)) as executor:
+        futures = [
+            executor.submit(traiter_entreprise, company_id, settings, questions)
+            for questions, entreprises in profils.items()
+            for company_id, settings in entreprises
+        ]
+        entreprises = [future.result() for future in futures]
+
+    return {
+        "success": True,
+        "dry_run": dry_run,
+        "nb_entreprises": len(entreprises),
+        "nb_profils": len(profils),
+        "nb_questions": len(questions_uniques),
+        "nb_appels_agent": sum(1 for a in answers.values() if a["cache"] is None),
+        "nb_nouvelles_alertes": sum(e.get("nb_nouvelles_alertes", 0) for e in entreprises),
+        "nb_erreurs": sum(1 for e in entreprises if "error" in e),
+        "questions": [
+            {"question": a["question"], "statut": a["statut"], "duree_ms": a["duree_ms"], "cache": a["cache"]}
+            for a in answers.values()
+        ],
+        "entreprises": entreprises,
+        "duree_totale_ms": int((time.monotonic() - debut) * 1000)
+    }
+
+@veille_bp.route('/sweep', methods=['POST'])
+def veille_sweep():
+    """
+    Lance la veille pour toutes les entreprises (à appeler par Cloud Scheduler)
+
+    Query params:
+        - dry_run: true/false pour simuler sans créer d'alertes (optionnel)
+    """
+    try:
+        if not db:
+            return jsonify({"error": "Firestore non configuré"}), 500
+
+        dry_run = request.args.get('dry_run', '').lower() in ('true', '1', 'yes')
+        result = run_veille_sweep(dry_run=dry_run)
+
+        logger.info("✅ Balayage veille terminé: %s nouvelles alertes, %s appels agent fiscal en %s ms",
+                    result['nb_nouvelles_alertes'], result['nb_appels_agent'], result['duree_totale_ms'])
+        return jsonify(result), 200
+
+    except Exception as e:
+        logger.error("Erreur veille_sweep: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+def sse_event(event, data):
+    """Formate un évènement Server-Sent Events"""
+    return f"event: {event}\ndata: {current_app.json.dumps(data)}\n\n"
+
+@veille_bp.route('/analyser/<company_id>/stream', methods=['POST'])
+def analyser_veille_stream(company_id):
+    """
+    Lance une analyse de veille réglementaire en streaming (Server-Sent Events)
+
+    Évènements émis:
+        - question: statut et durée d'une question dès qu'elle a répondu
+        - alerte: chaque nouvelle alerte, dès que sa question a répondu
+        - resume: résumé final (mêmes champs que /analyser/<company_id>)
+        - erreur: erreur inattendue pendant l'analyse
+    """
+    if not db:
+        return jsonify({"error": "Firestore non configuré"}), 500
+
+    try:
+        settings = get_company_settings(company_id)
+    except Exception as e:
+        logger.error("Erreur analyser_veille_stream: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+    if settings is None:
+        return jsonify({"error": "Paramètres entreprise non trouvés"}), 404
+    questions = build_questions(settings)
+
+    def generate():
+        nb_nouvelles = 0
+        nb_existantes = 0
+        questions_metadata = []
+        debut = time.monotonic()
+
+        try:
+            index = load_veille_index(company_id)  # Une lecture pour toutes les questions
+
+            for answer in iter_agent_fiscal_answers(questions):
+                question_metadata = {
+                    "question": answer["question"],
+                    "statut": answer["statut"],
+                    "duree_ms": answer["duree_ms"],
+                    "cache": answer["cache"]
+                }
+                questions_metadata.append(question_metadata)
+                yield sse_event("question", question_metadata)
+
+                if answer["result"] is None:
+                    continue
+
+                alertes = build_veille_alertes(company_id, settings, answer["question"], answer["result"])
+                nouvelles, existantes = save_veille_alertes(company_id, alertes, index=index)
+                nb_nouvelles += len(nouvelles)
+                nb_existantes += existantes
+
+                for alerte in nouvelles:
+                    yield sse_event("alerte", alerte)
+
+            yield sse_event("resume", {
+                "success": True,
+                "nb_nouvelles_alertes": nb_nouvelles,
+                "nb_alertes_existantes": nb_existantes,
+                "complet": all(q["statut"] == "ok" for q in questions_metadata),
+                "metadata": {
+                    "questions": questions_metadata,
+                    "duree_totale_ms": int((time.monotonic() - debut) * 1000)
+                }
+            })
+
+        except Exception as e:
+            logger.error("Erreur analyser_veille_stream: %s", e)
+            yield sse_event("erreur", {"error": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Désactive le buffering nginx
+        }
+    )
+
 @veille_bp.route('/marquer-lu/<alerte_id>', methods=['PUT'])
 def marquer_alerte_lue(alerte_id):
     """Marque une alerte de veille comme lue"""
@@ -159,6 +781,87 @@ def marquer_alerte_lue(alerte_id):
         return jsonify({"success": True}), 200
 
     except Exception as e:
-        logger.error(f"Erreur marquer_alerte_lue: {e}")
+        logger.error("Erreur marquer_alerte_lue: %s", e)
         return jsonify({"error": str(e)}), 500
 
+def marquer_refs_lues(doc_refs):
+    """
+    Marque une liste de documents 'alertes' comme lus par WriteBatch (500 par commit)
+
+    Si un lot échoue parce qu'un document n'existe pas, les mises à jour du
+    lot sont rejouées une par une pour ignorer les IDs inconnus.
+
+    Returns:
+        (nombre de documents marqués, nombre de documents introuvables)
+    """
+    from google.api_core.exceptions import NotFound
+
+    update = {
+        "statut": "lu",
+        "dateLecture": datetime.now()
+    }
+    nb_marquees = 0
+    nb_introuvables = 0
+
+    for i in range(0, len(doc_refs), FIRESTORE_BATCH_LIMIT):
+        lot = doc_refs[i:i + FIRESTORE_BATCH_LIMIT]
+        batch = db.batch()
+        for doc_ref in lot:
+            batch.update(doc_ref, update)
+
+        try:
+            batch.commit()
+            nb_marquees += len(lot)
+        except NotFound:
+            for doc_ref in lot:
+                try:
+                    doc_ref.update(update)
+                    nb_marquees += 1
+                except NotFound:
+                    nb_introuvables += 1
+
+    return nb_marquees, nb_introuvables
+
+@veille_bp.route('/marquer-lu', methods=['PUT'])
+def marquer_alertes_lues():
+    """
+    Marque plusieurs alertes de veille comme lues
+
+    Body:
+        {"ids": ["...", "..."]}          - une liste d'alertes
+        {"companyId": "..."}             - toutes les alertes non lues d'une entreprise
+    """
+    try:
+        if not db:
+            return jsonify({"error": "Firestore non configuré"}), 500
+
+        data = request.get_json(silent=True) or {}
+        ids = data.get('ids')
+        company_id = data.get('companyId')
+
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(i, str) and i for i in ids):
+                return jsonify({"error": "ids doit être une liste d'identifiants"}), 400
+            doc_refs = [db.collection('alertes').document(alerte_id) for alerte_id in set(ids)]
+        elif company_id:
+            # Requête côté serveur, projection minimale: seules les références sont utiles
+            query = db.collection('alertes')\
+                .where('companyId', '==', company_id)\
+                .where('statut', '==', 'non_lu')\
+                .select(['statut'])
+            doc_refs = [doc.reference for doc in query.stream()]
+        else:
+            return jsonify({"error": "ids ou companyId requis"}), 400
+
+        nb_marquees, nb_introuvables = marquer_refs_lues(doc_refs)
+        logger.info("✅ %s alertes de veille marquées comme lues", nb_marquees)
+
+        return jsonify({
+            "success": True,
+            "nb_marquees": nb_marquees,
+            "nb_introuvables": nb_introuvables
+        }), 200
+
+    except Exception as e:
+        logger.error("Erreur marquer_alertes_lues: %s", e)
+        return jsonify({"error": str(e)}), 500
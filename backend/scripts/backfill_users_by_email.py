@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Script pour créer l'index users_by_email/{email} des comptes existants
+À lancer une fois après le déploiement de l'index: l'inscription s'appuie sur
+cet index pour refuser les emails déjà utilisés. Une fois l'index complet, passer
+USERS_EMAIL_LEGACY_LOOKUP=false: la connexion et l'inscription ne font plus que
+des lectures directes.
+Usage: python backfill_users_by_email.py [--dry-run]
+"""
+
+from google.cloud import firestore
+from google.api_core.exceptions import AlreadyExists
+from urllib.parse import quote
+import os
+import sys
+
+def backfill_users_by_email(dry_run=False):
+    """Crée une entrée d'index pour chaque utilisateur qui n'en a pas"""
+
+    project_id = os.getenv('GCP_PROJECT')
+    if not project_id:
+        print("❌ Erreur: GCP_PROJECT doit être défini")
+        print("Exportez votre project ID: export GCP_PROJECT=votre-project-id")
+        return False
+
+    try:
+        db = firestore.Client(project=project_id)
+        print(f"📡 Connexion à Firestore (project: {project_id})")
+    except Exception as e:
+        print(f"❌ Erreur de connexion à Firestore: {e}")
+        return False
+
+    created = 0
+    existing = 0
+    duplicates = []
+
+    for doc in db.collection('users').stream():
+        email = (doc.to_dict().get('email') or '').strip().lower()
+        if not email:
+            continue
+
+        index_ref = db.collection('users_by_email').document(quote(email, safe='@.+-_'))
+
+        if dry_run:
+            if index_ref.get().exists:
+                existing += 1
+            else:
+                created += 1
+            continue
+
+        try:
+            index_ref.create({'uid': doc.id})
+            created += 1
+        except AlreadyExists:
+            if index_ref.get().get('uid') != doc.id:
+                duplicates.append((email, doc.id))
+            existing += 1
+
+    prefix = "🔎 [DRY RUN] " if dry_run else "✅ "
+    print(f"{prefix}{created} entrées d'index créées, {existing} déjà présentes")
+    if not dry_run and not duplicates:
+        print("👉 Index complet: USERS_EMAIL_LEGACY_LOOKUP=false peut être activé")
+
+    if duplicates:
+        print(f"⚠️  {len(duplicates)} comptes en double (email déjà indexé pour un autre uid):")
+        for email, uid in duplicates:
+            print(f"   - {email} ({uid})")
+
+    return True
+
+if __name__ == '__main__':
+    backfill_users_by_email(dry_run='--dry-run' in sys.argv)
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Benchmark de charge du backend contre l'émulateur Firestore
+Démarre l'émulateur (optionnel) et le backend (gunicorn, comme sur Cloud Run), insère
+un volume de données configurable, puis envoie des requêtes concurrentes sur chaque
+scénario et affiche le débit et les latences p50/p95/p99.
+
+Usage:
+    # Émulateur déjà lancé (gcloud emulators firestore start --host-port=localhost:8089)
+    python scripts/bench_load.py --requests 500 --concurrency 16
+
+    # Lancer l'émulateur, enregistrer les résultats puis comparer après une modification
+    python scripts/bench_load.py --start-emulator --json avant.json
+    python scripts/bench_load.py --start-emulator --compare avant.json
+
+    # Logique applicative seule, sans réseau (STORAGE_BACKEND=memory)
+    python scripts/bench_load.py --storage memory
+
+    # Variante ASGI (hypercorn asgi:app) à comparer à gunicorn
+    python scripts/bench_load.py --storage memory --server asgi --compare gunicorn.json
+
+Scénarios: alerts, tasks_org, tasks_stats, procedures, veille_company, login
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+BENCH_PROJECT = 'bench-agent-gcp'
+BENCH_PASSWORD = 'benchmark-password'
+
+# ============================================================================
+# ÉMULATEUR ET SERVEUR
+# ============================================================================
+
+def wait_for(url, timeout, what):
+    """Attend qu'une URL réponde (200), ou lève une erreur après timeout secondes"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{what} ne répond pas sur {url} après {timeout}s")
+
+def start_emulator(host):
+    """Lance l'émulateur Firestore (gcloud) et attend qu'il soit prêt"""
+    print(f"🔥 Démarrage de l'émulateur Firestore sur {host}...")
+    process = subprocess.Popen(
+        ['gcloud', 'emulators', 'firestore', 'start', f'--host-port={host}'],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    wait_for(f"http://{host}/", 60, "L'émulateur Firestore")
+    return process
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_backend(emulator_host, threads, bcrypt_rounds, log_path, extra_env=None, server='gunicorn'):
+    """
+    Lance le backend sur un port libre
+
+    server: gunicorn (même commande que le Dockerfile) ou asgi (hypercorn asgi:app,
+    routes async de modules/async_api.py, `threads` threads pour les routes Flask)
+    """
+    port = free_port()
+    env = dict(
+        os.environ,
+        **(extra_env or {}),
+        FIRESTORE_EMULATOR_HOST=emulator_host,
+        GCP_PROJECT=BENCH_PROJECT,
+        GOOGLE_CLOUD_PROJECT=BENCH_PROJECT,
+        ALERT_ENGINE_URL='',  # Pas de déclenchement de l'alert-engine pendant le benchmark
+        HEALTH_PROBES_ENABLED='false',
+        BCRYPT_ROUNDS=str(bcrypt_rounds),
+        REQUEST_THREADS=str(threads),
+        REQUEST_ACCOUNTING_LOG_MIN_READS='-1',
+        PORT=str(port)
+    )
+    if server == 'asgi':
+        env['ASYNC_WSGI_THREADS'] = str(threads)
+        command = [sys.executable, '-m', 'hypercorn', '--bind', f'127.0.0.1:{port}', '--workers', '1', 'asgi:app']
+    else:
+        command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', '1',
+                   '--threads', str(threads), '--timeout', '0', 'app:app']
+
+    log = open(log_path, 'w')
+    process = subprocess.Popen(
+        command,
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+        start_new_session=True
+    )
+    url = f"http://127.0.0.1:{port}"
+    print(f"🚀 Démarrage du backend sur {url} (logs: {log_path})...")
+    wait_for(f"{url}/health", 60, "Le backend")
+    return process, url
+
+def stop(process):
+    if process and process.poll() is None:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+
+# ============================================================================
+# DONNÉES
+# ============================================================================
+
+def clear_emulator(host):
+    """Vide toutes les collections du projet de benchmark dans l'émulateur"""
+    url = f"http://{host}/emulator/v1/projects/{BENCH_PROJECT}/databases/(default)/documents"
+    requests.delete(url, timeout=30).raise_for_status()
+
+def build_documents(args):
+    """Retourne les documents du benchmark (volumes configurables): [(collection, id, données)]"""
+    from modules.passwords import hash_password
+
+    now = datetime.now(timezone.utc)
+    statuses = ['open', 'in_progress', 'completed', 'cancelled']
+    writes = []
+
+    for org in range(args.orgs):
+        for i in range(args.tasks_per_org):
+            writes.append(('tasks', f"org{org}_task{i}", {
+                'task_id': f"org{org}_task{i}",
+                'org_id': f"org{org}",
+                'title': f"Tâche {i}",
+                'status': statuses[i % len(statuses)],
+                'needs_review': i % 7 == 0,
+                'due_date': (now + timedelta(days=i % 60)).isoformat(),
+                'priority': 'high' if i % 5 == 0 else 'medium'
+            }))
+
+    for i in range(args.alerts):
+        writes.append(('alerts', f"alert{i}", {
+            'task_id': f"org{i % max(1, args.orgs)}_task{i}",
+            'title': f"Alerte {i}",
+            'received_at': now - timedelta(minutes=i)
+        }))
+
+    for i in range(args.declarations):
+        writes.append(('declarations', f"declaration{i}", {
+            'user_id': 'test_user',
+            'type': 'TVA',
+            'title': f"Déclaration {i}",
+            'status': 'en_cours',
+            'created_at': now.isoformat()
+        }))
+
+    for company in range(args.companies):
+        writes.append(('settings', f"company{company}", {
+            'company': {'name': f"Entreprise {company}", 'secteur': 'services', 'taille': 'PME'}
+        }))
+        for i in range(args.info_alerts):
+            writes.append(('info_alerts', f"company{company}_info{i}", {
+                'companyId': f"company{company}",
+                'title': f"Alerte de veille {i}",
+                'detectedDate': (now - timedelta(hours=i)).isoformat(),
+                'statut': 'non_lu'
+            }))
+
+    password_hash = hash_password(BENCH_PASSWORD, rounds=args.bcrypt_rounds)
+    for i in range(args.users):
+        email = f"bench{i}@example.com"
+        writes.append(('users', f"user{i}", {
+            'uid': f"user{i}", 'email': email, 'passwordHash': password_hash,
+            'companyId': 'demo_company', 'createdAt': now
+        }))
+        writes.append(('users_by_email', email, {'uid': f"user{i}"}))
+
+    print(f"🌱 {len(writes)} documents "
+          f"({args.orgs}×{args.tasks_per_org} tasks, {args.alerts} alerts, {args.declarations} declarations, "
+          f"{args.companies}×{args.info_alerts} info_alerts, {args.users} users)")
+    return writes
+
+def seed_firestore(host, writes):
+    """Insère les documents dans l'émulateur par WriteBatch de 500"""
+    os.environ['FIRESTORE_EMULATOR_HOST'] = host
+    from google.cloud import firestore
+
+    db = firestore.Client(project=BENCH_PROJECT)
+    for start in range(0, len(writes), 500):
+        batch = db.batch()
+        for collection, doc_id, data in writes[start:start + 500]:
+            batch.set(db.collection(collection).document(doc_id), data)
+        batch.commit()
+
+def write_seed_file(writes):
+    """Écrit les documents au format STORAGE_SEED_FILE (stockage mémoire), dates en ISO 8601"""
+    collections = {}
+    for collection, doc_id, data in writes:
+        collections.setdefault(collection, {})[doc_id] = data
+
+    path = os.path.join(tempfile.gettempdir(), 'bench_load_seed.json')
+    with open(path, 'w') as f:
+        json.dump(collections, f, default=lambda value: value.isoformat())
+    return path
+
+# ============================================================================
+# SCÉNARIOS
+# ============================================================================
+
+def scenarios(args):
+    """Retourne {nom: fonction(i) -> (méthode, chemin, corps JSON)}"""
+    return {
+        'alerts': lambda i: ('GET', '/alerts/', None),
+        'tasks_org': lambda i: ('GET', f"/tasks/org/org{i % args.orgs}", None),
+        'tasks_stats': lambda i: ('GET', f"/tasks/stats/org{i % args.orgs}", None),
+        'procedures': lambda i: ('GET', '/api/procedures/', None),
+        'veille_company': lambda i: ('GET', f"/veille/company/company{i % args.companies}", None),
+        'dashboard': lambda i: ('GET', f"/dashboard/company{i % args.companies}?org_id=org{i % args.orgs}", None),
+        'batch': lambda i: ('POST', '/batch', {'requests': [
+            {'path': '/alerts/'},
+            {'path': f"/tasks/stats/org{i % args.orgs}"},
+            {'path': '/api/procedures/'},
+            {'path': f"/veille/company/company{i % args.companies}"},
+        ]}),
+        'login': lambda i: ('POST', '/auth/login', {
+            'email': f"bench{i % args.users}@example.com", 'password': BENCH_PASSWORD
+        }),
+    }
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def firestore_reads(response):
+    """Lit reads=N dans le header Server-Timing (compteur Firestore par requête)"""
+    for entry in response.headers.get('Server-Timing', '').split(','):
+        if entry.strip().startswith('firestore') and 'reads=' in entry:
+            return int(entry.split('reads=')[1].split()[0].rstrip('"'))
+    return None
+
+def run_scenario(base_url, build_request, total, concurrency):
+    """Envoie total requêtes avec concurrency clients et mesure chaque latence"""
+    latencies = []
+    reads = []
+    errors = 0
+    next_index = 0
+    lock = threading.Lock()
+
+    def client():
+        nonlocal errors, next_index
+        session = requests.Session()
+        while True:
+            with lock:
+                if next_index >= total:
+                    return
+                i = next_index
+                next_index += 1
+
+            method, path, body = build_request(i)
+            debut = time.perf_counter()
+            try:
+                response = session.request(method, base_url + path, json=body, timeout=60)
+                ok = response.status_code < 400
+                nb_reads = firestore_reads(response)
+            except requests.exceptions.RequestException:
+                ok, nb_reads = False, None
+            elapsed_ms = (time.perf_counter() - debut) * 1000
+
+            with lock:
+                latencies.append(elapsed_ms)
+                if not ok:
+                    errors += 1
+                if nb_reads is not None:
+                    reads.append(nb_reads)
+
+    debut = time.perf_counter()
+    workers = [threading.Thread(target=client) for _ in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    duration = time.perf_counter() - debut
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / duration, 1),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+        "reads_per_request": round(statistics.mean(reads), 1) if reads else None
+    }
+
+# ============================================================================
+# RAPPORT
+# ============================================================================
+
+def print_report(results, baseline=None):
+    header = f"{'scénario':<16}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'erreurs':>9}{'reads':>8}"
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        reads = '-' if r['reads_per_request'] is None else r['reads_per_request']
+        print(f"{name:<16}{r['rps']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}"
+              f"{r['max_ms']:>9}{r['errors']:>9}{reads:>8}")
+
+        base = (baseline or {}).get(name)
+        if base:
+            def delta(key):
+                return f"{(r[key] - base[key]) / base[key] * 100:+.0f}%" if base[key] else 'n/a'
+            print(f"{'  vs référence':<16}{delta('rps'):>9}{delta('p50_ms'):>9}{delta('p95_ms'):>9}"
+                  f"{delta('p99_ms'):>9}{delta('max_ms'):>9}")
+    print("Latences en ms, reads = documents Firestore lus par requête (Server-Timing)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de charge du backend (émulateur Firestore)")
+    parser.add_argument('--storage', choices=['firestore', 'memory'], default='firestore',
+                        help="memory: STORAGE_BACKEND=memory, sans émulateur")
+    parser.add_argument('--emulator-host', default=os.getenv('FIRESTORE_EMULATOR_HOST', 'localhost:8089'))
+    parser.add_argument('--start-emulator', action='store_true', help="Lancer l'émulateur via gcloud")
+    parser.add_argument('--url', help="Backend déjà lancé (sinon démarré avec gunicorn)")
+    parser.add_argument('--no-seed', action='store_true', help="Garder les données déjà présentes")
+    parser.add_argument('--scenarios', default=','.join(scenarios(argparse.Namespace()).keys()))
+    parser.add_argument('--requests', type=int, default=200, help="Requêtes par scénario")
+    parser.add_argument('--concurrency', type=int, default=8, help="Clients simultanés")
+    parser.add_argument('--warmup', type=int, default=10, help="Requêtes non mesurées par scénario")
+    parser.add_argument('--server', choices=['gunicorn', 'asgi'], default='gunicorn',
+                        help="gunicorn app:app (Dockerfile) ou hypercorn asgi:app (routes async)")
+    parser.add_argument('--threads', type=int, default=8, help="Threads gunicorn (Dockerfile: 8)")
+    parser.add_argument('--orgs', type=int, default=5)
+    parser.add_argument('--tasks-per-org', type=int, default=200)
+    parser.add_argument('--alerts', type=int, default=200)
+    parser.add_argument('--declarations', type=int, default=50)
+    parser.add_argument('--companies', type=int, default=5)
+    parser.add_argument('--info-alerts', type=int, default=100, help="Alertes de veille par entreprise")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--bcrypt-rounds', type=int, default=12)
+    parser.add_argument('--json', help="Enregistrer les résultats dans ce fichier")
+    parser.add_argument('--compare', help="Comparer à des résultats enregistrés avec --json")
+    args = parser.parse_args()
+
+    available = scenarios(args)
+    selected = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in selected if name not in available]
+    if unknown:
+        parser.error(f"Scénarios inconnus: {', '.join(unknown)} (disponibles: {', '.join(available)})")
+
+    emulator = backend = None
+    extra_env = {}
+    try:
+        if args.storage == 'memory':
+            extra_env = {'STORAGE_BACKEND': 'memory', 'STORAGE_SEED_FILE': write_seed_file(build_documents(args))}
+        else:
+            if args.start_emulator:
+                emulator = start_emulator(args.emulator_host)
+            if not args.no_seed:
+                clear_emulator(args.emulator_host)
+                seed_firestore(args.emulator_host, build_documents(args))
+
+        if args.url:
+            base_url = args.url.rstrip('/')
+        else:
+            backend, base_url = start_backend(
+                args.emulator_host, args.threads, args.bcrypt_rounds,
+                os.path.join(tempfile.gettempdir(), 'bench_load_server.log'), extra_env, args.server
+            )
+
+        print(f"⏱️  {args.requests} requêtes par scénario, {args.concurrency} clients simultanés")
+        print("")
+
+        results = {}
+        for name in selected:
+            if args.warmup:
+                run_scenario(base_url, available[name], args.warmup, min(args.concurrency, args.warmup))
+            results[name] = run_scenario(base_url, available[name], args.requests, args.concurrency)
+
+        baseline = None
+        if args.compare:
+            with open(args.compare) as f:
+                baseline = json.load(f)['results']
+
+        print_report(results, baseline)
+
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump({"config": vars(args), "results": results}, f, indent=2)
+            print(f"💾 Résultats enregistrés dans {args.json}")
+
+    finally:
+        stop(backend)
+        stop(emulator)
+
+if __name__ == '__main__':
+    main()
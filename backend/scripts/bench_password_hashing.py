@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark du hachage des mots de passe (connexions/s par cœur)
+Mesure le débit de verify_password à travers le pool de hachage pour plusieurs coûts bcrypt.
+
+Usage: python scripts/bench_password_hashing.py [--rounds 10,11,12] [--logins 50] [--concurrency 8]
+Le pool est dimensionné par PASSWORD_HASH_WORKERS (défaut: nombre de cœurs pour le benchmark).
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+CPU_COUNT = os.cpu_count() or 1
+os.environ.setdefault('PASSWORD_HASH_WORKERS', str(CPU_COUNT))
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from modules import passwords  # noqa: E402
+
+def bench_rounds(rounds, logins, concurrency):
+    """Mesure le débit de connexions pour un coût bcrypt donné"""
+    password = 'benchmark-password'
+    password_hash = passwords.hash_password(password, rounds=rounds)
+
+    def login(_):
+        while True:
+            try:
+                valid, _ = passwords.verify_password(password, password_hash)
+                return valid
+            except passwords.PasswordHasherBusy:
+                time.sleep(0.001)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(login, range(logins)))
+    elapsed = time.monotonic() - start
+
+    if not all(results):
+        raise RuntimeError(f"Vérification échouée pour rounds={rounds}")
+
+    cores = min(passwords.PASSWORD_HASH_WORKERS, CPU_COUNT)
+    logins_per_sec = logins / elapsed
+    return {
+        "rounds": rounds,
+        "logins_per_sec": logins_per_sec,
+        "logins_per_sec_per_core": logins_per_sec / cores,
+        "ms_per_login": elapsed * 1000 / logins * cores
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du hachage des mots de passe")
+    parser.add_argument('--rounds', default='10,11,12,13', help="Coûts bcrypt à mesurer (séparés par des virgules)")
+    parser.add_argument('--logins', type=int, default=50, help="Connexions simulées par coût")
+    parser.add_argument('--concurrency', type=int, default=8, help="Requêtes simultanées (threads gunicorn)")
+    args = parser.parse_args()
+
+    print(f"🔐 Benchmark bcrypt: {CPU_COUNT} cœurs, pool de {passwords.PASSWORD_HASH_WORKERS} workers, "
+          f"{args.concurrency} requêtes simultanées")
+    print("")
+    print(f"{'rounds':>6} | {'connexions/s':>12} | {'connexions/s/cœur':>17} | {'ms/connexion/cœur':>17}")
+    print("-" * 62)
+
+    for rounds in [int(r) for r in args.rounds.split(',')]:
+        result = bench_rounds(rounds, args.logins, args.concurrency)
+        print(f"{result['rounds']:>6} | {result['logins_per_sec']:>12.1f} | "
+              f"{result['logins_per_sec_per_core']:>17.1f} | {result['ms_per_login']:>17.1f}")
+
+    stats = passwords.hasher_stats()
+    print("")
+    print(f"⏱️  Attente dans la file: p50={stats['queue_ms']['p50']} ms, p99={stats['queue_ms']['p99']} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark du démarrage à froid du backend (python -X importtime)
+Mesure le temps d'import de app.py en mode LAZY_BOOT et le compare au budget
+de scripts/startup_budget.json. Échoue aussi si un module lourd listé dans
+"forbidden_modules" est importé au démarrage.
+
+Usage: python scripts/bench_startup.py [--runs 5] [--top 10]
+Code de sortie: 0 si le budget est respecté, 1 sinon
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_budget.json')
+
+def measure_import():
+    """
+    Importe app.py dans un processus neuf avec -X importtime
+
+    Returns:
+        (temps cumulé d'import de 'app' en ms, {module: temps cumulé en ms})
+    """
+    env = dict(os.environ, LAZY_BOOT='true')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Import de app.py impossible:\n{result.stderr[-2000:]}")
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        try:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            modules[name.strip()] = int(cumulative) / 1000
+        except ValueError:
+            continue  # Ligne d'en-tête
+
+    return modules.get('app', 0.0), modules
+
+def main():
+    with open(BUDGET_PATH) as f:
+        budget = json.load(f)
+
+    parser = argparse.ArgumentParser(description="Benchmark du démarrage à froid du backend")
+    parser.add_argument('--runs', type=int, default=budget.get('runs', 5), help="Nombre de mesures")
+    parser.add_argument('--top', type=int, default=10, help="Nombre d'imports les plus lents affichés")
+    args = parser.parse_args()
+
+    timings = []
+    modules = {}
+    for _ in range(args.runs):
+        app_ms, modules = measure_import()
+        timings.append(app_ms)
+
+    median_ms = statistics.median(timings)
+    print(f"🚀 Import de app.py (LAZY_BOOT=true): médiane {median_ms:.1f} ms "
+          f"sur {args.runs} mesures (min {min(timings):.1f}, max {max(timings):.1f})")
+    print(f"   Budget: {budget['import_ms']} ms")
+    print("")
+
+    print(f"📦 {args.top} imports les plus lents (cumulé, dernière mesure):")
+    top_level = {name: ms for name, ms in modules.items() if not name.startswith(' ')}
+    for name, ms in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"   {ms:8.1f} ms  {name}")
+    print("")
+
+    ok = True
+    forbidden = [name for name in budget.get('forbidden_modules', [])
+                 if any(m.strip() == name for m in modules)]
+    if forbidden:
+        ok = False
+        print(f"❌ Modules lourds importés au démarrage: {', '.join(forbidden)}")
+
+    if median_ms > budget['import_ms']:
+        ok = False
+        print(f"❌ Budget dépassé: {median_ms:.1f} ms > {budget['import_ms']} ms")
+
+    if ok:
+        print("✅ Budget de démarrage respecté")
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
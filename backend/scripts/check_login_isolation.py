@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Vérifie qu'une rafale de connexions ne bloque pas les autres routes
+Lance le backend (gunicorn, stockage mémoire), envoie plus de connexions simultanées
+qu'il n'y a de threads de requête, et mesure pendant ce temps /health et
+/tasks/stats/<org>. Échoue (code 1) si une de ces requêtes échoue ou dépasse
+--max-latency-ms: le pool de hachage doit répondre 503 au-delà de sa file au lieu
+d'occuper tous les threads.
+
+Usage: python scripts/check_login_isolation.py [--threads 8] [--logins 32] [--duration 5]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_load import BENCH_PASSWORD, build_documents, start_backend, stop, write_seed_file  # noqa: E402
+
+def main():
+    parser = argparse.ArgumentParser(description="Isolation des connexions (pool de hachage)")
+    parser.add_argument('--threads', type=int, default=8, help="Threads gunicorn (Dockerfile: 8)")
+    parser.add_argument('--logins', type=int, default=32, help="Connexions simultanées")
+    parser.add_argument('--duration', type=float, default=5, help="Durée de la rafale (s)")
+    parser.add_argument('--bcrypt-rounds', type=int, default=12)
+    parser.add_argument('--max-latency-ms', type=float, default=1000,
+                        help="Latence max tolérée sur les autres routes pendant la rafale")
+    args = parser.parse_args()
+
+    seed = argparse.Namespace(orgs=1, tasks_per_org=20, alerts=10, declarations=5, companies=1,
+                              info_alerts=10, users=4, bcrypt_rounds=args.bcrypt_rounds)
+    extra_env = {'STORAGE_BACKEND': 'memory', 'STORAGE_SEED_FILE': write_seed_file(build_documents(seed))}
+
+    backend = None
+    try:
+        backend, base_url = start_backend(
+            '', args.threads, args.bcrypt_rounds,
+            os.path.join(tempfile.gettempdir(), 'check_login_isolation_server.log'), extra_env
+        )
+
+        deadline = time.monotonic() + args.duration
+        login_statuses = {}
+        probes = []  # (chemin, statut ou None, latence ms)
+        lock = threading.Lock()
+
+        def login(i):
+            session = requests.Session()
+            body = {'email': f"bench{i % seed.users}@example.com", 'password': BENCH_PASSWORD}
+            while time.monotonic() < deadline:
+                try:
+                    status = session.post(f"{base_url}/auth/login", json=body, timeout=60).status_code
+                except requests.exceptions.RequestException:
+                    status = 'erreur'
+                with lock:
+                    login_statuses[status] = login_statuses.get(status, 0) + 1
+
+        def probe():
+            session = requests.Session()
+            time.sleep(0.5)  # Laisser la rafale occuper le pool
+            while time.monotonic() < deadline:
+                for path in ('/health', '/tasks/stats/org0'):
+                    debut = time.perf_counter()
+                    try:
+                        status = session.get(base_url + path, timeout=10).status_code
+                    except requests.exceptions.RequestException:
+                        status = None
+                    probes.append((path, status, (time.perf_counter() - debut) * 1000))
+                time.sleep(0.1)
+
+        workers = [threading.Thread(target=login, args=(i,)) for i in range(args.logins)]
+        workers.append(threading.Thread(target=probe))
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        failed = [p for p in probes if p[1] != 200 or p[2] > args.max_latency_ms]
+        max_latency = max((p[2] for p in probes), default=0.0)
+
+        print(f"🔐 {args.logins} connexions simultanées, {args.threads} threads: {login_statuses}")
+        print(f"📡 {len(probes)} requêtes sur les autres routes, latence max {max_latency:.1f} ms")
+        if not probes or failed:
+            for path, status, latency in failed[:10]:
+                print(f"   ❌ {path}: statut {status}, {latency:.1f} ms")
+            print("❌ Les connexions bloquent les autres routes")
+            return 1
+
+        print("✅ Les autres routes répondent pendant la rafale de connexions")
+        return 0
+
+    finally:
+        stop(backend)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Script pour exporter des collections Firestore au format STORAGE_SEED_FILE
+Le fichier produit permet de servir une démo entièrement depuis le stockage mémoire:
+    STORAGE_BACKEND=memory STORAGE_SEED_FILE=seed.json python app.py
+
+Usage: python export_storage_seed.py seed.json [collection ...]
+Par défaut: tasks alerts info_alerts alertes declarations settings users users_by_email _meta
+"""
+
+from google.cloud import firestore
+import json
+import os
+import sys
+
+DEFAULT_COLLECTIONS = [
+    'tasks', 'alerts', 'info_alerts', 'alertes', 'declarations',
+    'settings', 'users', 'users_by_email', '_meta'
+]
+
+def export_storage_seed(output_path, collections):
+    """Écrit les documents des collections dans output_path ({collection: {id: données}})"""
+
+    project_id = os.getenv('GCP_PROJECT')
+    if not project_id:
+        print("❌ Erreur: GCP_PROJECT doit être défini")
+        print("Exportez votre project ID: export GCP_PROJECT=votre-project-id")
+        return False
+
+    try:
+        db = firestore.Client(project=project_id)
+        print(f"📡 Connexion à Firestore (project: {project_id})")
+    except Exception as e:
+        print(f"❌ Erreur de connexion à Firestore: {e}")
+        return False
+
+    seed = {}
+    for collection in collections:
+        seed[collection] = {doc.id: doc.to_dict() for doc in db.collection(collection).stream()}
+        print(f"   - {collection}: {len(seed[collection])} documents")
+
+    # Dates converties en ISO 8601 (le stockage mémoire les relit comme des chaînes)
+    with open(output_path, 'w') as f:
+        json.dump(seed, f, default=lambda value: value.isoformat() if hasattr(value, 'isoformat') else str(value),
+                  ensure_ascii=False, indent=1)
+
+    print(f"✅ {sum(len(docs) for docs in seed.values())} documents exportés dans {output_path}")
+    return True
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    export_storage_seed(sys.argv[1], sys.argv[2:] or DEFAULT_COLLECTIONS)
@@ -44,7 +44,9 @@ export const ENDPOINTS = {
     base: `${API_BASE_URL}/veille`,
     company: (companyId: string) => `${API_BASE_URL}/veille/company/${companyId}`,
     analyser: (companyId: string) => `${API_BASE_URL}/veille/analyser/${companyId}`,
+    analyserStream: (companyId: string) => `${API_BASE_URL}/veille/analyser/${companyId}/stream`,
     marquerLu: (alerteId: string) => `${API_BASE_URL}/veille/marquer-lu/${alerteId}`,
+    marquerLuBulk: `${API_BASE_URL}/veille/marquer-lu`,
     news: `${API_BASE_URL}/veille/news`,
     updates: `${API_BASE_URL}/veille/updates`
   },
@@ -50,10 +50,30 @@ export interface VeilleResponse {
   total: number;
 }
 
+export interface QuestionVeilleMetadata {
+  question: string;
+  statut: 'ok' | 'timeout' | 'erreur' | 'deadline';
+  duree_ms: number;
+  cache: 'memoire' | 'firestore' | null;
+}
+
 export interface AnalyseVeilleResponse {
   success: boolean;
   nb_nouvelles_alertes: number;
+  nb_alertes_existantes?: number;
   alertes: AlerteVeille[];
+  complet?: boolean;
+  metadata?: {
+    questions: QuestionVeilleMetadata[];
+    duree_totale_ms: number;
+  };
+}
+
+export type AnalyseVeilleResume = Omit<AnalyseVeilleResponse, 'alertes'>;
+
+export interface AnalyseVeilleStreamHandlers {
+  onAlerte?: (alerte: AlerteVeille) => void;
+  onQuestion?: (question: QuestionVeilleMetadata) => void;
 }
 
 import { ENDPOINTS } from '../config/api';
@@ -196,6 +216,63 @@ class VeilleService {
     }
   }
 
+  /**
+   * Lance une analyse de veille en streaming (Server-Sent Events)
+   * Chaque alerte est transmise dès que sa question a répondu.
+   * @returns Le résumé final de l'analyse
+   */
+  async analyserVeilleStream(
+    companyId: string,
+    handlers: AnalyseVeilleStreamHandlers = {}
+  ): Promise<AnalyseVeilleResume> {
+    const response = await fetch(ENDPOINTS.veille.analyserStream(companyId), {
+      method: 'POST',
+      headers: {
+        'Accept': 'text/event-stream',
+      },
+    });
+
+    if (!response.ok || !response.body) {
+      const errorText = await response.text();
+      throw new Error(`Erreur HTTP ${response.status}: ${errorText}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let resume: AnalyseVeilleResume | null = null;
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split('\n\n');
+      buffer = events.pop() || '';
+
+      for (const rawEvent of events) {
+        let event = 'message';
+        let data = '';
+        for (const line of rawEvent.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        if (!data) continue;
+
+        const payload = JSON.parse(data);
+        if (event === 'alerte') handlers.onAlerte?.(payload);
+        else if (event === 'question') handlers.onQuestion?.(payload);
+        else if (event === 'resume') resume = payload;
+        else if (event === 'erreur') throw new Error(payload.error);
+      }
+    }
+
+    if (!resume) {
+      throw new Error('Analyse de veille interrompue avant le résumé final');
+    }
+    return resume;
+  }
+
   /**
    * Marque une alerte comme lue
    */
@@ -222,6 +299,37 @@ class VeilleService {
       throw error;
     }
   }
+
+  /**
+   * Marque plusieurs alertes comme lues en une seule requête
+   * @param cible - Liste d'IDs, ou companyId pour toutes les alertes non lues de l'entreprise
+   */
+  async marquerPlusieursCommeLues(
+    cible: { ids: string[] } | { companyId: string }
+  ): Promise<{ success: boolean; nb_marquees: number; nb_introuvables: number }> {
+    try {
+      const response = await fetch(ENDPOINTS.veille.marquerLuBulk, {
+        method: 'PUT',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(cible),
+      });
+
+      if (!response.ok) {
+        const errorText = await response.text();
+        throw new Error(`Erreur HTTP ${response.status}: ${errorText}`);
+      }
+
+      return await response.json();
+    } catch (error) {
+      console.error('Erreur lors du marquage des alertes:', error);
+      if (error instanceof TypeError && error.message.includes('fetch')) {
+        throw new Error('Backend non disponible.');
+      }
+      throw error;
+    }
+  }
 }
 
 export const veilleService = new VeilleService();